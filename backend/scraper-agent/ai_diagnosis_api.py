@@ -1,44 +1,283 @@
 #!/usr/bin/env python3
 # API wrapper for AI diagnostic assistant
 # Called by Node.js server to process diagnosis requests
+#
+# one-shot mode:  ai_diagnosis_api.py '<json request>' [--stream]
+# worker mode:    ai_diagnosis_api.py --worker [--socket PATH] [--concurrency N]
+#   reads newline-delimited JSON requests (stdin or unix socket) and writes one
+#   newline-delimited JSON response per request, tagged with the request "id"
+#
+# streaming ("stream": true in the request, or --stream): newline-delimited JSON events
+# from DiagnosticAssistant.analyze_symptoms_stream as each condition is scored
+# ("conditions", then one "condition" event per condition), then the ranked "summary";
+# in worker mode events carry the request "id" and the summary is the usual response
+# with "result", plus "event": "summary"
+#
+# progress logs go to stderr; MEDISYN_METRICS=stderr|<file> adds one JSON timing record
+# per request (see telemetry/metrics.py)
 
 import sys
 import json
 import os
-from diagnosis.diagnostic_assistant import get_probable_diagnoses
+import argparse
+import socketserver
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from diagnosis.diagnostic_assistant import DiagnosticAssistant, get_probable_diagnoses
+from config.env import env_number
+from config.llm_backends import configured_backend
+import telemetry
+
+DEFAULT_WORKER_CONCURRENCY = 4
+DEFAULT_MAX_ASSISTANTS = 16  # warm assistants kept, least recently used keys are dropped first
+
+def _parse_request(input_data: Dict) -> Dict:
+    """
+    Validate a diagnosis request and return its normalized parameters
+    Raises ValueError when required fields are missing
+    """
+    # Extract parameters
+    symptom_description = input_data.get('symptom_description', '')
+    gemini_api_key = input_data.get('gemini_api_key', '') or os.getenv('GEMINI_API_KEY', '')
+    max_results = input_data.get('max_results', 3)
+    stream = bool(input_data.get('stream', False))
+
+    # Validate inputs
+    if not symptom_description:
+        raise ValueError("Symptom description is required")
+
+    if not gemini_api_key and configured_backend() == 'gemini': # LLM_BACKEND=local needs no key
+        raise ValueError("Gemini API key is required")
+
+    return {
+        'symptom_description': symptom_description,
+        'gemini_api_key': gemini_api_key,
+        'max_results': max_results,
+        'stream': stream
+    }
+
+class DiagnosisWorker:
+    """
+    Long-lived diagnosis worker
+    Keeps a warm DiagnosticAssistant (imports, HTTP session, AI model) for each of the
+    max_assistants most recently used Gemini API keys and runs several requests at once
+    on a bounded thread pool
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_WORKER_CONCURRENCY, output=None,
+                 max_assistants: int = DEFAULT_MAX_ASSISTANTS):
+        self.executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+        self.output = output or sys.stdout
+        self.max_assistants = max(1, max_assistants)
+        self._output_lock = threading.Lock()
+        self._assistants: "OrderedDict[str, DiagnosticAssistant]" = OrderedDict()
+        self._building: Dict[str, threading.Lock] = {}  # key -> lock held while its assistant is built
+        self._assistants_lock = threading.Lock()
+
+    def _get_assistant(self, gemini_api_key: str) -> DiagnosticAssistant:
+        # build the assistant once per key, then reuse it for every request
+        # building is slow, so it happens under a per-key lock: requests for other keys aren't held up
+        with self._assistants_lock:
+            assistant = self._cached_assistant(gemini_api_key)
+            if assistant is not None:
+                return assistant
+            building = self._building.setdefault(gemini_api_key, threading.Lock())
+
+        with building:
+            with self._assistants_lock:
+                assistant = self._cached_assistant(gemini_api_key)
+                if assistant is not None: # built while we waited
+                    return assistant
+            try:
+                assistant = DiagnosticAssistant(gemini_api_key)
+            except Exception:
+                with self._assistants_lock:
+                    self._building.pop(gemini_api_key, None)
+                raise
+
+            with self._assistants_lock:
+                self._assistants[gemini_api_key] = assistant
+                while len(self._assistants) > self.max_assistants:
+                    self._assistants.popitem(last=False)
+                self._building.pop(gemini_api_key, None)
+            return assistant
+
+    def _cached_assistant(self, gemini_api_key: str) -> Optional[DiagnosticAssistant]:
+        # warm assistant for a key, marked most recently used (self._assistants_lock held)
+        assistant = self._assistants.get(gemini_api_key)
+        if assistant is not None:
+            self._assistants.move_to_end(gemini_api_key)
+        return assistant
+
+    def handle(self, request: Dict, write=None) -> Dict:
+        # run one request and build its tagged response
+        # streaming requests send their progress events through write first
+        request_id = request.get('id')
+        try:
+            params = _parse_request(request)
+            assistant = self._get_assistant(params['gemini_api_key'])
+
+            with telemetry.request('diagnosis', id=request_id):
+                if params['stream'] and write is not None:
+                    for event in assistant.analyze_symptoms_stream(
+                        params['symptom_description'], params['max_results']
+                    ):
+                        if event['event'] == 'summary':
+                            return {'id': request_id, 'ok': True, 'event': 'summary', 'result': event['diagnoses']}
+                        write({'id': request_id, 'ok': True, **event})
+
+                diagnoses = assistant.analyze_symptoms(
+                    params['symptom_description'], params['max_results']
+                )
+            return {'id': request_id, 'ok': True, 'result': diagnoses}
+        except Exception as e:
+            print(f"AI Diagnosis Error ({request_id}): {str(e)}", file=sys.stderr)
+            return {'id': request_id, 'ok': False, 'error': str(e)}
+
+    def submit_line(self, line: str, write=None):
+        # parse one NDJSON line and schedule it, the response is written when done
+        write = write or self._write
+        line = line.strip()
+        if not line:
+            return None
+
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+        except ValueError as e:
+            write({'id': None, 'ok': False, 'error': f"Invalid request: {e}"})
+            return None
+
+        future = self.executor.submit(self.handle, request, write)
+        future.add_done_callback(lambda f: write(f.result()))
+        return future
+
+    def _write(self, response: Dict):
+        # one compact JSON document per line, never interleaved
+        with self._output_lock:
+            self.output.write(json.dumps(response) + "\n")
+            self.output.flush()
+
+    def serve_stdin(self, stream=None):
+        # read requests until EOF, then wait for in-flight requests to finish
+        for line in (stream or sys.stdin):
+            self.submit_line(line)
+        self.shutdown()
+
+    def serve_socket(self, path: str):
+        # accept NDJSON requests over a local unix socket, one response per line
+        worker = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                lock = threading.Lock()
+                pending = []
+
+                def write(response: Dict):
+                    with lock:
+                        self.wfile.write((json.dumps(response) + "\n").encode('utf-8'))
+                        self.wfile.flush()
+
+                for raw_line in self.rfile:
+                    future = worker.submit_line(raw_line.decode('utf-8'), write)
+                    if future is not None:
+                        pending.append(future)
+
+                # keep the connection open until every response has been written
+                for future in pending:
+                    future.result()
+
+        if os.path.exists(path):
+            os.unlink(path)
+
+        with socketserver.ThreadingUnixStreamServer(path, _Handler) as server:
+            print(f"Diagnosis worker listening on {path}", file=sys.stderr)
+            try:
+                server.serve_forever()
+            finally:
+                self.shutdown()
+                if os.path.exists(path):
+                    os.unlink(path)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+def run_worker(socket_path: Optional[str] = None, concurrency: int = DEFAULT_WORKER_CONCURRENCY):
+    """
+    Start worker mode
+    The diagnosis pipeline logs to stderr; stdout is also redirected there so stray
+    prints can't corrupt the stream and only the NDJSON responses go to the real stdout
+    """
+    output = sys.stdout
+    sys.stdout = sys.stderr
+
+    worker = DiagnosisWorker(concurrency=concurrency, output=output)
+    if socket_path:
+        worker.serve_socket(socket_path)
+    else:
+        worker.serve_stdin()
+
+def run_stream(params: Dict):
+    """
+    One-shot streaming mode
+    Writes one NDJSON event per line as the analysis progresses; pipeline logging
+    is redirected to stderr so stdout carries only the events
+    """
+    output = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        assistant = DiagnosticAssistant(params['gemini_api_key'])
+        with telemetry.request('diagnosis'):
+            for event in assistant.analyze_symptoms_stream(params['symptom_description'], params['max_results']):
+                output.write(json.dumps(event) + "\n")
+                output.flush()
+    finally:
+        sys.stdout = output
 
 def main():
     """
     Main function to process AI diagnosis request from Node.js
-    Expects JSON input via command line argument
+    Expects JSON input via command line argument, or --worker for a long-lived process
     """
+    parser = argparse.ArgumentParser(description="medisyn AI diagnosis API")
+    parser.add_argument('request', nargs='?', help="JSON diagnosis request (one-shot mode)")
+    parser.add_argument('--worker', action='store_true', help="serve newline-delimited JSON requests")
+    parser.add_argument('--stream', action='store_true',
+                        help="one-shot mode: stream NDJSON progress events instead of one final JSON document")
+    parser.add_argument('--socket', help="unix socket path for worker mode (default: stdin/stdout)")
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help="max requests processed at once in worker mode "
+                             f"(default: DIAGNOSIS_WORKER_CONCURRENCY or {DEFAULT_WORKER_CONCURRENCY})")
+    args = parser.parse_args()
+
+    if args.worker:
+        concurrency = args.concurrency or env_number('DIAGNOSIS_WORKER_CONCURRENCY', int,
+                                                     DEFAULT_WORKER_CONCURRENCY, minimum=1)
+        run_worker(args.socket, concurrency)
+        return
+
     try:
         # Get input from command line argument
-        if len(sys.argv) < 2:
+        if not args.request:
             raise ValueError("No input data provided")
 
-        input_data = json.loads(sys.argv[1])
-
-        # Extract parameters
-        symptom_description = input_data.get('symptom_description', '')
-        gemini_api_key = input_data.get('gemini_api_key', '')
-        max_results = input_data.get('max_results', 3)
-
-        # Validate inputs
-        if not symptom_description:
-            raise ValueError("Symptom description is required")
-
-        if not gemini_api_key:
-            raise ValueError("Gemini API key is required")
+        params = _parse_request(json.loads(args.request))
 
         # Set API key as environment variable for the diagnostic assistant
-        os.environ['GEMINI_API_KEY'] = gemini_api_key
+        os.environ['GEMINI_API_KEY'] = params['gemini_api_key']
+
+        if args.stream or params['stream']:
+            run_stream(params)
+            return
 
         # Call the diagnostic assistant
         diagnoses = get_probable_diagnoses(
-            symptom_description=symptom_description,
-            gemini_api_key=gemini_api_key,
-            max_results=max_results
+            symptom_description=params['symptom_description'],
+            gemini_api_key=params['gemini_api_key'],
+            max_results=params['max_results']
         )
 
         # Output results as JSON to stdout (Node.js will capture this)
@@ -50,4 +289,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
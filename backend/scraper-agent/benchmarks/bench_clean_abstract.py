@@ -0,0 +1,60 @@
+# benchmark: TextProcessor.clean_abstract vs the original five-pass cleaner
+# runs over thousands of abstracts parsed from the recorded PubMed fixtures
+#
+# run from backend/scraper-agent:  python benchmarks/bench_clean_abstract.py [num_abstracts] [repeats]
+
+import os
+import sys
+import time
+
+# Add parent directory to Python path for imports
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from fixtures.eutils_server import build_large_efetch_payload
+from processing.text_processor import TextProcessor
+from scrapers.pubmed_scraper import PubMedScraper
+from test_text_processor import reference_clean_abstract
+
+def load_abstracts(num_abstracts: int):
+    # recorded abstracts, plus variants with markup and odd characters like real efetch text
+    articles = PubMedScraper()._parse_pubmed_xml(build_large_efetch_payload(num_abstracts))
+    abstracts = []
+    for i, article in enumerate(articles):
+        text = article['abstract']
+        if i % 3 == 1:
+            text = text.replace("women", "<i>women</i>").replace(", ", " , ")
+        elif i % 3 == 2:
+            text = text.replace("%", " % ").replace(". ", " .  \n") + " ≥ 95% CI • n=120"
+        abstracts.append(text)
+    return abstracts
+
+def _time_cleaner(clean, abstracts, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for text in abstracts:
+            clean(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run_benchmark(num_abstracts: int = 5000, repeats: int = 5):
+    abstracts = load_abstracts(num_abstracts)
+    processor = TextProcessor()
+
+    assert all(processor.clean_abstract(text) == reference_clean_abstract(text) for text in abstracts)
+
+    reference = _time_cleaner(reference_clean_abstract, abstracts, repeats)
+    current = _time_cleaner(processor.clean_abstract, abstracts, repeats)
+
+    total_kib = sum(len(text) for text in abstracts) / 1024
+    print(f"{len(abstracts)} abstracts, {total_kib:.0f} KiB of text, best of {repeats}")
+    print(f"original five-pass cleaner: {reference * 1000:8.2f} ms  ({len(abstracts) / reference:9.0f} abstracts/s)")
+    print(f"compiled cleaner:           {current * 1000:8.2f} ms  ({len(abstracts) / current:9.0f} abstracts/s)")
+    print(f"speedup: {reference / current:.2f}x")
+
+if __name__ == "__main__":
+    num_abstracts = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    run_benchmark(num_abstracts, repeats)
@@ -0,0 +1,289 @@
+# benchmark: DiagnosticAssistant.analyze_symptoms end to end, fully offline
+# PubMed is the recorded E-utilities stub (fixtures/eutils_server.py), the LLM is LocalLLMBackend,
+# both with configurable latency; reports throughput, p50/p95/p99 latency, peak RSS and the
+# per-stage breakdown from telemetry, and writes everything to a JSON file for later comparison
+#
+# run from backend/scraper-agent:
+#   python benchmarks/bench_diagnosis.py [--requests N] [--concurrency N] [--warm]
+#                                        [--output results.json] [--compare baseline.json]
+# --compare exits with status 1 when p50/p95/p99 latency or throughput regressed past --max-regression
+
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+# Add parent directory to Python path for imports
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import telemetry
+from config.llm_backends import LocalLLMBackend
+from config.response_cache import ResponseCache
+from diagnosis.diagnostic_assistant import DiagnosticAssistant
+from fixtures.eutils_server import EUtilsStubServer, make_scraper
+from scrapers.article_cache import ArticleCache
+from scrapers.search_cache import SearchCache
+from telemetry.log import LOGGER_NAME
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# fixed symptom corpus, cycled through for every run so results stay comparable
+SYMPTOM_CORPUS = [
+    "irregular periods, weight gain, acne",
+    "severe pelvic pain, heavy bleeding",
+    "fatigue, shortness of breath, dizziness",
+    "hot flashes, night sweats, mood changes",
+    "chest pain and shortness of breath three weeks after delivery",
+    "heavy menstrual bleeding, fatigue, pale skin",
+    "irregular periods, excess hair growth, weight gain",
+    "pelvic pain during intercourse, painful periods",
+    "sudden onset chest pain, anxiety, palpitations",
+    "mood changes before periods, bloating, breast tenderness",
+    "fatigue, weight gain, cold intolerance, hair thinning",
+    "acne, oily skin, irregular periods"
+]
+
+STAGES = ['llm', 'esearch', 'efetch', 'xml_parse', 'rate_limit', 'relevance', 'certainty', 'evidence', 'ranking']
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    # linear interpolation between closest ranks (numpy's default), sorted_values ascending
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100.0
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+def peak_rss_mb() -> Optional[float]:
+    # peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+class _Pipeline:
+
+    # builds assistants wired to the stub server and local LLM
+    # cold: every request gets its own empty LLM/search/article caches
+    # warm: one assistant (and its caches) shared by every request
+
+    def __init__(self, server: EUtilsStubServer, backend: LocalLLMBackend, warm: bool):
+        self.server = server
+        self.backend = backend
+        self.warm = warm
+        self._shared = self._build() if warm else None
+
+    def _build(self) -> DiagnosticAssistant:
+        assistant = DiagnosticAssistant(llm_backend=self.backend)
+        assistant.ai_keywords.cache = ResponseCache()
+        assistant.scraper.pubmed_scraper = make_scraper(
+            self.server,
+            cache=ArticleCache(':memory:') if self.warm else None,
+            search_cache=SearchCache() if self.warm else None
+        )
+        return assistant
+
+    def assistant(self) -> DiagnosticAssistant:
+        return self._shared if self._shared is not None else self._build()
+
+def run_benchmark(num_requests: int = 48, concurrency: int = 4, warm: bool = False,
+                  eutils_latency: float = 0.02, llm_latency: float = 0.05, llm_jitter: float = 0.02,
+                  max_diagnoses: int = 3, seed: int = 0) -> Dict:
+
+    # run num_requests diagnoses (cycling SYMPTOM_CORPUS) with concurrency at a time
+    # returns the result document: config, throughput, latency percentiles, peak RSS,
+    # per-stage totals and counters
+
+    sink = io.StringIO()
+    telemetry.configure(sink)
+    quiet = logging.getLogger(LOGGER_NAME)
+    level = quiet.level
+    quiet.setLevel(logging.WARNING)  # per-request progress lines would drown the timings
+    cache_path = os.environ.get('PUBMED_CACHE_PATH')
+    os.environ['PUBMED_CACHE_PATH'] = ''  # never touch the real article cache
+
+    try:
+        with EUtilsStubServer(latency=eutils_latency) as server:
+            backend = LocalLLMBackend(latency=llm_latency, jitter=llm_jitter, seed=seed)
+            pipeline = _Pipeline(server, backend, warm)
+            if warm: # one untimed pass fills the caches
+                for symptoms in SYMPTOM_CORPUS:
+                    pipeline.assistant().analyze_symptoms(symptoms, max_diagnoses)
+                sink.seek(0)
+                sink.truncate()
+            warmup_calls = (server.esearch_calls, server.efetch_calls, backend.calls)
+
+            def one_request(index: int) -> float:
+                assistant = pipeline.assistant()  # built outside the timed region
+                symptoms = SYMPTOM_CORPUS[index % len(SYMPTOM_CORPUS)]
+                start = time.perf_counter()
+                with telemetry.request('diagnosis', run=index):
+                    assistant.analyze_symptoms(symptoms, max_diagnoses)
+                return time.perf_counter() - start
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+                latencies = list(executor.map(one_request, range(num_requests)))
+            wall_seconds = time.perf_counter() - start
+
+            upstream_calls = {
+                'esearch': server.esearch_calls - warmup_calls[0],
+                'efetch': server.efetch_calls - warmup_calls[1],
+                'llm': backend.calls - warmup_calls[2]
+            }
+    finally:
+        quiet.setLevel(level)
+        telemetry.configure(os.getenv('MEDISYN_METRICS'))
+        if cache_path is None:
+            os.environ.pop('PUBMED_CACHE_PATH', None)
+        else:
+            os.environ['PUBMED_CACHE_PATH'] = cache_path
+
+    records = [json.loads(line) for line in sink.getvalue().splitlines()]
+    return {
+        'benchmark': 'diagnosis',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {
+            'requests': num_requests,
+            'concurrency': concurrency,
+            'cache': 'warm' if warm else 'cold',
+            'eutils_latency': eutils_latency,
+            'llm_latency': llm_latency,
+            'llm_jitter': llm_jitter,
+            'max_diagnoses': max_diagnoses,
+            'corpus_size': len(SYMPTOM_CORPUS),
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'wall_seconds': round(wall_seconds, 4),
+        'throughput_rps': round(num_requests / wall_seconds, 3) if wall_seconds else 0.0,
+        'latency_seconds': summarize_latencies(latencies),
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': summarize_stages(records),
+        'counters': summarize_counters(records),
+        'upstream_calls': upstream_calls
+    }
+
+def summarize_latencies(latencies: List[float]) -> Dict:
+    ordered = sorted(latencies)
+    return {
+        'mean': round(sum(ordered) / len(ordered), 4) if ordered else 0.0,
+        'p50': round(percentile(ordered, 50), 4),
+        'p95': round(percentile(ordered, 95), 4),
+        'p99': round(percentile(ordered, 99), 4),
+        'max': round(ordered[-1], 4) if ordered else 0.0
+    }
+
+def summarize_stages(records: List[Dict]) -> Dict:
+
+    # per stage: total seconds across requests, mean seconds per request, p95 per request,
+    # calls, and share of total request time (stages nest and conditions are researched in
+    # parallel threads, so shares can add up past 1)
+
+    request_seconds = sum(record['seconds'] for record in records) or 1.0
+    names = STAGES + sorted({stage for record in records for stage in record['stages']} - set(STAGES))
+
+    summary = {}
+    for stage in names:
+        per_request = sorted(record['stages'].get(stage, {}).get('seconds', 0.0) for record in records)
+        total = sum(per_request)
+        if not total and not any(stage in record['stages'] for record in records):
+            continue
+        summary[stage] = {
+            'total_seconds': round(total, 4),
+            'mean_seconds': round(total / len(records), 4),
+            'p95_seconds': round(percentile(per_request, 95), 4),
+            'calls': sum(record['stages'].get(stage, {}).get('count', 0) for record in records),
+            'share': round(total / request_seconds, 4)
+        }
+    return summary
+
+def summarize_counters(records: List[Dict]) -> Dict[str, int]:
+    totals: Dict[str, int] = {}
+    for record in records:
+        for name, value in record['counters'].items():
+            totals[name] = totals.get(name, 0) + value
+    return dict(sorted(totals.items()))
+
+def compare_results(current: Dict, baseline: Dict, max_regression: float = 0.10) -> List[str]:
+
+    # regressions of current against baseline beyond max_regression (0.10 = 10%)
+    # checks p50/p95/p99 latency (higher is worse) and throughput (lower is worse)
+
+    regressions = []
+    for key in ['p50', 'p95', 'p99']:
+        before, after = baseline['latency_seconds'][key], current['latency_seconds'][key]
+        if before and after > before * (1 + max_regression):
+            regressions.append(f"{key} latency {before:.4f}s -> {after:.4f}s (+{(after / before - 1) * 100:.1f}%)")
+
+    before, after = baseline['throughput_rps'], current['throughput_rps']
+    if before and after < before * (1 - max_regression):
+        regressions.append(f"throughput {before:.2f} -> {after:.2f} req/s ({(after / before - 1) * 100:.1f}%)")
+    return regressions
+
+def print_report(result: Dict):
+    config = result['config']
+    latency = result['latency_seconds']
+    print(f"{config['requests']} diagnoses, concurrency {config['concurrency']}, {config['cache']} caches, "
+          f"eutils latency {config['eutils_latency']}s, llm latency {config['llm_latency']}s")
+    print(f"throughput: {result['throughput_rps']:.2f} req/s  ({result['wall_seconds']:.2f}s wall)")
+    print(f"latency:    p50 {latency['p50'] * 1000:8.1f} ms  p95 {latency['p95'] * 1000:8.1f} ms  "
+          f"p99 {latency['p99'] * 1000:8.1f} ms  max {latency['max'] * 1000:8.1f} ms")
+    if result['peak_rss_mb'] is not None:
+        print(f"peak RSS:   {result['peak_rss_mb']:.1f} MiB")
+    print("stages (mean per request, share of request time):")
+    for stage, stats in result['stages'].items():
+        print(f"  {stage:<11} {stats['mean_seconds'] * 1000:8.1f} ms  {stats['share'] * 100:5.1f}%  "
+              f"({stats['calls']} calls)")
+    print(f"counters:   {result['counters']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="offline end-to-end diagnosis benchmark")
+    parser.add_argument('--requests', type=int, default=48, help="number of diagnoses to run")
+    parser.add_argument('--concurrency', type=int, default=4, help="diagnoses in flight at once")
+    parser.add_argument('--warm', action='store_true', help="share warm LLM/search/article caches across requests")
+    parser.add_argument('--eutils-latency', type=float, default=0.02, help="seconds added to every E-utilities response")
+    parser.add_argument('--llm-latency', type=float, default=0.05, help="seconds per local LLM call")
+    parser.add_argument('--llm-jitter', type=float, default=0.02, help="extra random seconds per LLM call")
+    parser.add_argument('--seed', type=int, default=0, help="local LLM jitter seed")
+    parser.add_argument('--output', help="result file (default: benchmarks/results/diagnosis-<timestamp>.json)")
+    parser.add_argument('--compare', help="baseline result file to check for regressions")
+    parser.add_argument('--max-regression', type=float, default=0.10,
+                        help="allowed slowdown vs the baseline before --compare fails (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.requests, args.concurrency, args.warm, args.eutils_latency,
+                           args.llm_latency, args.llm_jitter, seed=args.seed)
+    print_report(result)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"diagnosis-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(result, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.compare}")
+
+if __name__ == "__main__":
+    main()
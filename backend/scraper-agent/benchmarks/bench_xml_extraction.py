@@ -0,0 +1,88 @@
+# micro-benchmark: PubMed article field extraction
+# compares the old one-'.//'-search-per-field extractor with the single-pass extract_article_fields
+# on a 500-article efetch payload built from the recorded fixtures
+#
+# run from backend/scraper-agent:  python benchmarks/bench_xml_extraction.py [num_articles] [repeats]
+
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+# Add parent directory to Python path for imports
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from fixtures.eutils_server import build_large_efetch_payload
+from scrapers.pubmed_scraper import extract_article_fields
+
+def legacy_extract_article_fields(article_elem):
+
+    # previous extractor, kept here as the benchmark baseline
+
+    pmid_elem = article_elem.find('.//PMID')
+    pmid = pmid_elem.text if pmid_elem is not None else ""
+
+    title_elem = article_elem.find('.//ArticleTitle')
+    title = title_elem.text if title_elem is not None else ""
+
+    abstract_parts = []
+    for elem in article_elem.findall('.//AbstractText'):
+        if elem.text:
+            label = elem.get('Label', '')
+            abstract_parts.append(f"{label}: {elem.text}" if label else elem.text)
+    abstract = " ".join(abstract_parts) if abstract_parts else ""
+
+    authors = []
+    for author_elem in article_elem.findall('.//Author'):
+        last_name = author_elem.find('LastName')
+        first_name = author_elem.find('ForeName')
+        if last_name is not None and first_name is not None:
+            authors.append(f"{first_name.text} {last_name.text}")
+
+    pub_date = ""
+    date_elem = article_elem.find('.//PubDate')
+    if date_elem is not None:
+        year = date_elem.find('Year')
+        month = date_elem.find('Month')
+        if year is not None:
+            pub_date = year.text
+            if month is not None:
+                pub_date = f"{month.text} {pub_date}"
+
+    url = f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" if pmid else ""
+    return {'title': title, 'abstract': abstract, 'url': url, 'authors': authors,
+            'publication_date': pub_date, 'pmid': pmid}
+
+def _time_extractor(extract, article_elems, repeats: int) -> float:
+    # best-of-N wall time for extracting every article once
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for article_elem in article_elems:
+            extract(article_elem)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run_benchmark(num_articles: int = 500, repeats: int = 20):
+
+    payload = build_large_efetch_payload(num_articles)
+    article_elems = ET.fromstring(payload).findall('PubmedArticle')
+
+    # both extractors must agree on the recorded data (it has no mixed-content text)
+    for article_elem in article_elems[:10]:
+        assert extract_article_fields(article_elem) == legacy_extract_article_fields(article_elem)
+
+    legacy = _time_extractor(legacy_extract_article_fields, article_elems, repeats)
+    single_pass = _time_extractor(extract_article_fields, article_elems, repeats)
+
+    print(f"payload: {num_articles} articles, {len(payload) / 1024:.0f} KiB, best of {repeats}")
+    print(f"legacy descendant searches: {legacy * 1000:8.2f} ms  ({num_articles / legacy:10.0f} articles/s)")
+    print(f"single-pass extractor:      {single_pass * 1000:8.2f} ms  ({num_articles / single_pass:10.0f} articles/s)")
+    print(f"speedup: {legacy / single_pass:.2f}x")
+
+if __name__ == "__main__":
+    num_articles = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    run_benchmark(num_articles, repeats)
@@ -1,26 +1,95 @@
 # AI-powered keyword generation using Google Gemini API
 # replaces hardcoded keywords with intelligent, context-aware search terms
+# the model sits behind an LLMBackend (config/llm_backends.py), Gemini unless told otherwise
 
-import google.generativeai as genai
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 import os
 import json
 
+from config.llm_backends import LLMBackend, get_llm_backend
+from config.response_cache import ResponseCache, Uncached, get_default_response_cache, normalize_input
+from telemetry import count, get_logger, span
+
+logger = get_logger('llm')
+
 class AIKeywordGenerator:
 
     # uses Google Gemini to generate medical research keywords
     # based on user queries, conditions, or topics
 
-    def __init__(self, api_key: Optional[str] = None):
-        # configure Gemini API
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[ResponseCache] = None,
+                 backend: Optional[LLMBackend] = None):
+        # backend: LLM to use; default comes from LLM_BACKEND (Gemini, which needs the API key)
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
-        if not self.api_key:
-            raise ValueError("Gemini API key required. Set GEMINI_API_KEY environment variable or pass api_key parameter")
-
-        genai.configure(api_key=self.api_key)
-
-        # use Gemini 2.5 Flash for fast, efficient keyword generation
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.model = backend if backend is not None else get_llm_backend(self.api_key)
+        self.model_name = self.model.model_name
+
+        # parsed responses, shared by every generator in the process unless a cache is passed in
+        self.cache = cache if cache is not None else get_default_response_cache()
+
+    def cached_call(self, method: str, text: str, compute: Callable, num_keywords: Optional[int] = None,
+                    focus: Optional[str] = None):
+
+        # result of compute() for this (method, input, num_keywords, focus, model), from the cache
+        # when possible; identical concurrent calls share one LLM request
+        # compute should raise on a failed/unusable response so the failure isn't cached, and
+        # return Uncached(result) for a best-effort result that shouldn't be cached
+
+        key = self.cache.make_key(method, text, num_keywords, focus, self.model_name)
+        return self.cache.get_or_compute(key, compute)
+
+    def complete(self, prompt: str):
+        # one LLM call (timed as the 'llm' stage), returns the backend's response object
+        count('llm_calls')
+        with span('llm'):
+            return self.model.generate_content(prompt)
+
+    def _generate_list(self, prompt: str, limit: int):
+        # one LLM call, parsed into at most limit strings
+        # an answer that isn't a JSON array falls back to one keyword per line, returned uncached
+        response = self.complete(prompt)
+        keywords_text = response.text.strip()
+        try:
+            return self._parse_keyword_list(keywords_text, limit)
+        except ValueError:
+            keywords = self._split_keyword_lines(keywords_text, limit)
+            if not keywords:
+                raise
+            logger.warning(f"LLM response wasn't a JSON array, using its lines: {keywords_text[:80]!r}")
+            return Uncached(keywords)
+
+    @staticmethod
+    def _parse_keyword_list(keywords_text: str, limit: int) -> List[str]:
+
+        # parse a JSON array of strings out of a model response
+        # raises ValueError if there is none, or it's empty or holds anything but strings
+
+        # clean up response - remove markdown formatting
+        if '```json' in keywords_text:
+            # extract JSON from markdown code block
+            start = keywords_text.find('[')
+            end = keywords_text.rfind(']') + 1
+            if start != -1 and end != 0:
+                keywords_text = keywords_text[start:end]
+
+        # extract JSON array from response
+        if not (keywords_text.startswith('[') and keywords_text.endswith(']')):
+            raise ValueError(f"no JSON array in response: {keywords_text[:80]!r}")
+        keywords = json.loads(keywords_text)
+        if not isinstance(keywords, list) or not keywords or not all(isinstance(k, str) and k.strip() for k in keywords):
+            raise ValueError(f"expected a non-empty JSON array of strings: {keywords_text[:80]!r}")
+        return keywords[:limit]  # ensure we don't exceed requested number
+
+    @staticmethod
+    def _split_keyword_lines(keywords_text: str, limit: int) -> List[str]:
+        # fallback: split by newlines and clean up
+        lines = keywords_text.split('\n')
+        keywords = []
+        for line in lines:
+            line = line.strip().strip('"-').strip()
+            if line and not line.startswith('[') and not line.startswith(']') and not line.startswith('```'):
+                keywords.append(line)
+        return keywords[:limit]
 
     def generate_keywords(self, topic: str, num_keywords: int = 5, focus: str = "women's health") -> List[str]:
 
@@ -51,39 +120,102 @@ class AIKeywordGenerator:
         ["diabetes mellitus type 2", "insulin resistance women", "gestational diabetes", "diabetic complications female", "metformin treatment"]
         """
 
-        try: # call Gemini API to generate keywords
-            response = self.model.generate_content(prompt)
-
-            # parse the JSON response
-            keywords_text = response.text.strip()
-
-            # clean up response - remove markdown formatting
-            if '```json' in keywords_text:
-                # extract JSON from markdown code block
-                start = keywords_text.find('[')
-                end = keywords_text.rfind(']') + 1
-                if start != -1 and end != 0:
-                    keywords_text = keywords_text[start:end]
-
-            # extract JSON array from response
-            if keywords_text.startswith('[') and keywords_text.endswith(']'):
-                keywords = json.loads(keywords_text)
-                return keywords[:num_keywords]  # ensure we don't exceed requested number
-            else:
-                # fallback: split by newlines and clean up
-                lines = keywords_text.split('\n')
-                keywords = []
-                for line in lines:
-                    line = line.strip().strip('"-').strip()
-                    if line and not line.startswith('[') and not line.startswith(']') and not line.startswith('```'):
-                        keywords.append(line)
-                return keywords[:num_keywords]
+        try: # call Gemini API to generate keywords (or reuse a recent identical answer)
+            return self.cached_call('generate_keywords', topic,
+                                    lambda: self._generate_list(prompt, num_keywords),
+                                    num_keywords=num_keywords, focus=focus)
 
         except Exception as e:
-            print(f"Error generating keywords with AI: {e}")
+            logger.warning(f"Error generating keywords with AI: {e}")
             # fallback to basic keyword if AI fails
             return [f"{topic} {focus}", f"{topic} treatment", f"{topic} women"]
 
+    def generate_keywords_batch(self, topics: List[str], num_keywords: int = 5,
+                                focus: str = "women's health") -> Dict[str, List[str]]:
+
+        # generate_keywords for many topics with a single LLM call
+        # topics already in the response cache are served from it, the rest go in one request
+        # asking for a JSON object of topic -> keyword list; any topic missing or malformed in
+        # that answer falls back to its own generate_keywords call
+        # returns {topic: keywords} for every input topic
+
+        def cache_key(topic):
+            return self.cache.make_key('generate_keywords', topic, num_keywords, focus, self.model_name)
+
+        answers: Dict[str, List[str]] = {}  # normalized topic -> keywords
+        pending: Dict[str, str] = {}        # normalized topic -> topic as first given
+        for topic in topics:
+            normalized = normalize_input(topic)
+            if normalized in answers or normalized in pending:
+                continue
+            cached = self.cache.get(cache_key(topic))
+            if cached is not None:
+                answers[normalized] = cached
+            else:
+                pending[normalized] = topic
+
+        if len(pending) == 1: # nothing to batch
+            normalized, topic = pending.popitem()
+            answers[normalized] = self.generate_keywords(topic, num_keywords, focus)
+
+        if pending:
+            prompt = f"""
+        You are a medical research expert helping to find relevant scientific literature.
+
+        For EACH of these topics, generate {num_keywords} specific, targeted keywords for searching PubMed database:
+        {json.dumps(list(pending.values()))}
+
+        Focus area: {focus}
+
+        Requirements:
+        - Keywords should be precise medical/scientific terms
+        - Suitable for PubMed searches (use standard medical terminology)
+        - Include both broad and specific terms
+        - Prioritize terms that would find high-quality research papers
+        - Consider synonyms, related conditions, and treatment approaches
+
+        Return ONLY a JSON object mapping each topic, exactly as written above, to a JSON array of strings, no other text:
+        {{"topic 1": ["keyword1", "keyword2", ...], "topic 2": ["keyword1", "keyword2", ...]}}
+        """
+
+            try:
+                response = self.complete(prompt)
+                batch = self._parse_keyword_map(response.text.strip(), num_keywords)
+            except Exception as e:
+                logger.warning(f"Error generating batch keywords with AI: {e}")
+                batch = {}
+
+            for normalized, topic in pending.items():
+                keywords = batch.get(normalized)
+                if keywords:
+                    self.cache.put(cache_key(topic), keywords)
+                    answers[normalized] = keywords
+                else: # missing or malformed for this topic
+                    answers[normalized] = self.generate_keywords(topic, num_keywords, focus)
+
+        # topics differing only in case/spacing share one answer
+        return {topic: list(answers[normalize_input(topic)]) for topic in topics}
+
+    @staticmethod
+    def _parse_keyword_map(response_text: str, limit: int) -> Dict[str, List[str]]:
+
+        # parse a JSON object of topic -> list of strings out of a model response
+        # keys are normalized; entries that aren't a non-empty list of non-blank strings are dropped
+
+        start = response_text.find('{')
+        end = response_text.rfind('}') + 1
+        if start == -1 or end == 0:
+            return {}
+        data = json.loads(response_text[start:end])
+        if not isinstance(data, dict):
+            return {}
+
+        keyword_map = {}
+        for topic, keywords in data.items():
+            if isinstance(keywords, list) and keywords and all(isinstance(k, str) and k.strip() for k in keywords):
+                keyword_map[normalize_input(topic)] = keywords[:limit]
+        return keyword_map
+
     def generate_condition_keywords(self, condition: str, num_keywords: int = 8) -> List[str]:
 
         # generate comprehensive keywords for a specific medical condition
@@ -107,31 +239,12 @@ class AIKeywordGenerator:
         """
 
         try:
-            response = self.model.generate_content(prompt)
-            keywords_text = response.text.strip()
-
-            # clean up response - remove markdown formatting
-            if '```json' in keywords_text:
-                start = keywords_text.find('[')
-                end = keywords_text.rfind(']') + 1
-                if start != -1 and end != 0:
-                    keywords_text = keywords_text[start:end]
-
-            if keywords_text.startswith('[') and keywords_text.endswith(']'):
-                keywords = json.loads(keywords_text)
-                return keywords[:num_keywords]
-            else:
-                # fallback parsing
-                lines = keywords_text.split('\n')
-                keywords = []
-                for line in lines:
-                    line = line.strip().strip('"-').strip()
-                    if line and not line.startswith('[') and not line.startswith(']') and not line.startswith('```'):
-                        keywords.append(line)
-                return keywords[:num_keywords]
+            return self.cached_call('generate_condition_keywords', condition,
+                                    lambda: self._generate_list(prompt, num_keywords),
+                                    num_keywords=num_keywords)
 
         except Exception as e:
-            print(f"Error generating condition keywords: {e}")
+            logger.warning(f"Error generating condition keywords: {e}")
             return [f"{condition} diagnosis", f"{condition} treatment", f"{condition} women", f"{condition} symptoms"]
 
     def expand_search_query(self, user_query: str, max_keywords: int = 3) -> List[str]:
@@ -156,31 +269,12 @@ class AIKeywordGenerator:
         """
 
         try:
-            response = self.model.generate_content(prompt)
-            keywords_text = response.text.strip()
-
-            # clean up response - remove markdown formatting
-            if '```json' in keywords_text:
-                start = keywords_text.find('[')
-                end = keywords_text.rfind(']') + 1
-                if start != -1 and end != 0:
-                    keywords_text = keywords_text[start:end]
-
-            if keywords_text.startswith('[') and keywords_text.endswith(']'):
-                keywords = json.loads(keywords_text)
-                return keywords[:max_keywords]
-            else:
-                # fallback parsing
-                lines = keywords_text.split('\n')
-                keywords = []
-                for line in lines:
-                    line = line.strip().strip('"-').strip()
-                    if line and not line.startswith('[') and not line.startswith(']') and not line.startswith('```'):
-                        keywords.append(line)
-                return keywords[:max_keywords]
+            return self.cached_call('expand_search_query', user_query,
+                                    lambda: self._generate_list(prompt, max_keywords),
+                                    num_keywords=max_keywords)
 
         except Exception as e:
-            print(f"Error expanding search query: {e}")
+            logger.warning(f"Error expanding search query: {e}")
             # simple fallback
             return [user_query]
 
@@ -194,5 +288,5 @@ def get_ai_keywords(topic: str, api_key: Optional[str] = None, num_keywords: int
         generator = AIKeywordGenerator(api_key)
         return generator.generate_keywords(topic, num_keywords)
     except Exception as e:
-        print(f"AI keyword generation failed: {e}")
+        logger.warning(f"AI keyword generation failed: {e}")
         return [topic]  # fallback to original topic
\ No newline at end of file
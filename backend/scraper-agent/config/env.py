@@ -0,0 +1,28 @@
+# numeric settings from the environment
+# a malformed or out-of-range value logs a warning and falls back to that setting's default,
+# so one typo in a deployment's environment can't take the diagnosis path down
+
+import os
+from typing import Callable, Optional, TypeVar
+from telemetry import get_logger
+
+logger = get_logger('config')
+
+Number = TypeVar('Number', int, float)
+
+def env_number(name: str, parse: Callable[[str], Number], default: Number,
+               minimum: Optional[Number] = None) -> Number:
+
+    # parse (int or float) the variable's value, default if it's unset, empty or unusable
+
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        number = parse(value)
+    except ValueError:
+        number = None
+    if number is None or number != number or (minimum is not None and number < minimum): # NaN too
+        logger.warning(f"Ignoring {name}={value!r}, using {default}")
+        return default
+    return number
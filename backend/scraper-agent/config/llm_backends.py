@@ -0,0 +1,192 @@
+# LLM providers behind AIKeywordGenerator and DiagnosticAssistant
+# every backend answers generate_content(prompt) with an object that has .text, the same
+# shape as a google.generativeai GenerativeModel, so callers don't care which one they get
+#   GeminiBackend    the real Gemini model (default)
+#   LocalLLMBackend  deterministic rule-based JSON answers with optional latency and error
+#                    injection, for load tests and benchmarks on an offline box
+# LLM_BACKEND=local switches every generator in the process to the local backend
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from config.env import env_number
+
+DEFAULT_GEMINI_MODEL = 'gemini-2.5-flash'  # fast, efficient keyword generation
+
+class LLMResponse:
+    # minimal response object, .text like Gemini's
+    def __init__(self, text: str):
+        self.text = text
+
+class LLMBackendError(RuntimeError):
+    # a backend call failed (the local backend raises it for injected errors)
+    pass
+
+class LLMBackend(ABC):
+
+    # model_name identifies the backend/model in response cache keys
+
+    model_name: str = ''
+
+    @abstractmethod
+    def generate_content(self, prompt: str):
+        # returns an object with a .text attribute holding the model's answer
+        pass
+
+class GeminiBackend(LLMBackend):
+
+    # Google Gemini through google.generativeai
+
+    def __init__(self, api_key: Optional[str] = None, model_name: str = DEFAULT_GEMINI_MODEL):
+        api_key = api_key or os.getenv('GEMINI_API_KEY')
+        if not api_key:
+            raise ValueError("Gemini API key required. Set GEMINI_API_KEY environment variable or pass api_key parameter")
+
+        import google.generativeai as genai  # only needed when Gemini is actually used
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate_content(self, prompt: str):
+        return self.model.generate_content(prompt)
+
+# rule-based answers of the local backend: symptom phrase -> likely conditions
+LOCAL_SYMPTOM_CONDITIONS = {
+    'irregular periods': ['PCOS', 'thyroid disorders', 'hormonal imbalance'],
+    'pelvic pain': ['endometriosis', 'ovarian cysts', 'pelvic inflammatory disease'],
+    'heavy bleeding': ['uterine fibroids', 'endometriosis', 'adenomyosis'],
+    'heavy menstrual bleeding': ['uterine fibroids', 'adenomyosis', 'endometriosis'],
+    'weight gain': ['PCOS', 'thyroid disorders', 'insulin resistance'],
+    'acne': ['PCOS', 'hormonal imbalance', 'androgen excess'],
+    'fatigue': ['thyroid disorders', 'anemia', 'chronic fatigue syndrome'],
+    'chest pain': ['peripartum cardiomyopathy', 'pulmonary embolism', 'anxiety'],
+    'shortness of breath': ['pulmonary embolism', 'anemia', 'peripartum cardiomyopathy'],
+    'hot flashes': ['menopause', 'thyroid disorders', 'hormonal imbalance'],
+    'mood changes': ['hormonal imbalance', 'PMDD', 'thyroid disorders']
+}
+LOCAL_DEFAULT_CONDITIONS = ['hormonal imbalance', 'thyroid disorders', 'PCOS', 'endometriosis', 'anemia']
+LOCAL_KEYWORD_SUFFIXES = ['', 'women', 'diagnosis', 'treatment', 'risk factors', 'prevalence',
+                          'pathophysiology', 'clinical outcomes', 'management', 'epidemiology']
+
+_COUNT_RE = re.compile(r'\b(?:generate|into)\s+(\d+)\b', re.IGNORECASE)
+_QUOTED_RE = re.compile(r':\s*"([^"]+)"')
+
+class LocalLLMBackend(LLMBackend):
+
+    # deterministic offline stand-in for Gemini
+    # recognizes the prompts this codebase sends (potential conditions, keywords for one topic,
+    # keywords for a batch of topics) and answers with rule-based JSON
+    # responses: {prompt substring: canned answer}, checked first
+    # latency/jitter (seconds) are slept per call; error_rate is the chance a call raises
+    # LLMBackendError; the same seed gives the same sequence of delays and failures
+
+    model_name = 'local-rules'
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 seed: int = 0, responses: Optional[Dict[str, str]] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.responses = responses or {}
+
+        self.calls = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str) -> LLMResponse:
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise LLMBackendError("injected local backend failure")
+        return LLMResponse(self.answer(prompt))
+
+    def answer(self, prompt: str) -> str:
+
+        # the rule-based answer for a prompt, without latency or errors
+
+        for marker, text in self.responses.items():
+            if marker in prompt:
+                return text
+
+        count_match = _COUNT_RE.search(prompt)
+        count = int(count_match.group(1)) if count_match else 5
+
+        if 'For EACH of these topics' in prompt:
+            topics = self._prompt_json_list(prompt, prompt.index('For EACH of these topics'))
+            return json.dumps({topic: self._keywords(topic, count) for topic in topics})
+
+        if 'Symptoms:' in prompt:
+            symptoms = _QUOTED_RE.search(prompt[prompt.index('Symptoms:'):])
+            return json.dumps(self._conditions(symptoms.group(1) if symptoms else ''))
+
+        topic = _QUOTED_RE.search(prompt)
+        if topic:
+            return json.dumps(self._keywords(topic.group(1), count))
+        return '[]'
+
+    @staticmethod
+    def _prompt_json_list(prompt: str, start: int) -> List[str]:
+        # first JSON array in the prompt after start
+        start = prompt.index('[', start)
+        topics, _ = json.JSONDecoder().raw_decode(prompt, start)
+        return topics
+
+    @staticmethod
+    def _keywords(topic: str, count: int) -> List[str]:
+        topic = ' '.join(topic.split())
+        keywords = []
+        for suffix in LOCAL_KEYWORD_SUFFIXES:
+            if suffix and suffix in topic.lower():
+                continue
+            keywords.append(f"{topic} {suffix}".strip())
+        return keywords[:count]
+
+    @staticmethod
+    def _conditions(symptoms: str) -> List[str]:
+        symptoms = symptoms.lower()
+        conditions = []
+        for symptom, candidates in LOCAL_SYMPTOM_CONDITIONS.items():
+            if symptom in symptoms:
+                conditions.extend(c for c in candidates if c not in conditions)
+        conditions.extend(c for c in LOCAL_DEFAULT_CONDITIONS if c not in conditions)
+        return conditions[:5]
+
+    def get_stats(self):
+        return {'calls': self.calls, 'errors': self.errors}
+
+def configured_backend() -> str:
+    # backend name from LLM_BACKEND: 'gemini' (default) or 'local'
+    return os.getenv('LLM_BACKEND', 'gemini').strip().lower() or 'gemini'
+
+def get_llm_backend(api_key: Optional[str] = None) -> LLMBackend:
+
+    # build the backend selected by LLM_BACKEND
+    # local backend settings: LOCAL_LLM_LATENCY, LOCAL_LLM_JITTER (seconds),
+    # LOCAL_LLM_ERROR_RATE (clamped to 0-1), LOCAL_LLM_SEED; a malformed value uses its default
+
+    name = configured_backend()
+    if name == 'local':
+        return LocalLLMBackend(
+            latency=env_number('LOCAL_LLM_LATENCY', float, 0.0, minimum=0.0),
+            jitter=env_number('LOCAL_LLM_JITTER', float, 0.0, minimum=0.0),
+            error_rate=min(max(env_number('LOCAL_LLM_ERROR_RATE', float, 0.0), 0.0), 1.0),
+            seed=env_number('LOCAL_LLM_SEED', int, 0)
+        )
+    if name == 'gemini':
+        return GeminiBackend(api_key)
+    raise ValueError(f"Unknown LLM_BACKEND '{name}', expected 'gemini' or 'local'")
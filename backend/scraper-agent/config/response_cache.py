@@ -0,0 +1,220 @@
+# LLM response cache: (method, normalized input, num_keywords, focus, model) -> parsed result
+# keyword/condition prompts repeat constantly ("PCOS diagnosis symptoms women" seconds apart),
+# and LLM latency dominates request time, so parsed responses are kept for a while
+# bounded in-memory LRU with a TTL, optionally backed by SQLite so worker processes share results
+# concurrent identical requests are single-flighted: one LLM call, every caller gets its result
+
+import os
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from config.env import env_number
+from telemetry import count, get_logger
+
+logger = get_logger('llm')
+
+DEFAULT_RESPONSE_TTL = 24 * 3600    # keyword suggestions for a topic don't go stale quickly
+DEFAULT_RESPONSE_MAX_ENTRIES = 1024
+
+def normalize_input(text: str) -> str:
+    # casing and extra whitespace don't change what the model is asked
+    return ' '.join(str(text).lower().split())
+
+class Uncached:
+
+    # wraps a compute() result that callers should get but the cache shouldn't keep
+    # (e.g. a best-effort parse of a malformed response)
+
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+class _Flight:
+    # one in-progress computation that other callers wait on
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+class ResponseCache:
+
+    # thread-safe LRU of JSON-serializable LLM results with a TTL
+    # with a path, misses fall through to a SQLite table shared by every process using that file
+
+    def __init__(self, ttl: float = DEFAULT_RESPONSE_TTL, max_entries: int = DEFAULT_RESPONSE_MAX_ENTRIES,
+                 path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0  # callers served by another caller's in-flight request
+
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if path:
+            if path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            with self._conn:
+                if path != ':memory:':
+                    self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    " key TEXT PRIMARY KEY,"
+                    " value TEXT NOT NULL,"
+                    " created_at REAL NOT NULL)"
+                )
+
+    @staticmethod
+    def make_key(method: str, text: str, num_keywords: Optional[int] = None,
+                 focus: Optional[str] = None, model: Optional[str] = None) -> str:
+        return json.dumps([method, normalize_input(text), num_keywords, focus, model])
+
+    def get(self, key: str) -> Optional[Any]:
+
+        # cached result for a key from make_key, or None on a miss / expired entry
+
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+                count('llm_cache_hits')
+                return value
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any):
+
+        # store a result (must be JSON-serializable)
+
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(value), now)
+                    )
+                    self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+
+        # cached result, or compute() it once even if many threads ask at the same time
+        # if compute raises, the error goes to every caller waiting on it and nothing is cached;
+        # an Uncached(value) result is handed to every waiting caller but not cached either
+
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+                count('llm_cache_hits')
+                return value
+            self.misses += 1
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            with self._lock:
+                self.shared += 1
+            count('llm_cache_shared')
+            if flight.error is not None:
+                raise flight.error
+            return json.loads(json.dumps(flight.result))  # callers never share a mutable result
+
+        try:
+            result = compute()
+            if isinstance(result, Uncached):
+                flight.result = result.value
+            else:
+                flight.result = result
+                self.put(key, result)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def _lookup(self, key: str) -> Optional[Any]:
+        # memory, then SQLite; returns a fresh copy so callers can't mutate cached values (lock held)
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and now - entry[0] <= self.ttl:
+            self._entries.move_to_end(key)
+            return json.loads(entry[1])
+
+        if entry is not None: # expired
+            del self._entries[key]
+
+        if self._conn is not None:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] <= self.ttl:
+                value = json.loads(row[0])
+                self._remember(key, row[1], value)
+                return value
+        return None
+
+    def _remember(self, key: str, created_at: float, value: Any):
+        # add to the in-memory LRU (stored serialized), dropping the oldest entries above the cap (lock held)
+        self._entries[key] = (created_at, json.dumps(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM responses")
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'shared_in_flight': self.shared,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'entries': len(self._entries)
+        }
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+def get_default_response_cache() -> ResponseCache:
+
+    # process-wide response cache, so every AIKeywordGenerator (scraper, diagnosis) shares it
+    # LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES,
+    # LLM_CACHE_PATH (optional SQLite file shared across worker processes)
+    # a malformed number falls back to that setting's default
+
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            ttl = env_number('LLM_CACHE_TTL', float, DEFAULT_RESPONSE_TTL)
+            max_entries = env_number('LLM_CACHE_MAX_ENTRIES', int, DEFAULT_RESPONSE_MAX_ENTRIES, minimum=1)
+            path = os.getenv('LLM_CACHE_PATH') or None
+            try:
+                _default_cache = ResponseCache(ttl, max_entries, path)
+            except (sqlite3.Error, OSError) as e: # fall back to a process-local cache
+                logger.warning(f"Persistent LLM response cache unavailable: {e}")
+                _default_cache = ResponseCache(ttl, max_entries)
+        return _default_cache
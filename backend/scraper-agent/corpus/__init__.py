@@ -0,0 +1,6 @@
+# local article corpus built from PubMed baseline/update files
+# lets common conditions be served without live E-utilities calls
+
+from .ingest import ingest_baseline, iter_corpus
+
+__all__ = ["ingest_baseline", "iter_corpus"]
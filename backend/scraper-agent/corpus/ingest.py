@@ -0,0 +1,272 @@
+# bulk ingestion of PubMed baseline/update files (pubmedXXnXXXX.xml.gz) into a local corpus
+# each input file is stream-parsed with the same extraction as PubMedScraper, cleaned and
+# scored with TextProcessor, and written as one gzipped JSON-lines shard
+# update files revise articles and delete others (<DeleteCitation>): each shard holds one record
+# per PMID, its deletions (and revisions dropped by --min-relevance) go next to it, and iter_corpus
+# yields only the latest version of every article that wasn't deleted or filtered out afterwards
+# (files are applied in name order, like PubMed's)
+# files are processed in parallel by a multiprocessing pool, memory stays bounded per worker,
+# and finished files are recorded in a manifest so an interrupted run picks up where it stopped
+#
+# usage (from backend/scraper-agent):
+#   python corpus/ingest.py /data/pubmed/baseline --out /data/medisyn-corpus --workers 8
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Add parent directory to Python path for imports
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from scrapers.pubmed_scraper import PubMedScraper, PubMedStreamParser, STREAM_CHUNK_SIZE
+from processing.text_processor import TextProcessor
+
+MANIFEST_NAME = 'manifest.json'
+PMID_BITMAP_LIMIT = 1 << 28  # 32 MB of bits at most, PubMed is at ~40M
+
+# per-process state, built once in each pool worker
+_worker_scraper: Optional[PubMedScraper] = None
+_worker_processor: Optional[TextProcessor] = None
+
+def _init_worker():
+    global _worker_scraper, _worker_processor
+    _worker_scraper = PubMedScraper(offline=True)  # only used for parsing, never hits the network
+    _worker_processor = TextProcessor()
+
+def _shard_path(out_dir: str, input_path: str) -> str:
+    name = os.path.basename(input_path)
+    for suffix in ('.gz', '.xml'):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    return os.path.join(out_dir, f"{name}.jsonl.gz")
+
+def _deleted_path(shard: str) -> str:
+    return shard[:-len('.jsonl.gz')] + '.deleted.json'
+
+def _iter_file_batches(input_path: str, parser: PubMedStreamParser) -> Iterator[List[Dict]]:
+    # stream one baseline file (gzipped or plain XML) and yield the articles closed by each chunk
+    # (its deletions end up in parser.deleted)
+    opener = gzip.open if input_path.endswith('.gz') else open
+    with opener(input_path, 'rb') as f:
+        while True:
+            chunk = f.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            batch = parser.feed(chunk)
+            if batch:
+                yield batch
+    batch = parser.close()
+    if batch:
+        yield batch
+
+def _ingest_file(task: Tuple[str, str, float]) -> Tuple[str, int, int, int, float]:
+
+    # worker: parse, clean and score one input file into its corpus shard
+    # articles are scored a parsed chunk at a time with TextProcessor.score_batch
+    # writes to a temp file and renames, so a shard either exists complete or not at all
+    # PMIDs this file hides from older shards (deleted, or latest version below min_relevance)
+    # go to a .deleted.json next to the shard, written first
+    # returns (input path, records seen, records kept, PMIDs deleted, seconds)
+
+    input_path, out_dir, min_relevance = task
+    start = time.perf_counter()
+    shard = _shard_path(out_dir, input_path)
+    tmp_path = shard + '.tmp'
+    parser = PubMedStreamParser(_worker_scraper)
+
+    seen = kept = 0
+    latest: Dict[str, Optional[int]] = {}  # pmid -> line of its latest record in this file, None if filtered out
+    with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as out:
+        for batch in _iter_file_batches(input_path, parser):
+            seen += len(batch)
+            for article, relevance in zip(batch, _worker_processor.score_batch(batch)):
+                pmid = article.get('pmid')
+                if not pmid: # can't be revised or deleted later, or told apart from other such records
+                    continue
+                if relevance < min_relevance: # the revision still replaces any older version
+                    latest[pmid] = None
+                    continue
+
+                article['clean_abstract'] = _worker_processor.clean_abstract(article['abstract'])
+                article['relevance_score'] = relevance
+                out.write(json.dumps(article, separators=(',', ':')) + '\n')
+                latest[pmid] = kept
+                kept += 1
+
+    # a PMID revised later in the same file, or deleted by it, keeps no earlier record (rare,
+    # so the shard is only rewritten when it happens)
+    deleted = set(parser.deleted)
+    hidden = deleted.union(pmid for pmid, line in latest.items() if line is None)
+    kept_lines = {line for pmid, line in latest.items() if line is not None and pmid not in deleted}
+    if len(kept_lines) < kept:
+        with gzip.open(tmp_path, 'rt', encoding='utf-8') as f, \
+                gzip.open(tmp_path + '2', 'wt', encoding='utf-8', compresslevel=6) as out:
+            for line_no, line in enumerate(f):
+                if line_no in kept_lines:
+                    out.write(line)
+        os.replace(tmp_path + '2', tmp_path)
+        kept = len(kept_lines)
+
+    if hidden:
+        with open(_deleted_path(shard) + '.tmp', 'w') as f:
+            json.dump(sorted(hidden), f)
+        os.replace(_deleted_path(shard) + '.tmp', _deleted_path(shard))
+    os.replace(tmp_path, shard)
+    return input_path, seen, kept, len(deleted), time.perf_counter() - start
+
+def _load_manifest(out_dir: str) -> Dict:
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {'completed': {}}
+
+def _save_manifest(out_dir: str, manifest: Dict):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+def _expand_inputs(inputs: List[str]) -> List[str]:
+    # accept files or directories of pubmed*.xml.gz files, in sorted order
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.xml.gz')) + glob.glob(os.path.join(path, '*.xml'))))
+        else:
+            files.append(path)
+    return files
+
+def ingest_baseline(inputs: List[str], out_dir: str, workers: Optional[int] = None,
+                    min_relevance: float = 0.0) -> Dict:
+
+    # ingest PubMed baseline/update files into out_dir
+    # already completed files (per the manifest) are skipped, so re-running resumes
+    # returns a summary with record counts and records/sec
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _load_manifest(out_dir)
+
+    all_files = _expand_inputs(inputs)
+    pending = [path for path in all_files if os.path.basename(path) not in manifest['completed']]
+    skipped = len(all_files) - len(pending)
+
+    print(f"Ingesting {len(pending)} files into {out_dir} ({skipped} already done)")
+
+    total_seen = total_kept = total_deleted = 0
+    start = time.perf_counter()
+    tasks = [(path, out_dir, min_relevance) for path in pending]
+
+    if tasks:
+        with Pool(processes=workers or os.cpu_count(), initializer=_init_worker) as pool:
+            for input_path, seen, kept, deleted, seconds in pool.imap_unordered(_ingest_file, tasks):
+                total_seen += seen
+                total_kept += kept
+                total_deleted += deleted
+
+                # record progress right away so an interruption loses at most the in-flight files
+                manifest['completed'][os.path.basename(input_path)] = {
+                    'shard': os.path.basename(_shard_path(out_dir, input_path)),
+                    'records': seen,
+                    'kept': kept,
+                    'deleted': deleted
+                }
+                _save_manifest(out_dir, manifest)
+
+                elapsed = time.perf_counter() - start
+                print(f"{os.path.basename(input_path)}: {seen} records in {seconds:.1f}s "
+                      f"(total {total_seen}, {total_seen / elapsed:.0f} records/sec)")
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        'files': len(pending),
+        'skipped_files': skipped,
+        'records': total_seen,
+        'kept': total_kept,
+        'deleted': total_deleted,
+        'seconds': round(elapsed, 2),
+        'records_per_sec': round(total_seen / elapsed, 1) if elapsed > 0 else 0.0
+    }
+    print(f"Done: {summary}")
+    return summary
+
+class _PMIDSet:
+
+    # set of PMIDs for a whole-corpus pass: numeric PMIDs (all of PubMed's) are bits in a
+    # bytearray, ~5 MB for 40M PMIDs; anything else (or implausibly large) goes in a regular set
+
+    def __init__(self):
+        self._bits = bytearray()
+        self._other = set()
+
+    def add(self, pmid: str):
+        n = self._bit(pmid)
+        if n is not None:
+            if n >> 3 >= len(self._bits): # grow by doubling
+                size = min(max((n >> 3) + 1, 2 * len(self._bits)), PMID_BITMAP_LIMIT >> 3)
+                self._bits.extend(bytes(size - len(self._bits)))
+            self._bits[n >> 3] |= 1 << (n & 7)
+        else:
+            self._other.add(pmid)
+
+    @staticmethod
+    def _bit(pmid: str) -> Optional[int]:
+        if pmid.isdigit() and len(pmid) < 10:
+            n = int(pmid)
+            if n < PMID_BITMAP_LIMIT:
+                return n
+        return None
+
+    def __contains__(self, pmid: str) -> bool:
+        n = self._bit(pmid)
+        if n is not None:
+            return n >> 3 < len(self._bits) and bool(self._bits[n >> 3] & (1 << (n & 7)))
+        return pmid in self._other
+
+def iter_corpus(corpus_dir: str) -> Iterator[Dict]:
+
+    # yield the current version of every article in a corpus built by ingest_baseline
+    # shards are read newest first: a PMID already yielded from a newer shard, or deleted (or
+    # filtered out) by a newer or its own update file, is skipped, so revisions win and deletions stick
+
+    manifest = _load_manifest(corpus_dir)
+    done = _PMIDSet()
+    for source in sorted(manifest['completed'], reverse=True):
+        shard = os.path.join(corpus_dir, manifest['completed'][source]['shard'])
+        deleted_path = _deleted_path(shard)
+        if os.path.exists(deleted_path):
+            with open(deleted_path) as f:
+                for pmid in json.load(f):
+                    done.add(pmid)
+
+        with gzip.open(shard, 'rt', encoding='utf-8') as f:
+            for line in f:
+                article = json.loads(line)
+                pmid = article.get('pmid') or ''
+                if pmid:
+                    if pmid in done:
+                        continue
+                    done.add(pmid)  # shards hold one record per PMID
+                yield article
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest PubMed baseline/update XML files into a local corpus")
+    parser.add_argument('inputs', nargs='+', help="pubmed*.xml.gz files or directories containing them")
+    parser.add_argument('--out', required=True, help="corpus output directory")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--min-relevance', type=float, default=0.0,
+                        help="drop articles below this women's health relevance score")
+    args = parser.parse_args()
+
+    ingest_baseline(args.inputs, args.out, args.workers, args.min_relevance)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 # AI-powered diagnostic assistance using research data
 # analyzes symptoms and returns probable diagnoses with certainty scores
 
-import re
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional, Sequence, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import heapq
 import sys
 import os
 
@@ -13,92 +14,216 @@ if parent_dir not in sys.path:
 
 from main import ResearchScraper
 from config.ai_keywords import AIKeywordGenerator
+from config.llm_backends import LLMBackend
+from processing.keyword_matcher import KeywordMatcher
+from processing.analyzed_document import AnalyzedDocument, AnalysisCache
+from telemetry import bind, get_logger, request, span
+
+logger = get_logger('diagnosis')
+
+def _max_concurrent_conditions_from_env(default: int = 3) -> int:
+    # DIAGNOSIS_MAX_CONCURRENT_CONDITIONS, a bad value falls back to the default instead of breaking the import
+    value = os.getenv('DIAGNOSIS_MAX_CONCURRENT_CONDITIONS')
+    if not value:
+        return default
+    try:
+        parsed = int(value)
+    except ValueError:
+        parsed = 0
+    if parsed < 1:
+        logger.warning(f"Ignoring DIAGNOSIS_MAX_CONCURRENT_CONDITIONS={value!r}, using {default}")
+        return default
+    return parsed
+
+# default number of conditions researched in parallel
+# PubMed allows 3 requests/sec without an API key
+DEFAULT_MAX_CONCURRENT_CONDITIONS = _max_concurrent_conditions_from_env()
+
+# certainty scoring tables, each with a keyword matcher built once at import
+
+# More specific conditions get slightly lower base scores to reflect clinical reality
+SPECIFICITY_PENALTIES = {
+    'peripartum cardiomyopathy': 0.05,  # rare, specific
+    'takotsubo cardiomyopathy': 0.10,   # very rare
+    'spontaneous coronary artery dissection': 0.15,  # very rare
+    'pulmonary embolism': 0.02,         # serious but not extremely rare
+    'anxiety': 0.0,                     # common
+    'panic disorder': 0.0               # common
+}
+
+SEVERITY_KEYWORDS = ['chest pain', 'shortness of breath', 'severe', 'acute', 'sudden onset']
+
+CONDITION_MODIFIERS = {
+    'anxiety': -0.1,  # common condition, reduce certainty
+    'panic': -0.1,    # common condition, reduce certainty
+    'cardiomyopathy': 0.05,  # serious cardiac condition
+    'embolism': 0.05,        # serious vascular condition
+}
+
+_SPECIFICITY_MATCHER = KeywordMatcher(SPECIFICITY_PENALTIES)
+_SEVERITY_MATCHER = KeywordMatcher(SEVERITY_KEYWORDS)
+_MODIFIER_MATCHER = KeywordMatcher(CONDITION_MODIFIERS)
 
 class DiagnosticAssistant:
 
     # uses AI + research scraper to suggest diagnoses based on symptoms
 
-    def __init__(self, gemini_api_key: str):
-        self.scraper = ResearchScraper(gemini_api_key=gemini_api_key)
-        self.ai_keywords = AIKeywordGenerator(gemini_api_key)
+    def __init__(self, gemini_api_key: Optional[str] = None,
+                 max_concurrent_conditions: int = DEFAULT_MAX_CONCURRENT_CONDITIONS,
+                 llm_backend: Optional[LLMBackend] = None):
+        # llm_backend: LLM for conditions and keywords (default from LLM_BACKEND, see config/llm_backends.py)
+        # the scraper shares the same keyword generator, so there's one model and one response cache
+        self.ai_keywords = AIKeywordGenerator(gemini_api_key, backend=llm_backend)
+        self.scraper = ResearchScraper(gemini_api_key=gemini_api_key, ai_keywords=self.ai_keywords)
+
+        # how many conditions are researched at once
+        # every condition makes several PubMed calls, so keep this near the PubMed rate budget
+        self.max_concurrent_conditions = max(1, max_concurrent_conditions)
+
+        # tokens/sentences of symptom descriptions and abstracts, shared across conditions
+        self.analysis_cache = AnalysisCache()
 
     def analyze_symptoms(self, symptom_description: str, max_diagnoses: int = 5) -> List[Dict]:
 
         # analyze symptoms and return probable diagnoses with certainty scores
         # diagnoses, certainty scores, supporting evidence, and research summaries
+        # measured as one 'diagnosis' request unless the caller already opened one
+
+        diagnoses = []
+        with request('diagnosis'):
+            for event in self.analyze_symptoms_stream(symptom_description, max_diagnoses):
+                if event['event'] == 'summary':
+                    diagnoses = event['diagnoses']
+        return diagnoses
+
+    def analyze_symptoms_stream(self, symptom_description: str, max_diagnoses: int = 5) -> Iterator[Dict]:
+
+        # same analysis as analyze_symptoms, as a stream of events:
+        #   {'event': 'conditions', 'conditions': [...]}               AI-suggested conditions
+        #   {'event': 'condition', 'condition', 'completed', 'total',
+        #    'diagnosis': record or None}                              each condition as soon as it's scored
+        #   {'event': 'summary', 'diagnoses': [...]}                   final relative ranking, top max_diagnoses
+        # per-condition records carry the raw certainty score; the summary has the ranked ones
+        # stage timings go to the caller's telemetry.request scope, if any
 
-        print(f"Analyzing symptoms: '{symptom_description}'")
+        logger.info(f"Analyzing symptoms: '{symptom_description}'")
 
         # 1. generate potential conditions using AI
         potential_conditions = self._generate_potential_conditions(symptom_description)
-        print(f"AI suggested conditions: {potential_conditions}")
-
-        # 2. research each potential condition
-        diagnosis_results = []
-
-        # for each condition, search for research articles and analyze relevance
-        for condition in potential_conditions:
-            print(f"\nResearching: {condition}")
-
-            # get research articles for this condition (reduced for speed)
-            research_query = f"{condition} diagnosis symptoms women"
-            articles = self.scraper.search_with_ai(research_query, max_results=2)  # Reduced from 5 to 2
-
-            if articles:
-                # analyze how well symptoms match this condition
-                certainty_score = self._calculate_certainty_score(
-                    symptom_description, condition, articles
-                )
-
-                # extract supporting evidence
-                supporting_evidence = self._extract_supporting_evidence(
-                    symptom_description, articles
-                )
-
-                # get key findings
-                key_findings = self._extract_key_findings(articles)
-
-                # get medication recommendations
-                try:
-                    medication_recommendations = self._generate_medication_recommendations(
-                        condition, symptom_description
-                    )
-                    if not medication_recommendations:
-                        # Fallback to default if AI fails
-                        medication_recommendations = self._get_default_medications(condition)
-                except Exception as e:
-                    print(f"Error generating AI medications for {condition}: {e}")
-                    # Use default medications as fallback
-                    medication_recommendations = self._get_default_medications(condition)
-
-                # compile results
-                diagnosis_results.append({
-                    'diagnosis': condition,
-                    'certainty_score': certainty_score,
-                    'supporting_evidence': supporting_evidence,
-                    'research_articles': len(articles),
-                    'key_findings': key_findings,
-                    'medication_recommendations': medication_recommendations
-                })
-
-                print(f"{condition}: {certainty_score:.2f} certainty")
-            else: # no articles found
-                print(f"No research found for {condition}")
-
-        # 3. Apply relative ranking to avoid multiple 100% certainties
-        diagnosis_results = self._apply_relative_ranking(diagnosis_results)
-
-        # 4. sort by certainty score and return top results
-        diagnosis_results.sort(key=lambda x: x['certainty_score'], reverse=True)
-
-        print(f"\nTop {max_diagnoses} probable diagnoses:")
+        logger.info(f"AI suggested conditions: {potential_conditions}")
+        yield {'event': 'conditions', 'conditions': list(potential_conditions)}
+
+        # 2. search keywords for every condition, in one AI round-trip
+        research_queries = [self._research_query(condition) for condition in potential_conditions]
+        query_keywords = self.ai_keywords.generate_keywords_batch(research_queries, num_keywords=3)
+
+        # 3. research each potential condition concurrently, reporting each one as it finishes
+        # results are kept in AI-suggested order so ranking stays deterministic
+        results: List[Optional[Dict]] = [None] * len(potential_conditions)
+
+        workers = max(1, min(self.max_concurrent_conditions, len(potential_conditions)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    bind(self._research_condition), symptom_description, condition,
+                    query_keywords.get(self._research_query(condition))
+                ): index
+                for index, condition in enumerate(potential_conditions)
+            }
+            for completed, future in enumerate(as_completed(futures), 1):
+                index = futures[future]
+                results[index] = future.result()
+                yield {
+                    'event': 'condition',
+                    'condition': potential_conditions[index],
+                    'completed': completed,
+                    'total': len(potential_conditions),
+                    'diagnosis': dict(results[index]) if results[index] is not None else None  # ranking edits the originals
+                }
+
+        diagnosis_results = [result for result in results if result is not None]
+
+        with span('ranking'):
+            # 4. Apply relative ranking to avoid multiple 100% certainties
+            diagnosis_results = self._apply_relative_ranking(diagnosis_results)
+
+            # 5. sort by certainty score and return top results
+            diagnosis_results.sort(key=lambda x: x['certainty_score'], reverse=True)
+
+        logger.info(f"Top {max_diagnoses} probable diagnoses:")
         for i, result in enumerate(diagnosis_results[:max_diagnoses], 1):
-            print(f"{i}. {result['diagnosis']} ({result['certainty_score']:.2f} certainty)")
+            logger.info(f"{i}. {result['diagnosis']} ({result['certainty_score']:.2f} certainty)")
 
-        return diagnosis_results[:max_diagnoses]
+        yield {'event': 'summary', 'diagnoses': diagnosis_results[:max_diagnoses]}
 
     # helper methods 
 
+    @staticmethod
+    def _research_query(condition: str) -> str:
+        return f"{condition} diagnosis symptoms women"
+
+    def _research_condition(self, symptom_description: str, condition: str,
+                            keywords: Optional[List[str]] = None) -> Optional[Dict]:
+
+        # research one potential condition: search, score and extract evidence
+        # keywords: search keywords already generated for the research query (None = generate them)
+        # returns the diagnosis record, or None if no research was found
+
+        logger.info(f"Researching: {condition}")
+
+        # get research articles for this condition (reduced for speed)
+        research_query = self._research_query(condition)
+        articles = self.scraper.search_records_with_ai(research_query, max_results=2, keywords=keywords)  # Reduced from 5 to 2
+
+        if not articles: # no articles found
+            logger.info(f"No research found for {condition}")
+            return None
+
+        # the three scorers below share one tokenized/sentence-split view of every text
+        # (analyzed the first time any condition needed it, then served from the analysis cache)
+        symptoms_doc = self.analysis_cache.analyze(symptom_description)
+        documents = self.analysis_cache.analyze_many(article.clean_abstract for article in articles)
+
+        # analyze how well symptoms match this condition
+        with span('certainty'):
+            certainty_score = self._calculate_certainty_score(
+                symptoms_doc, condition, documents
+            )
+
+        with span('evidence'):
+            # extract supporting evidence
+            supporting_evidence = self._extract_supporting_evidence(
+                symptoms_doc, documents
+            )
+
+            # get key findings
+            key_findings = self._extract_key_findings(documents)
+
+        # get medication recommendations
+        try:
+            medication_recommendations = self._generate_medication_recommendations(
+                condition, symptom_description
+            )
+            if not medication_recommendations:
+                # Fallback to default if AI fails
+                medication_recommendations = self._get_default_medications(condition)
+        except Exception as e:
+            logger.warning(f"Error generating AI medications for {condition}: {e}")
+            # Use default medications as fallback
+            medication_recommendations = self._get_default_medications(condition)
+
+        logger.info(f"{condition}: {certainty_score:.2f} certainty")
+
+        # compile results
+        return {
+            'diagnosis': condition,
+            'certainty_score': certainty_score,
+            'supporting_evidence': supporting_evidence,
+            'research_articles': len(articles),
+            'key_findings': key_findings,
+            'medication_recommendations': medication_recommendations
+        }
+
     def _generate_potential_conditions(self, symptom_description: str) -> List[str]:
         
         # use AI to suggest potential medical conditions based on symptoms
@@ -117,31 +242,25 @@ class DiagnosticAssistant:
         - For "pelvic pain, heavy bleeding": ["endometriosis", "uterine fibroids", "ovarian cysts", "pelvic inflammatory disease", "adenomyosis"]
         """
 
-        # call the AI model
+        # call the AI model (identical symptom descriptions reuse a recent answer)
         try:
-            response = self.ai_keywords.model.generate_content(prompt)
-            conditions_text = response.text.strip()
-
-            # parse JSON response
-            if '```json' in conditions_text:
-                start = conditions_text.find('[')
-                end = conditions_text.rfind(']') + 1
-                if start != -1 and end != 0:
-                    conditions_text = conditions_text[start:end]
-
-            # clean up response and parse JSON
-            if conditions_text.startswith('[') and conditions_text.endswith(']'):
-                import json
-                conditions = json.loads(conditions_text)
-                return conditions[:5]
-            else:
-                # fallback parsing
-                return self._fallback_condition_extraction(symptom_description)
+            return self.ai_keywords.cached_call(
+                'potential_conditions', symptom_description,
+                lambda: self._request_potential_conditions(prompt), num_keywords=5
+            )
 
         except Exception as e: # catch all errors
-            print(f"Error generating conditions: {e}")
+            logger.warning(f"Error generating conditions: {e}")
             return self._fallback_condition_extraction(symptom_description)
 
+    def _request_potential_conditions(self, prompt: str) -> List[str]:
+
+        # one LLM call for potential conditions, raises if the response isn't a non-empty
+        # JSON array of strings
+
+        response = self.ai_keywords.complete(prompt)
+        return self.ai_keywords._parse_keyword_list(response.text.strip(), 5)
+
     # fallback method if AI fails
     def _fallback_condition_extraction(self, symptom_description: str) -> List[str]:
 
@@ -167,42 +286,36 @@ class DiagnosticAssistant:
         return list(suggested_conditions)[:5] if suggested_conditions else ['hormonal imbalance'] # default fallback, hormonal imbalance if none found
 
     # scoring and evidence extraction methods
-    def _calculate_certainty_score(self, symptoms: str, condition: str, articles: List[str]) -> float:
+    def _calculate_certainty_score(self, symptoms: Union[str, AnalyzedDocument], condition: str,
+                                   articles: Sequence[Union[str, AnalyzedDocument]]) -> float:
 
         # calculate a certainty score (0-1) based on symptom-article relevance
         # uses multiple factors to create more realistic, differentiated scores
+        # symptoms/articles may be raw text or AnalyzedDocument (see _research_condition)
 
         if not articles:
             return 0.1  # minimal score for no research
 
-        symptom_keywords = set(re.findall(r'\b\w+\b', symptoms.lower()))
+        symptoms = self.analysis_cache.analyze(symptoms)
+        symptom_keywords = symptoms.token_set
         condition_lower = condition.lower()
 
         # 1. SYMPTOM MATCH SCORING
         total_symptom_matches = 0
         total_possible_matches = len(symptom_keywords)
 
-        for article in articles:
-            article_words = set(re.findall(r'\b\w+\b', article.lower()))
-            matches = len(symptom_keywords.intersection(article_words))
+        for article in self.analysis_cache.analyze_many(articles):
+            matches = len(symptom_keywords.intersection(article.token_set))
             total_symptom_matches += matches
 
         symptom_match_ratio = total_symptom_matches / (total_possible_matches * len(articles)) if total_possible_matches > 0 else 0
 
         # 2. CONDITION SPECIFICITY SCORING
-        # More specific conditions get slightly lower base scores to reflect clinical reality
-        specificity_penalties = {
-            'peripartum cardiomyopathy': 0.05,  # rare, specific
-            'takotsubo cardiomyopathy': 0.10,   # very rare
-            'spontaneous coronary artery dissection': 0.15,  # very rare
-            'pulmonary embolism': 0.02,         # serious but not extremely rare
-            'anxiety': 0.0,                     # common
-            'panic disorder': 0.0               # common
-        }
-
+        # first listed condition that matches wins
         specificity_penalty = 0
-        for condition_key, penalty in specificity_penalties.items():
-            if condition_key in condition_lower:
+        matched = _SPECIFICITY_MATCHER.found(condition_lower)
+        for condition_key, penalty in SPECIFICITY_PENALTIES.items():
+            if condition_key in matched:
                 specificity_penalty = penalty
                 break
 
@@ -211,24 +324,15 @@ class DiagnosticAssistant:
         research_weight = min(len(articles) / 10.0, 0.3)  # cap at 0.3
 
         # 4. SYMPTOM SEVERITY KEYWORDS
-        severity_keywords = ['chest pain', 'shortness of breath', 'severe', 'acute', 'sudden onset']
-        severity_bonus = 0
-        for keyword in severity_keywords:
-            if keyword in symptoms.lower():
-                severity_bonus += 0.05
+        severity_bonus = 0.05 * _SEVERITY_MATCHER.num_found(symptoms.lower, is_lower=True)
         severity_bonus = min(severity_bonus, 0.15)  # cap at 0.15
 
         # 5. CONDITION-SPECIFIC MODIFIERS
-        condition_modifiers = {
-            'anxiety': -0.1,  # common condition, reduce certainty
-            'panic': -0.1,    # common condition, reduce certainty
-            'cardiomyopathy': 0.05,  # serious cardiac condition
-            'embolism': 0.05,        # serious vascular condition
-        }
-
+        # summed in table order so the float result doesn't depend on match order
         condition_modifier = 0
-        for modifier_key, modifier_value in condition_modifiers.items():
-            if modifier_key in condition_lower:
+        matched = _MODIFIER_MATCHER.found(condition_lower)
+        for modifier_key, modifier_value in CONDITION_MODIFIERS.items():
+            if modifier_key in matched:
                 condition_modifier += modifier_value
 
         # 6. COMBINE ALL FACTORS
@@ -289,29 +393,36 @@ class DiagnosticAssistant:
 
         return diagnosis_results
 
-    def _extract_supporting_evidence(self, symptoms: str, articles: List[str]) -> List[str]:
+    def _extract_supporting_evidence(self, symptoms: Union[str, AnalyzedDocument],
+                                     articles: Sequence[Union[str, AnalyzedDocument]],
+                                     top_k: int = 3) -> List[str]:
 
         # extract supporting evidence sentences from articles that mention symptoms
-
-        symptom_keywords = re.findall(r'\b\w+\b', symptoms.lower())
-        evidence = []
-
-        for article in articles:
-            # find sentences that mention symptom keywords
-            sentences = re.split(r'[.!?]+', article)
-
-            for sentence in sentences:
-                sentence_lower = sentence.lower()
-                matches = sum(1 for keyword in symptom_keywords if keyword in sentence_lower)
-
-                if matches >= 2:  # sentence mentions multiple symptom keywords
-                    evidence.append(sentence.strip())
-
-        # return unique evidence, limited to top 3
-        unique_evidence = list(dict.fromkeys(evidence))
-        return unique_evidence[:3]
-
-    def _extract_key_findings(self, articles: List[str]) -> str:
+        # a sentence matches the symptom words it contains as whole tokens (stop words ignored),
+        # and sentences are ranked by match density (matches / sentence length), best top_k kept
+
+        symptom_terms = self.analysis_cache.analyze(symptoms).content_token_set
+        if not symptom_terms:
+            return []
+        min_matches = min(2, len(symptom_terms))  # sentence mentions multiple symptom keywords
+
+        candidates = {}  # sentence -> (density, matches, -position), first occurrence kept
+        position = 0
+        for article in self.analysis_cache.analyze_many(articles):
+            for sentence, sentence_tokens in zip(article.sentences, article.sentence_token_sets):
+                position += 1
+                matches = len(symptom_terms.intersection(sentence_tokens))
+                if matches < min_matches:
+                    continue
+                sentence = sentence.strip()
+                if sentence not in candidates:
+                    candidates[sentence] = (matches / len(sentence_tokens), matches, -position)
+
+        # ties: more matches first, then the earlier sentence
+        top = heapq.nlargest(top_k, candidates.items(), key=lambda item: item[1])
+        return [sentence for sentence, _ in top]
+
+    def _extract_key_findings(self, articles: Sequence[Union[str, AnalyzedDocument]]) -> str:
 
         # extract key findings summary from research articles
 
@@ -323,11 +434,9 @@ class DiagnosticAssistant:
 
         key_sentences = []
 
-        for article in articles: # analyze each article
-            sentences = re.split(r'[.!?]+', article)
-
-            for sentence in sentences:
-                if any(term in sentence.lower() for term in key_terms):
+        for article in self.analysis_cache.analyze_many(articles): # analyze each article
+            for sentence, sentence_lower in zip(article.sentences, article.sentences_lower):
+                if any(term in sentence_lower for term in key_terms):
                     key_sentences.append(sentence.strip())
 
         if key_sentences:
@@ -346,7 +455,7 @@ class DiagnosticAssistant:
         try:
             # Skip AI generation for now and use defaults directly
             # TODO: Re-enable AI generation when performance is optimized
-            print(f"Using default medications for {condition} (AI generation disabled for speed)")
+            logger.debug(f"Using default medications for {condition} (AI generation disabled for speed)")
             return self._get_default_medications(condition)
 
             # Use the AI keyword generator's model to get medication recommendations
@@ -368,7 +477,7 @@ class DiagnosticAssistant:
             #     return self._get_default_medications(condition)
 
         except Exception as e:
-            print(f"Error generating medication recommendations: {e}")
+            logger.warning(f"Error generating medication recommendations: {e}")
             return self._get_default_medications(condition)
 
     def _get_default_medications(self, condition: str) -> List[Dict]:
@@ -0,0 +1 @@
+# offline test fixtures: recorded PubMed E-utilities responses + a local stand-in server
@@ -0,0 +1,158 @@
+# local stand-in for the PubMed E-utilities API
+# serves recorded esearch/efetch responses from fixtures/pubmed so scrapers can run offline
+#
+# usage:
+#   with EUtilsStubServer() as server:
+#       scraper = make_scraper(server)  # PubMedScraper against the stand-in, no rate limit
+
+import hashlib
+import json
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from scrapers.pubmed_scraper import PubMedScraper
+from scrapers.rate_limiter import TokenBucket
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pubmed')
+
+XML_HEADER = (
+    '<?xml version="1.0" ?>\n'
+    '<!DOCTYPE PubmedArticleSet PUBLIC "-//NLM//DTD PubMedArticle, 1st January 2024//EN" '
+    '"https://dtd.nlm.nih.gov/ncbi/pubmed/out/pubmed_240101.dtd">\n'
+)
+
+def load_recorded_articles(fixtures_dir: str = FIXTURES_DIR) -> Dict[str, str]:
+    # recorded efetch payload split into one serialized PubmedArticle per PMID
+    root = ET.parse(os.path.join(fixtures_dir, 'efetch.xml')).getroot()
+    articles = {}
+    for article_elem in root.findall('PubmedArticle'):
+        pmid = article_elem.find('MedlineCitation/PMID').text
+        articles[pmid] = ET.tostring(article_elem, encoding='unicode')
+    return articles
+
+def build_efetch_xml(article_xml: List[str]) -> str:
+    # wrap serialized PubmedArticle elements in an efetch response document
+    return XML_HEADER + '<PubmedArticleSet>\n' + ''.join(article_xml) + '</PubmedArticleSet>\n'
+
+def build_large_efetch_payload(num_articles: int, fixtures_dir: str = FIXTURES_DIR) -> str:
+    # efetch document with num_articles entries, cycling through the recorded articles
+    # each copy gets its own PMID so downstream code sees distinct articles
+    recorded = list(load_recorded_articles(fixtures_dir).items())
+    article_xml = []
+    for i in range(num_articles):
+        pmid, xml = recorded[i % len(recorded)]
+        article_xml.append(xml.replace(f">{pmid}<", f">{int(pmid) + i * 100000000}<"))
+    return build_efetch_xml(article_xml)
+
+def unlimited_rate_limiter() -> TokenBucket:
+    # effectively no rate limit, the stand-in server has no quota
+    return TokenBucket(rate=1000, capacity=1000)
+
+def make_scraper(server: 'EUtilsStubServer', **kwargs) -> PubMedScraper:
+    # PubMedScraper pointed at a running stand-in server, kwargs go to PubMedScraper
+    return PubMedScraper(base_url=server.base_url, rate_limiter=unlimited_rate_limiter(), **kwargs)
+
+class EUtilsStubServer:
+
+    # threaded HTTP server answering esearch.fcgi and efetch.fcgi from recorded data
+    # unknown search terms get a deterministic subset of the recorded PMIDs
+    # counts requests so tests can check how many round-trips a scraper made
+
+    def __init__(self, fixtures_dir: str = FIXTURES_DIR, latency: float = 0.0):
+        self.latency = latency  # seconds added to every response
+        self.articles = load_recorded_articles(fixtures_dir)
+        with open(os.path.join(fixtures_dir, 'esearch.json')) as f:
+            self.terms = json.load(f)['terms']
+
+        self.esearch_calls = 0
+        self.efetch_calls = 0
+        self.efetched_ids: List[str] = []
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/entrez/eutils/"
+
+    def search(self, term: str, retmax: int) -> List[str]:
+        # recorded idlist for the term, or a stable pseudo-random pick for unknown terms
+        normalized = ' '.join(term.lower().split())
+        if normalized in self.terms:
+            return self.terms[normalized][:retmax]
+
+        pmids = sorted(self.articles)
+        offset = int(hashlib.md5(normalized.encode('utf-8')).hexdigest(), 16) % len(pmids)
+        return [pmids[(offset + i) % len(pmids)] for i in range(min(retmax, len(pmids)))]
+
+    def fetch(self, pmids: List[str]) -> str:
+        return build_efetch_xml([self.articles[pmid] for pmid in pmids if pmid in self.articles])
+
+    def start(self):
+        stub = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def _respond(self, params: Dict[str, List[str]]):
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                path = urlparse(self.path).path
+                if path.endswith('esearch.fcgi'):
+                    with stub._lock:
+                        stub.esearch_calls += 1
+                    term = params.get('term', [''])[0]
+                    retmax = int(params.get('retmax', ['20'])[0])
+                    idlist = stub.search(term, retmax)
+                    body = json.dumps({'esearchresult': {'count': str(len(idlist)), 'idlist': idlist}})
+                    content_type = 'application/json'
+                elif path.endswith('efetch.fcgi'):
+                    ids = [pmid for pmid in params.get('id', [''])[0].split(',') if pmid]
+                    with stub._lock:
+                        stub.efetch_calls += 1
+                        stub.efetched_ids.extend(ids)
+                    body = stub.fetch(ids)
+                    content_type = 'text/xml'
+                else:
+                    self.send_error(404)
+                    return
+
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._respond(parse_qs(urlparse(self.path).query))
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                self._respond(parse_qs(self.rfile.read(length).decode('utf-8')))
+
+            def log_message(self, format, *args):
+                pass  # keep test output quiet
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -1,37 +1,82 @@
 # main scraper service class
 # coordinates everything, provides simple interface
 
+import os
 from typing import List, Dict, Optional
 from config.keywords import HEALTH_KEYWORDS, get_keywords_for_condition
 from config.ai_keywords import AIKeywordGenerator
+from scrapers.base_scraper import BaseScraper
 from scrapers.pubmed_scraper import PubMedScraper
+from scrapers.local_index_scraper import LocalIndexScraper
+from scrapers.hybrid_scraper import HybridScraper
+from scrapers.article_cache import get_default_article_cache
+from scrapers.search_cache import get_default_search_cache
 from processing.text_processor import TextProcessor
+from processing.article import Article, ArticleStore
+from telemetry import count, get_logger, span
+
+logger = get_logger('research')
 
 class ResearchScraper:
     # main scraper service that brings everything together
     # what other components will use, simple methods
     
-    def __init__(self, api_key: Optional[str] = None, gemini_api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, gemini_api_key: Optional[str] = None,
+                 scraper: Optional[BaseScraper] = None, ai_keywords: Optional[AIKeywordGenerator] = None):
 
         # initialize scrapers + text processor + AI keyword generator
+        # pass scraper to use a different article backend (e.g. LocalIndexScraper) instead of live PubMed
+        # pass ai_keywords to share an existing keyword generator (and its LLM backend)
 
-        print("Initializing ResearchScraper...")
-        self.pubmed_scraper = PubMedScraper(api_key)
+        logger.info("Initializing ResearchScraper...")
+        self.pubmed_scraper = scraper or self._build_default_scraper(api_key)
         self.text_processor = TextProcessor()
 
+        # one Article record per PMID, so cleaning/tokenizing/scoring happen once per article
+        self.article_store = ArticleStore(processor=self.text_processor)
+
         # initialize AI keyword generator
-        self.ai_keywords = None
-        if gemini_api_key:
+        self.ai_keywords = ai_keywords
+        if ai_keywords is None and gemini_api_key:
             try:
                 self.ai_keywords = AIKeywordGenerator(gemini_api_key)
-                print("AI keyword generator ready")
+                logger.info("AI keyword generator ready")
             except Exception as e: # catch errors, go back to hardcoded keywords
-                print(f"AI keyword generator failed to initialize: {e}")
-                print("Falling back to hardcoded keywords")
+                logger.warning(f"AI keyword generator failed to initialize: {e}")
+                logger.warning("Falling back to hardcoded keywords")
 
-        print("PubMed scraper ready")
-        print("Text processor ready")
+        logger.info("PubMed scraper ready")
+        logger.info("Text processor ready")
         
+    def _build_default_scraper(self, api_key: Optional[str]) -> BaseScraper:
+
+        # live PubMed, with a local index in front of it when LOCAL_INDEX_DIR is set
+        # cache locations/sizes come from PUBMED_CACHE_*, PUBMED_SHARED_CACHE_* and PUBMED_SEARCH_CACHE_* env vars,
+        # PUBMED_OFFLINE=1 serves only cached data
+
+        pubmed = PubMedScraper(
+            api_key,
+            cache=get_default_article_cache(),
+            search_cache=get_default_search_cache(),
+            offline=os.getenv('PUBMED_OFFLINE') == '1'
+        )
+
+        index_dir = os.getenv('LOCAL_INDEX_DIR')
+        if not index_dir:
+            return pubmed
+
+        try:
+            freshness = os.getenv('LOCAL_INDEX_MAX_AGE')  # seconds before the index counts as stale
+            scraper = HybridScraper(
+                [LocalIndexScraper(index_dir)], pubmed,
+                freshness_threshold=float(freshness) if freshness else None
+            )
+            logger.info(f"Local index ready: {index_dir}")
+            return scraper
+        except (OSError, ValueError) as e: # missing/corrupt index, stay on live PubMed
+            logger.warning(f"Local index unavailable, using PubMed only: {e}")
+            return pubmed
+
     def get_research_articles(self, # main method to get plain text abstracts
                             keyword: Optional[str] = None, 
                             max_results: int = 10,
@@ -41,46 +86,94 @@ class ResearchScraper:
         search_keyword = keyword or HEALTH_KEYWORDS[0]
         
         # log parameters
-        print(f"\nSearching for: '{search_keyword}'")
-        print(f"Max results: {max_results}")
-        print(f"Min relevance: {min_relevance}")
+        logger.info(f"Searching for: '{search_keyword}'")
+        logger.info(f"Max results: {max_results}")
+        logger.info(f"Min relevance: {min_relevance}")
         
         # search PubMed for articles, call pubmed scraper
         articles = self.pubmed_scraper.search_articles(search_keyword, max_results)
         
         # if no articles found, return empty list
         if not articles:
-            print("No articles found")
+            logger.info("No articles found")
             return []
         
-        print(f"Found {len(articles)} articles from PubMed") # log number found
+        logger.info(f"Found {len(articles)} articles from PubMed") # log number found
         
-        # process and filter articles
-        processed_texts = []
-        for i, article in enumerate(articles, 1):
+        return self._filter_and_clean(articles, min_relevance)
+
+    def _search_keywords(self, keywords: List[str], max_results: int, min_relevance: float = 0.3) -> List[str]:
+
+        # multi-keyword version of get_research_articles
+        # esearch runs once per keyword, but each unique article is fetched, scored and cleaned once
+
+        return [article.clean_abstract for article in self._search_keyword_records(keywords, max_results, min_relevance)]
+
+    def _search_keyword_records(self, keywords: List[str], max_results: int,
+                                min_relevance: float = 0.3) -> List[Article]:
+
+        # _search_keywords, returning the relevant Article records instead of their cleaned abstracts
+
+        logger.info(f"Searching for {len(keywords)} keywords: {keywords}")
+        logger.info(f"Max results per keyword: {max_results}")
+        logger.info(f"Min relevance: {min_relevance}")
+
+        articles = self.pubmed_scraper.search_multiple(keywords, max_results)
+
+        if not articles:
+            logger.info("No articles found")
+            return []
+
+        logger.info(f"Found {len(articles)} unique articles from PubMed")
+        return self._filter_records(articles, min_relevance)
+
+    def _filter_and_clean(self, articles: List[Dict], min_relevance: float) -> List[str]:
+
+        # score articles, drop those below the relevance threshold, return cleaned abstracts
+
+        return [article.clean_abstract for article in self._filter_records(articles, min_relevance)]
+
+    def _filter_records(self, articles: List[Dict], min_relevance: float) -> List[Article]:
+
+        # score articles, drop those below the relevance threshold or without an abstract,
+        # return the Article records kept (their derived fields are reused by later callers)
+
+        records = self.article_store.records(articles)
+        self._score_records(records)
+
+        kept = []
+        for i, record in enumerate(records, 1):
+            relevance = record.relevance_score
 
-            # calculate how relevant this article is to women's health, calculate relevance score from text_processor
-            relevance = self.text_processor.calculate_relevance_score(article)
-            
             # only include articles that meet our relevance threshold (0-1 scale)
             if relevance >= min_relevance:
 
-                # clean the abstract text
-                clean_text = self.text_processor.clean_abstract(article.get('abstract', ''))
-
-                if clean_text: # only add if there's text
-                    processed_texts.append(clean_text) # add to results
-                    print(f"Article {i}: Relevance {relevance:.2f} - Added")
+                if record.clean_abstract: # only add if there's text
+                    kept.append(record) # add to results
+                    logger.debug(f"Article {i}: Relevance {relevance:.2f} - Added")
                 else: # no abstract available
-                    print(f"Article {i}: No abstract available - Skipped")
+                    logger.debug(f"Article {i}: No abstract available - Skipped")
             
             else: # below relevance threshold
-                print(f"Article {i}: Relevance {relevance:.2f} - Below threshold")
+                logger.debug(f"Article {i}: Relevance {relevance:.2f} - Below threshold")
         
+        count('articles_filtered', len(records) - len(kept))
+        count('articles_kept', len(kept))
+
         # return final log
-        print(f"\nReturning {len(processed_texts)} relevant articles")
-        return processed_texts
+        logger.info(f"Returning {len(kept)} relevant articles")
+        return kept
     
+    def _score_records(self, records: List[Article]):
+
+        # how relevant each article is to women's health, scored in one batch by text_processor
+        # (records scored before, for another keyword or condition, keep their score)
+
+        with span('relevance'):
+            unscored = [record for record in records if not record.is_scored]
+            for record, score in zip(unscored, self.text_processor.score_batch(unscored)):
+                record.relevance_score = score
+
     def get_detailed_articles(self, 
                             keyword: Optional[str] = None, 
                             max_results: int = 10) -> List[Dict]:
@@ -91,29 +184,16 @@ class ResearchScraper:
         # use default keyword if none provided
         search_keyword = keyword or HEALTH_KEYWORDS[0]
         
-        print(f"\nGetting detailed articles for: '{search_keyword}'")
+        logger.info(f"Getting detailed articles for: '{search_keyword}'")
         
         # get articles from PubMed
-        articles = self.pubmed_scraper.search_articles(search_keyword, max_results)
+        records = self.article_store.records(self.pubmed_scraper.search_articles(search_keyword, max_results))
 
-        # add processed information to each article
-        for i, article in enumerate(articles, 1):
-            print(f"Processing article {i}...")
-            
-            # add cleaned abstract
-            article['clean_abstract'] = self.text_processor.clean_abstract(
-                article.get('abstract', '')
-            )
-            
-            # add relevance score
-            article['relevance_score'] = self.text_processor.calculate_relevance_score(article)
-            
-            # add key findings
-            article['key_findings'] = self.text_processor.extract_key_findings(
-                article.get('abstract', '')
-            )
+        # scraper fields plus cleaned abstract, relevance score and key findings
+        self._score_records(records)
+        articles = [record.to_dict(derived=True) for record in records]
         
-        print(f"Processed {len(articles)} detailed articles")
+        logger.info(f"Processed {len(articles)} detailed articles")
         return articles
     
     def search_by_condition(self, condition: str, max_results: int = 5) -> List[str]:
@@ -122,49 +202,52 @@ class ResearchScraper:
         # uses multiple keywords for that condition
         # combines results, returns list of plain text abstracts
         
-        print(f"\nSearching for condition: {condition}")
+        logger.info(f"Searching for condition: {condition}")
         
         # get keywords for this condition
         keywords = get_keywords_for_condition(condition)
-        print(f"Using keywords: {keywords[:3]}...")  # show first 3
-        
-        all_texts = []
+        logger.info(f"Using keywords: {keywords[:3]}...")  # show first 3
         
-        # search with multiple keywords for this condition
-        for i, keyword in enumerate(keywords[:3], 1):  # limit to 3 to avoid rate limits
-            print(f"\n--- Search {i}/3: '{keyword}' ---")
-            texts = self.get_research_articles(keyword, max_results) # reuse main method
-            all_texts.extend(texts) # combine results
+        # search with multiple keywords for this condition, shared articles are fetched once
+        all_texts = self._search_keywords(keywords[:3], max_results)  # limit to 3 to avoid rate limits
             
-        print(f"\nTotal articles for {condition}: {len(all_texts)}")
+        logger.info(f"Total articles for {condition}: {len(all_texts)}")
         return all_texts # return combined results
 
-    def search_with_ai(self, topic: str, max_results: int = 10, min_relevance: float = 0.3) -> List[str]:
+    def search_with_ai(self, topic: str, max_results: int = 10, min_relevance: float = 0.3,
+                       keywords: Optional[List[str]] = None) -> List[str]:
         
         # AI-powered search using Gemini to generate keywords
         # generates smart keywords based on natural language topic
         # searches PubMed with those keywords, combines results
+        # keywords: already generated for this topic (e.g. by generate_keywords_batch), skips the AI call
 
-        if not self.ai_keywords: # if AI not initialized
-            print("AI keyword generator not available. Use gemini_api_key parameter in constructor.")
-            return []
+        return [article.clean_abstract for article in
+                self.search_records_with_ai(topic, max_results, min_relevance, keywords)]
+
+    def search_records_with_ai(self, topic: str, max_results: int = 10, min_relevance: float = 0.3,
+                               keywords: Optional[List[str]] = None) -> List[Article]:
 
-        print(f"\nAI-powered search for: '{topic}'")
+        # search_with_ai, returning the relevant Article records instead of their cleaned abstracts
+        # (DiagnosticAssistant scores their already-analyzed text directly)
 
-        # generate smart keywords using AI
-        print("Generating keywords with AI...")
-        ai_keywords = self.ai_keywords.generate_keywords(topic, num_keywords=3)
-        print(f"AI generated keywords: {ai_keywords}")
+        logger.info(f"AI-powered search for: '{topic}'")
 
-        all_articles = []
+        if keywords is not None:
+            ai_keywords = keywords
+        elif not self.ai_keywords: # if AI not initialized
+            logger.warning("AI keyword generator not available. Use gemini_api_key parameter in constructor.")
+            return []
+        else:
+            # generate smart keywords using AI
+            logger.info("Generating keywords with AI...")
+            ai_keywords = self.ai_keywords.generate_keywords(topic, num_keywords=3)
+        logger.info(f"AI generated keywords: {ai_keywords}")
 
-        # search with each AI-generated keyword
-        for i, keyword in enumerate(ai_keywords, 1):
-            print(f"\n--- AI Search {i}/{len(ai_keywords)}: '{keyword}' ---")
-            articles = self.get_research_articles(keyword, max_results, min_relevance)
-            all_articles.extend(articles)
+        # search with every AI-generated keyword, shared articles are fetched once
+        all_articles = self._search_keyword_records(ai_keywords, max_results, min_relevance)
 
-        print(f"\nTotal AI-powered results: {len(all_articles)} articles")
+        logger.info(f"Total AI-powered results: {len(all_articles)} articles")
         return all_articles
 
     def smart_condition_search(self, condition: str, max_results: int = 5) -> List[str]:
@@ -174,25 +257,20 @@ class ResearchScraper:
         # returns list of relevant article abstracts
 
         if not self.ai_keywords:
-            print("AI keyword generator not available. Use gemini_api_key parameter in constructor.")
+            logger.warning("AI keyword generator not available. Use gemini_api_key parameter in constructor.")
             return self.search_by_condition(condition, max_results)  # fallback
 
-        print(f"\nSmart condition search for: '{condition}'")
+        logger.info(f"Smart condition search for: '{condition}'")
 
         # generate comprehensive condition keywords with AI
-        print("Generating condition-specific keywords...")
+        logger.info("Generating condition-specific keywords...")
         condition_keywords = self.ai_keywords.generate_condition_keywords(condition, num_keywords=4)
-        print(f"AI condition keywords: {condition_keywords}")
-
-        all_articles = []
+        logger.info(f"AI condition keywords: {condition_keywords}")
 
-        # search with each AI-generated condition keyword
-        for i, keyword in enumerate(condition_keywords, 1):
-            print(f"\n--- Condition Search {i}/{len(condition_keywords)}: '{keyword}' ---")
-            articles = self.get_research_articles(keyword, max_results, min_relevance=0.2)  # lower threshold for condition searches
-            all_articles.extend(articles)
+        # search with every AI-generated condition keyword, shared articles are fetched once
+        all_articles = self._search_keywords(condition_keywords, max_results, min_relevance=0.2)  # lower threshold for condition searches
 
-        print(f"\n🎉 Total condition results: {len(all_articles)} articles")
+        logger.info(f"🎉 Total condition results: {len(all_articles)} articles")
         return all_articles
 
 def main(): 
@@ -0,0 +1,117 @@
+# tokenized / sentence-split view of a text, computed once and shared by the diagnosis scorers
+# certainty scoring, supporting evidence and key findings all need the same word tokens and
+# sentences; analyzing a text once (and memoizing it) removes the repeated regex and lowercasing
+
+import re
+import threading
+from collections import OrderedDict
+from typing import FrozenSet, List, Set, Tuple
+
+_WORD_RE = re.compile(r'\b\w+\b')
+_SENTENCE_END_RE = re.compile(r'[.!?]+')
+
+DEFAULT_ANALYSIS_CACHE_ENTRIES = 4096
+
+# common English function words, ignored when matching symptoms against evidence sentences
+STOP_WORDS: FrozenSet[str] = frozenset('''
+    a about after all also an and any are as at be been before being both but by can could
+    did do does during each few for from had has have having he her hers him his how i if in
+    into is it its just may me might more most my no nor not of off on once only or other our
+    out over own same she should so some such than that the their them then there these they
+    this those through to too under until up very was we were what when where which while who
+    whom why will with would you your
+'''.split())
+
+class AnalyzedDocument:
+
+    # one text, analyzed:
+    #   lower            lowercased text
+    #   tokens           word tokens of the lowercased text, in order (duplicates kept)
+    #   token_set        set(tokens)
+    #   sentences        text split on . ! ? runs (same pieces as re.split(r'[.!?]+', text))
+    #   sentence_offsets start offset of each sentence in text
+    #   sentences_lower  lowercased sentences
+    #   sentence_token_sets  word token set of each sentence (computed on first use)
+
+    __slots__ = ('text', 'lower', 'tokens', 'token_set', 'sentences', 'sentence_offsets', 'sentences_lower',
+                 '_sentence_token_sets')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lower = text.lower()
+        self.tokens: List[str] = _WORD_RE.findall(self.lower)
+        self.token_set: Set[str] = set(self.tokens)
+
+        sentences, offsets = [], []
+        start = 0
+        for end in _SENTENCE_END_RE.finditer(text):
+            sentences.append(text[start:end.start()])
+            offsets.append(start)
+            start = end.end()
+        sentences.append(text[start:])
+        offsets.append(start)
+
+        self.sentences: List[str] = sentences
+        self.sentence_offsets: List[int] = offsets
+        self.sentences_lower: List[str] = [sentence.lower() for sentence in sentences]
+        self._sentence_token_sets = None
+
+    @property
+    def sentence_token_sets(self) -> List[Set[str]]:
+        # only evidence extraction needs per-sentence tokens, so they're built lazily
+        if self._sentence_token_sets is None:
+            self._sentence_token_sets = [set(_WORD_RE.findall(sentence)) for sentence in self.sentences_lower]
+        return self._sentence_token_sets
+
+    @property
+    def content_token_set(self) -> Set[str]:
+        # token_set without stop words
+        return self.token_set - STOP_WORDS
+
+    def __repr__(self):
+        return f"AnalyzedDocument({len(self.tokens)} tokens, {len(self.sentences)} sentences)"
+
+class AnalysisCache:
+
+    # thread-safe LRU of AnalyzedDocument keyed by text
+    # the same abstract comes back for several conditions (and requests), so it's analyzed once
+
+    def __init__(self, max_entries: int = DEFAULT_ANALYSIS_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, AnalyzedDocument]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def analyze(self, text) -> AnalyzedDocument:
+        # analyzed form of text (already analyzed documents pass straight through)
+        if isinstance(text, AnalyzedDocument):
+            return text
+
+        with self._lock:
+            document = self._entries.get(text)
+            if document is not None:
+                self._entries.move_to_end(text)
+                self.hits += 1
+                return document
+            self.misses += 1
+
+        # analyze outside the lock; two threads racing on one text both produce the same result
+        document = AnalyzedDocument(text)
+        with self._lock:
+            self._entries[text] = document
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return document
+
+    def analyze_many(self, texts) -> Tuple[AnalyzedDocument, ...]:
+        return tuple(self.analyze(text) for text in texts)
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'entries': len(self._entries)
+        }
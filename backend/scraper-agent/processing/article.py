@@ -0,0 +1,194 @@
+# compact article record: the scraper fields plus derived fields computed once, on first use
+# scrapers and caches keep passing plain dicts (that's what ArticleCache/JSON store);
+# ResearchScraper turns them into Article records so cleaning, relevance scoring and key
+# finding extraction happen once per article instead of once per consumer
+# the tokenized/sentence-split form (AnalyzedDocument) is many times the size of the text, so
+# records don't keep it: consumers analyze clean_abstract through their bounded AnalysisCache
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from .analyzed_document import AnalyzedDocument
+from .text_processor import TextProcessor
+
+ARTICLE_FIELDS = ('title', 'abstract', 'url', 'authors', 'publication_date', 'pmid')
+
+DEFAULT_ARTICLE_STORE_ENTRIES = 4096
+
+_default_processor: Optional[TextProcessor] = None
+
+def _shared_processor() -> TextProcessor:
+    global _default_processor
+    if _default_processor is None:
+        _default_processor = TextProcessor()
+    return _default_processor
+
+class Article:
+
+    # one article from a scraper
+    #   title, abstract, url, authors (tuple), publication_date, pmid   scraper fields
+    #   clean_abstract   TextProcessor.clean_abstract(abstract)
+    #   relevance_score  TextProcessor.calculate_relevance_score (can be primed from score_batch)
+    #   key_findings     TextProcessor.extract_key_findings(abstract)
+    # derived fields are computed on first access and kept; records are read-only after that
+    # document builds an AnalyzedDocument of clean_abstract on every call and doesn't keep it
+    # supports article['field'], article.get() and `in`, so BaseScraper.validate_article_data
+    # and TextProcessor accept it like the dict it came from
+
+    __slots__ = ('title', 'abstract', 'url', 'authors', 'publication_date', 'pmid', '_extra', '_processor',
+                 '_clean_abstract', '_relevance_score', '_key_findings')
+
+    def __init__(self, title: str = '', abstract: str = '', url: str = '', authors: Iterable[str] = (),
+                 publication_date: str = '', pmid: str = '', extra: Optional[Dict] = None,
+                 processor: Optional[TextProcessor] = None):
+        self.title = title
+        self.abstract = abstract
+        self.url = url
+        self.authors = tuple(authors)
+        self.publication_date = publication_date
+        self.pmid = pmid
+        self._extra = extra or None     # any other keys the scraper returned, kept for to_dict
+        self._processor = processor     # None = shared default TextProcessor
+
+        self._clean_abstract: Optional[str] = None
+        self._relevance_score: Optional[float] = None
+        self._key_findings: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict, processor: Optional[TextProcessor] = None) -> 'Article':
+        extra = {key: value for key, value in data.items() if key not in ARTICLE_FIELDS}
+        return cls(data.get('title') or '', data.get('abstract') or '', data.get('url') or '',
+                   data.get('authors') or (), data.get('publication_date') or '', data.get('pmid') or '',
+                   extra, processor)
+
+    @property
+    def processor(self) -> TextProcessor:
+        return self._processor if self._processor is not None else _shared_processor()
+
+    # derived fields
+
+    @property
+    def clean_abstract(self) -> str:
+        if self._clean_abstract is None:
+            self._clean_abstract = self.processor.clean_abstract(self.abstract)
+        return self._clean_abstract
+
+    @property
+    def document(self) -> AnalyzedDocument:
+        # not cached here, see the module comment
+        return AnalyzedDocument(self.clean_abstract)
+
+    @property
+    def relevance_score(self) -> float:
+        if self._relevance_score is None:
+            self._relevance_score = self.processor.calculate_relevance_score(self)
+        return self._relevance_score
+
+    @relevance_score.setter
+    def relevance_score(self, score: float):
+        # prime with a score computed elsewhere (e.g. TextProcessor.score_batch over many records)
+        self._relevance_score = score
+
+    @property
+    def is_scored(self) -> bool:
+        return self._relevance_score is not None
+
+    @property
+    def key_findings(self) -> str:
+        if self._key_findings is None:
+            self._key_findings = self.processor.extract_key_findings(self.abstract)
+        return self._key_findings
+
+    # dict-style read access to the scraper fields
+
+    def __getitem__(self, key: str):
+        if key in ARTICLE_FIELDS:
+            return getattr(self, key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return key in ARTICLE_FIELDS or (self._extra is not None and key in self._extra)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self, derived: bool = False) -> Dict:
+        # the scraper dict shape (authors as a list); derived=True adds clean_abstract,
+        # relevance_score and key_findings like ResearchScraper.get_detailed_articles returns
+        data = {
+            'title': self.title,
+            'abstract': self.abstract,
+            'url': self.url,
+            'authors': list(self.authors),
+            'publication_date': self.publication_date,
+            'pmid': self.pmid
+        }
+        if self._extra:
+            data.update(self._extra)
+        if derived:
+            data['clean_abstract'] = self.clean_abstract
+            data['relevance_score'] = self.relevance_score
+            data['key_findings'] = self.key_findings
+        return data
+
+    def __repr__(self):
+        return f"Article(pmid={self.pmid!r}, title={self.title[:40]!r})"
+
+class ArticleStore:
+
+    # thread-safe LRU of Article records keyed by PMID (URL when there's no PMID)
+    # the same article comes back for several keywords, conditions and requests; handing out
+    # the same record keeps its derived fields, so they're computed once per article
+    # a dict whose title/abstract changed (e.g. refreshed from PubMed) replaces the old record
+
+    def __init__(self, max_entries: int = DEFAULT_ARTICLE_STORE_ENTRIES,
+                 processor: Optional[TextProcessor] = None):
+        self.max_entries = max_entries
+        self.processor = processor
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Article]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, data: Dict) -> Article:
+        # Article for a scraper dict (Article records pass straight through)
+        if isinstance(data, Article):
+            return data
+
+        key = data.get('pmid') or data.get('url')
+        if not key:
+            return Article.from_dict(data, self.processor)
+
+        with self._lock:
+            article = self._entries.get(key)
+            if (article is not None and article.abstract == (data.get('abstract') or '')
+                    and article.title == (data.get('title') or '')):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return article
+            self.misses += 1
+
+            article = Article.from_dict(data, self.processor)
+            self._entries[key] = article
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return article
+
+    def records(self, articles: Iterable[Dict]) -> List[Article]:
+        return [self.record(data) for data in articles]
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'entries': len(self._entries)
+        }
@@ -0,0 +1,117 @@
+# multi-keyword matching for the scorers (relevance, severity, condition modifiers)
+# a KeywordMatcher is built once per keyword set and finds every keyword in one pass over
+# the text (Aho–Corasick automaton), so scoring cost doesn't grow with the vocabulary
+# matching is case-insensitive substring matching, exactly like `keyword.lower() in text.lower()`
+
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+# below this many keywords, one C-level `in` scan per keyword beats a Python-level
+# automaton walk (measured: ~17x faster at 10 keywords, the automaton wins past a few hundred)
+AUTOMATON_MIN_KEYWORDS = 128
+
+class KeywordMatcher:
+
+    # case-insensitive substring matcher over a fixed keyword set
+    # found() / num_found() / counts() all agree with per-keyword `in` checks
+
+    def __init__(self, keywords: Iterable[str], min_automaton_keywords: int = AUTOMATON_MIN_KEYWORDS):
+        self.keywords = tuple(keywords)
+        self._lowered = tuple(keyword.lower() for keyword in self.keywords)
+        self.use_automaton = len(self.keywords) >= min_automaton_keywords
+
+        # '' is a substring of everything, keep it out of the automaton
+        self._always = [i for i, keyword in enumerate(self._lowered) if not keyword]
+
+        self._delta: List[Dict[str, int]] = []  # state -> {char: next state}, failure links resolved
+        self._outputs: List[tuple] = []        # state -> keyword indices ending there
+        if self.use_automaton:
+            self._build()
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def _build(self):
+
+        # trie of the lowercased keywords, then failure links breadth-first,
+        # then fold the failure links into the transitions so scanning is one dict lookup per char
+
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for index, keyword in enumerate(self._lowered):
+            if not keyword:
+                continue
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append([])
+                state = nxt
+            outputs[state].append(index)
+
+        fail = [0] * len(goto)
+        delta = [dict(transitions) for transitions in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            # states are visited by depth, so delta[fail[state]] is already complete
+            for ch, target in delta[fail[state]].items():
+                delta[state].setdefault(ch, target)
+            outputs[state].extend(outputs[fail[state]])
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0) if state else 0
+                queue.append(child)
+
+        self._delta = delta
+        self._outputs = [tuple(indices) for indices in outputs]
+
+    def _scan(self, text: str) -> Dict[int, int]:
+        # keyword index -> number of (possibly overlapping) occurrences, lowercased text
+        delta, outputs = self._delta, self._outputs
+        hits: Dict[int, int] = {}
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                for index in outputs[state]:
+                    hits[index] = hits.get(index, 0) + 1
+        return hits
+
+    def _found_indices(self, text: str, is_lower: bool) -> List[int]:
+        if not is_lower:
+            text = text.lower()
+        if self.use_automaton:
+            return self._always + list(self._scan(text))
+        return [i for i, keyword in enumerate(self._lowered) if keyword in text]
+
+    def found(self, text: str, is_lower: bool = False) -> Set[str]:
+        # keywords (as given) that occur in the text
+        # is_lower=True skips lowercasing when the caller already did it
+        return {self.keywords[i] for i in self._found_indices(text, is_lower)}
+
+    def num_found(self, text: str, is_lower: bool = False) -> int:
+        # how many entries of the keyword list occur in the text (duplicates count separately)
+        return len(self._found_indices(text, is_lower))
+
+    def counts(self, text: str) -> Dict[str, int]:
+
+        # occurrences per keyword (overlapping, e.g. 'aa' occurs twice in 'aaa'), found keywords only
+
+        text = text.lower()
+        if self.use_automaton:
+            hits = self._scan(text)
+        else:
+            hits = {}
+            for i, keyword in enumerate(self._lowered):
+                if keyword and keyword in text:
+                    count, start = 0, text.find(keyword)
+                    while start != -1:
+                        count += 1
+                        start = text.find(keyword, start + 1)
+                    hits[i] = count
+        for i in self._always:
+            hits[i] = len(text) + 1
+        return {self.keywords[i]: count for i, count in hits.items()}
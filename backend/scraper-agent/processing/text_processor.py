@@ -3,7 +3,16 @@
 # extract key findings
 
 import re
-from typing import Dict
+from typing import Dict, List
+
+from .keyword_matcher import KeywordMatcher
+
+# clean_abstract patterns, compiled once
+# "junk" = anything that isn't a word character or normal punctuation, whitespace included
+# _JUNK_RE only matches runs that need rewriting: 2+ junk chars, or one junk char that isn't a space
+# (a lone space between words is already clean, skipping it saves one substitution per word)
+_TAG_RE = re.compile(r'<[^>]+>')
+_JUNK_RE = re.compile(r'[^\w\.\,\-\:\;\(\)]{2,}|[^\w\.\,\-\:\;\(\) ]')
 
 class TextProcessor: 
     # cleans messy article abstracts into plain text
@@ -17,6 +26,7 @@ class TextProcessor:
             'women', 'female', 'pregnancy', 'maternal', 'breast', 
             'ovarian', 'cervical', 'menstrual', 'hormone', 'estrogen'
         ]
+        self.keyword_matcher = KeywordMatcher(self.womens_health_keywords)
     
     def clean_abstract(self, text: str) -> str:
         # takes messy abstract text, returns clean plain text
@@ -25,17 +35,16 @@ class TextProcessor:
             return ""
         
         # remove XML/HTML tags 
-        text = re.sub(r'<[^>]+>', '', text)
+        if '<' in text:
+            text = _TAG_RE.sub('', text)
 
-        # remove weird characters but keep normal punctuation
-        text = re.sub(r'[^\w\s\.\,\-\:\;\(\)]', ' ', text)
+        # weird characters become spaces and whitespace runs collapse to one space (one pass)
+        text = _JUNK_RE.sub(' ', text)
 
-        # fix multiple spaces -> single space
-        text = re.sub(r'\s+', ' ', text)
-
-        # clean up spacing around punctuation
-        text = re.sub(r'\s+([,\.;:])', r'\1', text)  # remove space before punctuation
-        text = re.sub(r'([,\.;:])\s+', r'\1 ', text)  # single space after punctuation
+        # no space before punctuation; spaces are single now, so plain replaces are enough
+        # (spacing after punctuation is already a single space)
+        if ' ' in text:
+            text = text.replace(' ,', ',').replace(' .', '.').replace(' ;', ';').replace(' :', ':')
         
         return text.strip()
     
@@ -49,11 +58,8 @@ class TextProcessor:
         if not text.strip(): # empty text
             return 0.0
         
-        # count how many women's health keywords are found
-        keyword_count = 0
-        for keyword in self.womens_health_keywords: # check each keyword
-            if keyword.lower() in text:
-                keyword_count += 1 # found one
+        # count how many women's health keywords are found (one pass for the whole keyword set)
+        keyword_count = self.keyword_matcher.num_found(text, is_lower=True)
         
         # convert count to score between 0 and 1
         # more keywords = higher relevance
@@ -62,6 +68,20 @@ class TextProcessor:
         
         return min(score, 1.0)  # cap at 1.0
     
+    def score_batch(self, articles: List[Dict]) -> List[float]:
+        # relevance scores for a list of articles, same values as calculate_relevance_score
+        # keyword matching already runs at C speed (one `in` scan per keyword), so the batch
+        # path hoists the per-article lookups and lowercases each text exactly once
+
+        num_found = self.keyword_matcher.num_found
+        max_possible = len(self.womens_health_keywords)
+
+        scores = []
+        for article in articles:
+            text = f"{article.get('title', '')} {article.get('abstract', '')}".lower()
+            scores.append(min(num_found(text, is_lower=True) / max_possible, 1.0) if text.strip() else 0.0)
+        return scores
+    
     def extract_key_findings(self, abstract: str) -> str:
         # tries to pull out the most important sentences from an abstract
         # tried to find "Results" or "Conclusions" sections if present, since those are most important
@@ -0,0 +1,197 @@
+# persistent PubMed article cache keyed by PMID
+# stores the parsed article dicts from PubMedScraper._extract_article_data in SQLite
+# entries expire after a TTL, and the least recently used ones are evicted above a size cap
+# the database file is only created on the first lookup or store
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+from config.env import env_number
+from telemetry import get_logger
+
+logger = get_logger('cache')
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'medisyn', 'pubmed_articles.sqlite3')
+DEFAULT_TTL = 7 * 24 * 3600   # one week, abstracts rarely change
+DEFAULT_MAX_ENTRIES = 50000
+
+class ArticleCache:
+
+    # PMID -> article dict store, safe to share between threads
+    # counts hits, misses and evictions for monitoring
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: Optional[float] = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl                  # seconds before an entry goes stale, None = never
+        self.max_entries = max_entries  # LRU eviction above this many articles
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._unavailable = False
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+
+        # open the database on first use, so building a scraper that never looks anything up
+        # doesn't create the file; a cache that can't be opened acts empty (self._lock held)
+
+        if self._conn is None and not self._unavailable:
+            try:
+                if self.path != ':memory:':
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+                with conn:
+                    if self.path != ':memory:':
+                        conn.execute("PRAGMA journal_mode=WAL")  # readers don't block the writer
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS articles ("
+                        " pmid TEXT PRIMARY KEY,"
+                        " data TEXT NOT NULL,"
+                        " fetched_at REAL NOT NULL,"
+                        " last_access REAL NOT NULL)"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS articles_last_access ON articles (last_access)")
+            except (sqlite3.Error, OSError) as e: # cache is an optimization, never fatal
+                logger.warning(f"Article cache unavailable: {e}")
+                self._unavailable = True
+                return None
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, pmids: List[str]) -> Dict[str, Dict]:
+
+        # return {pmid: article} for every fresh cached PMID
+        # stale entries count as misses and are dropped
+
+        if not pmids:
+            return {}
+
+        now = time.time()
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                self.misses += len(set(pmids))
+                return {}
+            with conn:
+                rows = []
+                for start in range(0, len(pmids), 500):  # stay under SQLite's bound-variable limit
+                    chunk = pmids[start:start + 500]
+                    rows.extend(conn.execute(
+                        f"SELECT pmid, data, fetched_at FROM articles WHERE pmid IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall())
+
+                stale = []
+                for pmid, data, fetched_at in rows:
+                    if self.ttl is not None and now - fetched_at > self.ttl:
+                        stale.append((pmid,))
+                    else:
+                        found[pmid] = json.loads(data)
+
+                if stale:
+                    conn.executemany("DELETE FROM articles WHERE pmid = ?", stale)
+                if found:
+                    conn.executemany("UPDATE articles SET last_access = ? WHERE pmid = ?",
+                                     [(now, pmid) for pmid in found])
+
+            self.hits += len(found)
+            self.misses += len(set(pmids)) - len(found)
+
+        return found
+
+    def get(self, pmid: str) -> Optional[Dict]:
+        return self.get_many([pmid]).get(pmid)
+
+    def put_many(self, articles: List[Dict]):
+
+        # store parsed articles, then evict least recently used entries above the cap
+
+        rows = [(article['pmid'], json.dumps(article)) for article in articles if article.get('pmid')]
+        if not rows:
+            return
+
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO articles (pmid, data, fetched_at, last_access) VALUES (?, ?, ?, ?)",
+                    [(pmid, data, now, now) for pmid, data in rows]
+                )
+
+                overflow = conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0] - self.max_entries
+                if overflow > 0:
+                    conn.execute(
+                        "DELETE FROM articles WHERE pmid IN "
+                        "(SELECT pmid FROM articles ORDER BY last_access ASC LIMIT ?)",
+                        (overflow,)
+                    )
+                    self.evictions += overflow
+
+    def put(self, article: Dict):
+        self.put_many([article])
+
+    def __len__(self) -> int:
+        with self._lock:
+            conn = self._connection()
+            return conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0] if conn is not None else 0
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            if conn is not None:
+                with conn:
+                    conn.execute("DELETE FROM articles")
+
+    def get_stats(self) -> Dict:
+        # counters for monitoring cache effectiveness
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'entries': len(self)
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def get_default_article_cache() -> Optional[ArticleCache]:
+
+    # build the article cache from environment settings
+    # PUBMED_CACHE_PATH ('' disables the cache), PUBMED_CACHE_TTL, PUBMED_CACHE_MAX_ENTRIES
+    # PUBMED_SHARED_CACHE_PATH switches to the memory-mapped cache shared by every worker process
+    # on the host (PUBMED_SHARED_CACHE_READONLY=1 for processes that should only read it)
+
+    shared_path = os.getenv('PUBMED_SHARED_CACHE_PATH')
+    path = os.getenv('PUBMED_CACHE_PATH', DEFAULT_CACHE_PATH)
+    if not shared_path and not path:
+        return None
+
+    # a malformed number falls back to that setting's default rather than disabling the cache
+    ttl = env_number('PUBMED_CACHE_TTL', float, DEFAULT_TTL)
+    max_entries = env_number('PUBMED_CACHE_MAX_ENTRIES', int, DEFAULT_MAX_ENTRIES, minimum=1)
+
+    try:
+        if shared_path:
+            from scrapers.shared_article_cache import SharedArticleCache
+            return SharedArticleCache(shared_path, ttl=ttl, max_entries=max_entries,
+                                      readonly=os.getenv('PUBMED_SHARED_CACHE_READONLY') == '1')
+        return ArticleCache(path, ttl=ttl, max_entries=max_entries)
+    except (sqlite3.Error, OSError, ValueError) as e: # cache is an optimization, never fatal
+        logger.warning(f"Article cache unavailable: {e}")
+        return None
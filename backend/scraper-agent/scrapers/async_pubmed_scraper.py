@@ -0,0 +1,197 @@
+# asyncio PubMed client: same parsing as PubMedScraper, non-blocking HTTP via aiohttp
+# many keyword searches can be in flight at once over a bounded connection pool
+# each keyword runs esearch -> efetch on its own, so one keyword's efetch starts
+# while the esearch calls for other keywords are still pending
+
+import asyncio
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from .pubmed_scraper import (
+    PubMedScraper, PubMedStreamParser, EFETCH_BATCH_SIZE, EFETCH_GET_MAX_IDS, STREAM_CHUNK_SIZE
+)
+from .rate_limiter import TokenBucket
+from .article_cache import ArticleCache
+from .search_cache import SearchCache
+from telemetry import count, get_logger, span
+
+logger = get_logger('pubmed')
+
+class AsyncPubMedScraper(PubMedScraper):
+
+    # async version of PubMedScraper
+    # the sync search_articles/get_article_text from PubMedScraper still work,
+    # the *_async methods share one aiohttp session per event loop
+    #
+    # usage:
+    #   async with AsyncPubMedScraper() as scraper:
+    #       results = await scraper.search_many_async(["PCOS", "endometriosis"])
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 rate_limiter: Optional[TokenBucket] = None, cache: Optional[ArticleCache] = None,
+                 search_cache: Optional[SearchCache] = None, offline: bool = False,
+                 max_connections: int = 10, timeout: float = 30.0):
+        super().__init__(api_key, base_url=base_url, rate_limiter=rate_limiter, cache=cache,
+                         search_cache=search_cache, offline=offline)
+        self.max_connections = max_connections  # size of the HTTP connection pool
+        self.timeout = timeout                  # total seconds allowed per request
+        self._client: Optional[aiohttp.ClientSession] = None
+
+    async def _get_client(self) -> aiohttp.ClientSession:
+        # create the pooled session lazily, it must be built inside the running loop
+        if self._client is None or self._client.closed:
+            self._client = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._client
+
+    async def close(self):
+        # close the pooled HTTP session
+        if self._client is not None and not self._client.closed:
+            await self._client.close()
+        self._client = None
+
+    async def __aenter__(self):
+        await self._get_client()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def search_articles_async(self, keyword: str, max_results: int = 10) -> List[Dict]:
+
+        # async version of search_articles: esearch for IDs, then efetch details
+        # returns list of article dicts, or an empty list on error
+
+        try:
+            logger.info(f"Searching PubMed for: '{keyword}'")
+
+            pmids = await self._search_article_ids_async(keyword, max_results)
+
+            if not pmids:
+                logger.info("No articles found")
+                return []
+
+            logger.info(f"Found {len(pmids)} article IDs: {pmids[:3]}...")
+
+            articles = await self._fetch_article_details_async(pmids)
+
+            logger.info(f"Successfully parsed {len(articles)} articles")
+            return articles
+
+        except Exception as e: # catch all errors
+            logger.warning(f"Error searching PubMed: {e}")
+            return []
+
+    async def search_many_async(self, keywords: List[str], max_results: int = 10) -> Dict[str, List[Dict]]:
+
+        # search several keywords at once
+        # returns {keyword: articles} in the order the keywords were given
+
+        results = await asyncio.gather(
+            *(self.search_articles_async(keyword, max_results) for keyword in keywords)
+        )
+        return dict(zip(keywords, results))
+
+    async def _search_article_ids_async(self, keyword: str, max_results: int) -> List[str]:
+
+        # esearch: keyword -> list of PubMed IDs
+
+        params = self._search_params(keyword, max_results)
+
+        pmids = self._cached_search(params)
+        if pmids is not None:
+            count('search_cache_hits')
+            return pmids
+
+        if self.offline:
+            raise RuntimeError("PubMed search unavailable in offline mode")
+
+        client = await self._get_client()
+        with span('esearch'):
+            with span('rate_limit'):
+                await self.rate_limiter.acquire_async()
+            async with client.get(f"{self.base_url}esearch.fcgi", params=self._query_params(params)) as response:
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+
+        pmids = data.get('esearchresult', {}).get('idlist', [])
+        self._store_search(params, pmids)
+        return pmids
+
+    async def _fetch_article_details_async(self, pmids: List[str]) -> List[Dict]:
+
+        # efetch: PubMed IDs -> parsed article dicts, cached articles skip the network
+
+        if not pmids:
+            return []
+
+        # cache lookups are local SQLite reads, fast enough to do inline
+        cached = self.cache.get_many(pmids) if self.cache is not None else {}
+        missing = [pmid for pmid in pmids if pmid not in cached]
+        count('article_cache_hits', len(cached))
+
+        fetched = []
+        if missing and not self.offline:
+            with span('efetch'):
+                fetched = await self._download_article_details_async(missing)
+            count('articles_fetched', len(fetched))
+            if self.cache is not None:
+                self.cache.put_many(fetched)
+
+        return self._merge_cached(pmids, cached, fetched)
+
+    async def _download_article_details_async(self, pmids: List[str]) -> List[Dict]:
+
+        # efetch the given PMIDs from PubMed and parse them
+
+        client = await self._get_client()
+        articles = []
+
+        for start in range(0, len(pmids), EFETCH_BATCH_SIZE):
+            batch = pmids[start:start + EFETCH_BATCH_SIZE]
+            params = self._query_params(self._fetch_params(batch))
+            url = f"{self.base_url}efetch.fcgi"
+
+            with span('rate_limit'):
+                await self.rate_limiter.acquire_async()
+            if len(batch) > EFETCH_GET_MAX_IDS:
+                request = client.post(url, data=params)
+            else:
+                request = client.get(url, params=params)
+
+            async with request as response:
+                response.raise_for_status()
+
+                # parse while downloading, articles are complete as soon as their element closes
+                parser = PubMedStreamParser(self)
+                try:
+                    async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                        articles.extend(parser.feed(chunk))
+                    articles.extend(parser.close())
+                except ET.ParseError as e:
+                    logger.warning(f"Error parsing XML: {e}")
+
+        return articles
+
+    async def get_article_text_async(self, article_id: str) -> Optional[str]:
+
+        # async version of get_article_text
+
+        try:
+            articles = await self._fetch_article_details_async([article_id])
+            if articles:
+                return articles[0].get('abstract', '')
+            return None
+
+        except Exception as e:
+            logger.warning(f"Error fetching article {article_id}: {e}")
+            return None
+
+    @staticmethod
+    def _query_params(params: Dict) -> Dict[str, str]:
+        # aiohttp only accepts string query values
+        return {key: str(value) for key, value in params.items()}
@@ -23,6 +23,18 @@ class BaseScraper(ABC):
         # returns plain text of the article given its ID
         pass # must be implemented by child classes
 
+    def search_multiple(self, keywords: List[str], max_results: int = 10) -> List[Dict]:
+        # search several keywords and merge the results, dropping duplicate articles
+        # keeps first-seen order (keyword order, then each keyword's ranking)
+        # scrapers that can batch requests should override this
+        merged = {}
+        for keyword in keywords:
+            for article in self.search_articles(keyword, max_results):
+                key = article.get('pmid') or article.get('url')
+                if key not in merged:
+                    merged[key] = article
+        return list(merged.values())
+
     def validate_article_data(self, article: Dict) -> bool: # check for valid
         # check if article has required fields
         # helper method, not abstract
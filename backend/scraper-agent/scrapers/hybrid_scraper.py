@@ -0,0 +1,180 @@
+# composite scraper: fast local backends first, live PubMed only when needed
+# tries each local backend (cache, local index, ...) in order, and only calls the
+# remote backend when local results are short of max_results or the local data is stale
+# results are merged and deduplicated by PMID, and each request records which backend
+# served each article and how long every backend took (last_trace, plus the local_search stage
+# and local_hits/remote_fallbacks counters of the telemetry request)
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from telemetry import count, span
+from .base_scraper import BaseScraper
+
+class HybridScraper(BaseScraper):
+
+    # local-first BaseScraper with remote fallback
+    #
+    # local backends may expose a `last_updated` unix timestamp (LocalIndexScraper does);
+    # if it is older than freshness_threshold seconds, the remote is always consulted
+
+    def __init__(self, local_backends: List[BaseScraper], remote: Optional[BaseScraper] = None,
+                 freshness_threshold: Optional[float] = None):
+        super().__init__("hybrid://")
+        self.local_backends = local_backends
+        self.remote = remote
+        self.freshness_threshold = freshness_threshold  # seconds, None = local data never goes stale
+
+        self._local = threading.local()  # per-thread trace of the last request
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, Dict] = {}  # backend name -> cumulative requests, articles, seconds
+
+    @staticmethod
+    def backend_name(backend: BaseScraper) -> str:
+        return type(backend).__name__
+
+    @property
+    def last_trace(self) -> Optional[Dict]:
+        # trace of the last search_articles/search_multiple call made from this thread
+        return getattr(self._local, 'trace', None)
+
+    def _is_stale(self, backend: BaseScraper) -> bool:
+        if self.freshness_threshold is None:
+            return False
+        last_updated = getattr(backend, 'last_updated', None)
+        return last_updated is not None and time.time() - last_updated > self.freshness_threshold
+
+    def _record(self, trace: Dict, name: str, articles: List[Dict], seconds: float):
+        trace['backends'].append({'backend': name, 'articles': len(articles), 'seconds': round(seconds, 6)})
+        with self._stats_lock:
+            stats = self.stats.setdefault(name, {'requests': 0, 'articles': 0, 'seconds': 0.0})
+            stats['requests'] += 1
+            stats['articles'] += len(articles)
+            stats['seconds'] += seconds
+
+    def _search_local(self, keyword: str, max_results: int,
+                      trace: Dict) -> Tuple[List[Tuple[str, List[Dict]]], bool, bool]:
+
+        # run the local backends for one keyword until they have max_results fresh articles
+        # returns ([(backend name, articles)], local data stale, remote needed)
+
+        local_results: List[Tuple[str, List[Dict]]] = []
+        local_keys = set()
+        stale = False
+
+        for backend in self.local_backends:
+            name = self.backend_name(backend)
+            backend_start = time.perf_counter()
+            with span('local_search'):
+                articles = backend.search_articles(keyword, max_results)
+            self._record(trace, name, articles, time.perf_counter() - backend_start)
+
+            local_results.append((name, articles))
+            local_keys.update(self._key(article) for article in articles)
+            stale = stale or self._is_stale(backend)
+            if len(local_keys) >= max_results and not stale:
+                break
+
+        count('local_hits', len(local_keys))
+        return local_results, stale, self.remote is not None and (len(local_keys) < max_results or stale)
+
+    def _merge(self, ordered: List[Tuple[str, List[Dict]]], limit: Optional[int], trace: Dict) -> List[Dict]:
+        # first-seen order, deduplicated by PMID, attributing every article to its backend
+        merged: Dict[str, Dict] = {}
+        for name, articles in ordered:
+            for article in articles:
+                key = self._key(article)
+                if key not in merged and (limit is None or len(merged) < limit):
+                    merged[key] = article
+                    trace['sources'][key] = name
+        return list(merged.values())
+
+    def search_articles_traced(self, keyword: str, max_results: int = 10) -> Tuple[List[Dict], Dict]:
+
+        # search local backends, then the remote if needed
+        # returns (articles, trace), trace = {keyword, backends: [{backend, articles, seconds}],
+        #                                     sources: {pmid: backend}, fallback, seconds}
+
+        start = time.perf_counter()
+        trace = {'keyword': keyword, 'backends': [], 'sources': {}, 'fallback': False}
+        local_results, stale, fallback = self._search_local(keyword, max_results, trace)
+
+        remote_results: List[Tuple[str, List[Dict]]] = []
+        if fallback:
+            trace['fallback'] = True
+            count('remote_fallbacks')
+            name = self.backend_name(self.remote)
+            backend_start = time.perf_counter()
+            articles = self.remote.search_articles(keyword, max_results)
+            self._record(trace, name, articles, time.perf_counter() - backend_start)
+            remote_results.append((name, articles))
+
+        # stale local data: fresh remote results go first, local ones fill the gaps
+        ordered = remote_results + local_results if stale else local_results + remote_results
+        articles = self._merge(ordered, max_results, trace)
+
+        trace['seconds'] = round(time.perf_counter() - start, 6)
+        self._local.trace = trace
+        return articles, trace
+
+    def search_multiple_traced(self, keywords: List[str], max_results: int = 10) -> Tuple[List[Dict], Dict]:
+
+        # local lookups for every keyword first, then one remote.search_multiple for the keywords
+        # the local backends couldn't answer, so the remote still dedups PMIDs across keywords and
+        # batches its fetches (PubMedScraper: one efetch for all of them)
+        # returns (articles, trace), trace = {keywords, backends, sources, fallback_keywords, seconds}
+        # per-keyword caps apply to each backend's results, the merged list is deduplicated by PMID
+
+        start = time.perf_counter()
+        trace = {'keywords': list(keywords), 'backends': [], 'sources': {}, 'fallback_keywords': []}
+        local_results: List[Tuple[str, List[Dict]]] = []
+        any_stale = False
+
+        for keyword in keywords:
+            results, stale, fallback = self._search_local(keyword, max_results, trace)
+            local_results.extend(results)
+            any_stale = any_stale or stale
+            if fallback:
+                trace['fallback_keywords'].append(keyword)
+
+        remote_results: List[Tuple[str, List[Dict]]] = []
+        if trace['fallback_keywords']:
+            count('remote_fallbacks', len(trace['fallback_keywords']))
+            name = self.backend_name(self.remote)
+            backend_start = time.perf_counter()
+            articles = self.remote.search_multiple(trace['fallback_keywords'], max_results)
+            self._record(trace, name, articles, time.perf_counter() - backend_start)
+            remote_results.append((name, articles))
+
+        ordered = remote_results + local_results if any_stale else local_results + remote_results
+        articles = self._merge(ordered, None, trace)
+
+        trace['seconds'] = round(time.perf_counter() - start, 6)
+        self._local.trace = trace
+        return articles, trace
+
+    @staticmethod
+    def _key(article: Dict) -> str:
+        return article.get('pmid') or article.get('url')
+
+    def search_articles(self, keyword: str, max_results: int = 10) -> List[Dict]:
+        articles, _ = self.search_articles_traced(keyword, max_results)
+        return articles
+
+    def search_multiple(self, keywords: List[str], max_results: int = 10) -> List[Dict]:
+        articles, _ = self.search_multiple_traced(keywords, max_results)
+        return articles
+
+    def get_article_text(self, article_id: str) -> Optional[str]:
+        # first backend that has the article wins
+        for backend in self.local_backends + ([self.remote] if self.remote is not None else []):
+            text = backend.get_article_text(article_id)
+            if text is not None:
+                return text
+        return None
+
+    def get_stats(self) -> Dict[str, Dict]:
+        # cumulative per-backend counters, for tuning cache coverage vs tail latency
+        with self._stats_lock:
+            return {name: dict(stats, seconds=round(stats['seconds'], 6)) for name, stats in self.stats.items()}
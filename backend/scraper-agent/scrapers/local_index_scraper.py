@@ -0,0 +1,505 @@
+# local full-text search over a stored article collection, no network involved
+# builds an on-disk inverted index (BM25 ranking) over article dicts shaped like
+# PubMedScraper._extract_article_data output, and serves search_articles from it
+# every index file is memory-mapped (documents, postings, and the sorted term and PMID
+# tables that are binary-searched in place), so opening an index is cheap, its size
+# doesn't show up in each process's heap, and several processes share the same pages
+#
+# the build spills postings to sorted runs on disk every block_postings postings and
+# merges them at the end, streaming each term's postings from the runs, so its memory stays
+# flat however big the corpus is or however common a term
+# each term's highest-impact postings are stored first, and queries read at most
+# max_postings_per_term of them, so common terms don't make latency grow with the corpus
+#
+# build from a corpus made by corpus/ingest.py (run from backend/scraper-agent):
+#   python -m scrapers.local_index_scraper /data/medisyn-corpus /data/medisyn-index
+
+import heapq
+import itertools
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from collections import Counter, defaultdict
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .base_scraper import BaseScraper
+from telemetry import get_logger
+
+logger = get_logger('local_index')
+
+# BM25 parameters (standard defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+INDEX_FORMAT = 2
+DEFAULT_BLOCK_POSTINGS = 4_000_000   # postings held in memory before a run is spilled
+IMPACT_PREFIX = 10_000               # postings per term stored in impact order, the rest by doc id
+DEFAULT_MAX_POSTINGS_PER_TERM = 1000 # postings read per query term, None = all (exact BM25)
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_RUN_ENTRY = struct.Struct('<HI')    # key length, df (postings runs) or doc id (key runs)
+_TABLE_FLUSH = 65536
+_MERGE_CHUNK = 65536                 # postings read from a run at a time during the merge
+_MERGE_BUFFER = 1_000_000            # postings of one term held in memory, longer lists use a scratch file
+
+def tokenize(text: str) -> List[str]:
+    # lowercase alphanumeric tokens, same rule for indexing and queries
+    return _TOKEN_RE.findall(text.lower())
+
+class _StringTableWriter:
+
+    # sorted string table written in key order: {name}s.bin (concatenated keys),
+    # {name}_offsets.bin (uint64, one more than keys) and one array file per value column
+
+    def __init__(self, index_dir: str, name: str, columns: Dict[str, str]):
+        self._keys = open(os.path.join(index_dir, f'{name}s.bin'), 'wb')
+        self._offsets = open(os.path.join(index_dir, f'{name}_offsets.bin'), 'wb')
+        self._columns = {column: (open(os.path.join(index_dir, f'{name}_{column}.bin'), 'wb'), array(typecode))
+                         for column, typecode in columns.items()}
+        self._offset_buffer = array('Q', [0])
+        self._position = 0
+        self.count = 0
+
+    def add(self, key: bytes, **values):
+        self._keys.write(key)
+        self._position += len(key)
+        self._offset_buffer.append(self._position)
+        for column, value in values.items():
+            self._columns[column][1].append(value)
+        self.count += 1
+        if len(self._offset_buffer) >= _TABLE_FLUSH:
+            self._flush()
+
+    def _flush(self):
+        self._offset_buffer.tofile(self._offsets)
+        self._offset_buffer = array('Q')
+        for f, buffer in self._columns.values():
+            buffer.tofile(f)
+            del buffer[:]
+
+    def close(self):
+        self._flush()
+        for f in [self._keys, self._offsets] + [f for f, _ in self._columns.values()]:
+            f.close()
+
+class _StringTable:
+
+    # binary search over a memory-mapped _StringTableWriter table (keys compare as bytes)
+
+    def __init__(self, keys, offsets):
+        self._keys = keys
+        self._offsets = offsets
+        self.count = len(offsets) - 1 if len(offsets) else 0
+
+    def find(self, key: bytes) -> int:
+        # position of key, -1 if it isn't in the table
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if bytes(self._keys[self._offsets[mid]:self._offsets[mid + 1]]) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.count and bytes(self._keys[self._offsets[low]:self._offsets[low + 1]]) == key:
+            return low
+        return -1
+
+def _spill(run_dir: str, run_no: int, postings: Dict[str, array], keys: List[Tuple[bytes, int]]) -> Tuple[str, str]:
+
+    # write one block's postings (term order, interleaved doc id/tf pairs) and article keys
+    # (key order) to run files
+
+    postings_path = os.path.join(run_dir, f'postings-{run_no}.run')
+    with open(postings_path, 'wb') as f:
+        for term in sorted(postings):
+            pairs = postings[term]
+            term_bytes = term.encode('utf-8')
+            f.write(_RUN_ENTRY.pack(len(term_bytes), len(pairs) // 2))
+            f.write(term_bytes)
+            pairs.tofile(f)
+
+    keys_path = os.path.join(run_dir, f'keys-{run_no}.run')
+    with open(keys_path, 'wb') as f:
+        for key, doc_id in sorted(keys):
+            f.write(_RUN_ENTRY.pack(len(key), doc_id))
+            f.write(key)
+
+    return postings_path, keys_path
+
+class _PostingsRun:
+
+    # sequential reader over one spilled postings run: the current term and its df, then
+    # that term's postings a chunk at a time (read them all before advance())
+
+    def __init__(self, path: str):
+        self._f = open(path, 'rb')
+        self.term: Optional[bytes] = None
+        self.df = 0
+        self.advance()
+
+    def advance(self):
+        header = self._f.read(_RUN_ENTRY.size)
+        if not header:
+            self.term = None
+            self._f.close()
+            return
+        term_len, self.df = _RUN_ENTRY.unpack(header)
+        self.term = self._f.read(term_len)
+
+    def chunks(self) -> Iterator[array]:
+        # interleaved (doc id, tf) pairs, at most _MERGE_CHUNK postings each
+        remaining = self.df
+        while remaining:
+            n = min(remaining, _MERGE_CHUNK)
+            pairs = array('I')
+            pairs.fromfile(self._f, 2 * n)
+            remaining -= n
+            yield pairs
+
+def _read_key_run(path: str) -> Iterator[Tuple[bytes, int]]:
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(_RUN_ENTRY.size)
+            if not header:
+                return
+            key_len, doc_id = _RUN_ENTRY.unpack(header)
+            yield f.read(key_len), doc_id
+
+def _merge_keys(key_runs: List[str], index_dir: str) -> Set[int]:
+
+    # write the sorted key -> doc id table, keeping the first copy of each article
+    # returns the doc ids of later copies, which the postings merge leaves out
+
+    table = _StringTableWriter(index_dir, 'key', {'docs': 'I'})
+    dropped = set()
+    previous = None
+    for key, doc_id in heapq.merge(*(_read_key_run(path) for path in key_runs)):
+        if key == previous:
+            dropped.add(doc_id)
+            continue
+        table.add(key, docs=doc_id)
+        previous = key
+    table.close()
+    return dropped
+
+def _merge_postings(postings_runs: List[str], index_dir: str, scratch_path: str, dropped: Set[int],
+                    doc_lengths, avg_doc_length: float):
+
+    # merge the runs term by term into postings.bin and the sorted term table
+    # a term's postings are streamed from each run in turn (runs are in doc id order)
+
+    table = _StringTableWriter(index_dir, 'term', {'postings': 'Q', 'dfs': 'I'})
+    runs = [_PostingsRun(path) for path in postings_runs]
+    heap = [(run.term, i) for i, run in enumerate(runs) if run.term is not None]
+    heapq.heapify(heap)
+    offset = 0
+    with open(os.path.join(index_dir, 'postings.bin'), 'wb') as out:
+        while heap:
+            term = heap[0][0]
+            group = []
+            while heap and heap[0][0] == term:
+                group.append(heapq.heappop(heap)[1])
+            group.sort()
+
+            chunks = (pairs for i in group for pairs in runs[i].chunks())
+            df = _write_term_postings(out, chunks, scratch_path, dropped, doc_lengths, avg_doc_length)
+            if df:
+                table.add(term, postings=offset, dfs=df)
+                offset += 2 * df
+
+            for i in group:
+                runs[i].advance()
+                if runs[i].term is not None:
+                    heapq.heappush(heap, (runs[i].term, i))
+    table.close()
+
+def _write_term_postings(out, chunks: Iterator[array], scratch_path: str, dropped: Set[int],
+                         doc_lengths, avg_doc_length: float) -> int:
+
+    # write one term's postings: doc ids then term frequencies (uint32), the IMPACT_PREFIX postings
+    # with the highest BM25 term weight first (ties by doc id), then the rest in doc id order
+    # memory holds the prefix, one chunk and at most _MERGE_BUFFER postings; a longer list
+    # goes through a scratch file that is read back once per column
+    # returns the df (0 if every posting was dropped, nothing is written then)
+
+    top = []      # (BM25 term weight, -doc id, doc id, tf), strongest first
+    held = []
+    held_postings = 0
+    scratch = None
+    df = 0
+    try:
+        for pairs in chunks:
+            if dropped and not dropped.isdisjoint(pairs[0::2]):
+                pairs = array('I', itertools.chain.from_iterable(
+                    pair for pair in zip(pairs[0::2], pairs[1::2]) if pair[0] not in dropped))
+            n = len(pairs) // 2
+            if not n:
+                continue
+            df += n
+
+            candidates = top + [
+                (tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[doc_id] / avg_doc_length)),
+                 -doc_id, doc_id, tf)
+                for doc_id, tf in zip(pairs[0::2], pairs[1::2])
+            ]
+            if len(candidates) > IMPACT_PREFIX:
+                top = heapq.nlargest(IMPACT_PREFIX, candidates)
+            else:
+                candidates.sort(reverse=True)
+                top = candidates
+
+            if scratch is None and held_postings + n > _MERGE_BUFFER:
+                scratch = open(scratch_path, 'w+b')
+                for block in held:
+                    block.tofile(scratch)
+                held = []
+            if scratch is not None:
+                pairs.tofile(scratch)
+            else:
+                held.append(pairs)
+                held_postings += n
+        if not df:
+            return 0
+
+        def stored() -> Iterator[array]:
+            # every kept posting again, in doc id order
+            if scratch is None:
+                yield from held
+                return
+            scratch.seek(0)
+            remaining = df
+            while remaining:
+                block = array('I')
+                block.fromfile(scratch, 2 * min(remaining, _MERGE_CHUNK))
+                remaining -= len(block) // 2
+                yield block
+
+        in_prefix = {entry[2] for entry in top} if df > len(top) else None
+        for column in (2, 3): # doc ids, then term frequencies
+            array('I', map(itemgetter(column), top)).tofile(out)
+            if in_prefix is not None:
+                for block in stored():
+                    array('I', (value for doc_id, value in zip(block[0::2], block[column - 2::2])
+                                if doc_id not in in_prefix)).tofile(out)
+        return df
+    finally:
+        if scratch is not None:
+            scratch.close()
+            os.remove(scratch_path)
+
+def build_local_index(articles: Iterable[Dict], index_dir: str,
+                      block_postings: int = DEFAULT_BLOCK_POSTINGS) -> int:
+
+    # write an inverted index for the given articles into index_dir
+    # files: docs.bin (JSON documents), doc_offsets.bin, doc_lengths.bin,
+    #        postings.bin (doc ids then term frequencies per term),
+    #        terms.bin/term_offsets.bin/term_postings.bin/term_dfs.bin (sorted vocabulary),
+    #        keys.bin/key_offsets.bin/key_docs.bin (sorted PMID/URL -> doc id), meta.json
+    # memory is bounded by block_postings (and, in the merge, _MERGE_BUFFER), not by the corpus size
+    # returns the number of indexed articles (duplicates by PMID/URL are indexed once)
+
+    os.makedirs(index_dir, exist_ok=True)
+
+    postings: Dict[str, array] = defaultdict(lambda: array('I'))  # term -> doc, tf, doc, tf, ...
+    keys: List[Tuple[bytes, int]] = []
+    pending = 0
+    postings_runs, key_runs = [], []
+    total_length = 0
+    num_docs = 0
+    offsets = array('Q', [0])
+    lengths = array('I')
+
+    with tempfile.TemporaryDirectory(dir=index_dir) as run_dir:
+        with open(os.path.join(index_dir, 'docs.bin'), 'wb') as docs, \
+                open(os.path.join(index_dir, 'doc_offsets.bin'), 'wb') as doc_offsets, \
+                open(os.path.join(index_dir, 'doc_lengths.bin'), 'wb') as doc_lengths:
+            position = 0
+            for doc_id, article in enumerate(articles):
+                tokens = tokenize(f"{article.get('title', '')} {article.get('abstract', '')}")
+                counts = Counter(tokens)
+                for term, tf in counts.items():
+                    postings[term].extend((doc_id, tf))
+                pending += len(counts)
+                lengths.append(len(tokens))
+                total_length += len(tokens)
+                num_docs += 1
+
+                key = article.get('pmid') or article.get('url')
+                if key:
+                    keys.append((key.encode('utf-8'), doc_id))
+
+                data = json.dumps(article, separators=(',', ':')).encode('utf-8')
+                docs.write(data)
+                position += len(data)
+                offsets.append(position)
+
+                if pending >= block_postings:
+                    postings_run, key_run = _spill(run_dir, len(postings_runs), postings, keys)
+                    postings_runs.append(postings_run)
+                    key_runs.append(key_run)
+                    postings, keys, pending = defaultdict(lambda: array('I')), [], 0
+                if len(lengths) >= _TABLE_FLUSH:
+                    offsets.tofile(doc_offsets)
+                    lengths.tofile(doc_lengths)
+                    offsets, lengths = array('Q'), array('I')
+
+            offsets.tofile(doc_offsets)
+            lengths.tofile(doc_lengths)
+
+        if postings or keys:
+            postings_run, key_run = _spill(run_dir, len(postings_runs), postings, keys)
+            postings_runs.append(postings_run)
+            key_runs.append(key_run)
+        del postings, keys
+
+        dropped = _merge_keys(key_runs, index_dir)
+
+        with open(os.path.join(index_dir, 'doc_lengths.bin'), 'rb') as f:
+            all_lengths = _map_file(f, 'I')
+            try:
+                total_length -= sum(all_lengths[doc_id] for doc_id in dropped)
+                num_docs -= len(dropped)
+                avg_doc_length = (total_length / num_docs) if num_docs else 0.0
+                _merge_postings(postings_runs, index_dir, os.path.join(run_dir, 'term.scratch'), dropped,
+                                all_lengths, avg_doc_length or 1.0)
+            finally:
+                _release(all_lengths)
+
+    with open(os.path.join(index_dir, 'meta.json'), 'w') as f:
+        json.dump({
+            'format': INDEX_FORMAT,
+            'num_docs': num_docs,
+            'avg_doc_length': avg_doc_length,
+            'built_at': time.time()
+        }, f)
+
+    return num_docs
+
+def _map_file(f, typecode: Optional[str] = None):
+    # read-only memoryview over a whole file (typed if typecode), empty files included
+    if os.fstat(f.fileno()).st_size == 0: # mmap can't map empty files
+        view = memoryview(b'')
+    else:
+        view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    return view.cast(typecode) if typecode else view
+
+def _release(view):
+    mapped = view.obj
+    view.release()
+    if isinstance(mapped, mmap.mmap):
+        mapped.close()
+
+class LocalIndexScraper(BaseScraper):
+
+    # BaseScraper backed by a local BM25 index, drop-in replacement for PubMedScraper
+    # search_articles returns the same article dict shape, ranked by BM25 score
+    # max_postings_per_term: postings read per query term (highest impact first), None = all;
+    # terms rarer than that are scored exactly, common ones by their strongest matches
+
+    def __init__(self, index_dir: str, k1: float = BM25_K1, b: float = BM25_B,
+                 max_postings_per_term: Optional[int] = DEFAULT_MAX_POSTINGS_PER_TERM):
+        super().__init__(f"file://{os.path.abspath(index_dir)}")
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self.max_postings_per_term = max_postings_per_term
+
+        with open(os.path.join(index_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('format') != INDEX_FORMAT:
+            raise ValueError(f"index in {index_dir} has an old format, rebuild it")
+
+        self.num_docs = meta['num_docs']
+        self.avg_doc_length = meta['avg_doc_length'] or 1.0
+        self.last_updated = meta.get('built_at')  # used by HybridScraper freshness checks
+
+        # memory-map every file, the OS pages them in on demand
+        self._views = []
+        self._docs = self._map('docs.bin')
+        self._postings = self._map('postings.bin', 'I')
+        self._doc_offsets = self._map('doc_offsets.bin', 'Q')
+        self._doc_lengths = self._map('doc_lengths.bin', 'I')
+        self._terms = _StringTable(self._map('terms.bin'), self._map('term_offsets.bin', 'Q'))
+        self._term_postings = self._map('term_postings.bin', 'Q')
+        self._term_dfs = self._map('term_dfs.bin', 'I')
+        self._keys = _StringTable(self._map('keys.bin'), self._map('key_offsets.bin', 'Q'))
+        self._key_docs = self._map('key_docs.bin', 'I')
+
+    def _map(self, name: str, typecode: Optional[str] = None):
+        with open(os.path.join(self.index_dir, name), 'rb') as f:
+            view = _map_file(f, typecode)
+        self._views.append(view)
+        return view
+
+    def _document(self, doc_id: int) -> Dict:
+        start, end = self._doc_offsets[doc_id], self._doc_offsets[doc_id + 1]
+        return json.loads(bytes(self._docs[start:end]))
+
+    def _score(self, query: str) -> Dict[int, float]:
+        # BM25 score for every document in the traversed postings of the query terms
+        scores: Dict[int, float] = defaultdict(float)
+        k1, b, avgdl = self.k1, self.b, self.avg_doc_length
+        doc_lengths = self._doc_lengths
+
+        for term in set(tokenize(query)):
+            index = self._terms.find(term.encode('utf-8'))
+            if index < 0:
+                continue
+            offset, df = self._term_postings[index], self._term_dfs[index]
+            idf = math.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+            limit = df if self.max_postings_per_term is None else min(df, self.max_postings_per_term)
+            doc_ids = self._postings[offset:offset + limit]
+            tfs = self._postings[offset + df:offset + df + limit]
+            for doc_id, tf in zip(doc_ids, tfs):
+                norm = k1 * (1 - b + b * doc_lengths[doc_id] / avgdl)
+                scores[doc_id] += idf * tf * (k1 + 1) / (tf + norm)
+
+        return scores
+
+    def search_articles(self, keyword: str, max_results: int = 10) -> List[Dict]:
+
+        # top max_results articles for the keyword, best BM25 score first
+        # ties go to the earlier indexed article so results are deterministic
+
+        try:
+            scores = self._score(keyword)
+            top = heapq.nsmallest(max_results, scores.items(), key=lambda item: (-item[1], item[0]))
+            return [self._document(doc_id) for doc_id, _ in top]
+
+        except Exception as e: # same contract as PubMedScraper: log and return nothing
+            logger.warning(f"Error searching local index: {e}")
+            return []
+
+    def get_article_text(self, article_id: str) -> Optional[str]:
+        # abstract for a PMID, if it's in the index
+        index = self._keys.find(article_id.encode('utf-8'))
+        if index < 0:
+            return None
+        return self._document(self._key_docs[index]).get('abstract', '')
+
+    def close(self):
+        # release the memory maps
+        self._docs = self._postings = self._doc_offsets = self._doc_lengths = None
+        self._terms = self._term_postings = self._term_dfs = self._keys = self._key_docs = None
+        for view in self._views:
+            _release(view)
+        self._views = []
+
+if __name__ == "__main__":
+    # build an index from a corpus directory made by corpus/ingest.py
+    from corpus.ingest import iter_corpus
+
+    if len(sys.argv) != 3:
+        print("usage: python -m scrapers.local_index_scraper CORPUS_DIR INDEX_DIR")
+        sys.exit(1)
+
+    count = build_local_index(iter_corpus(sys.argv[1]), sys.argv[2])
+    print(f"Indexed {count} articles into {sys.argv[2]}")
@@ -3,9 +3,85 @@
 
 import requests
 import xml.etree.ElementTree as ET
-import time
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Optional, Union
 from .base_scraper import BaseScraper
+from .rate_limiter import TokenBucket, get_pubmed_rate_limiter
+from .article_cache import ArticleCache
+from .search_cache import SearchCache
+from telemetry import count, get_logger, span
+
+logger = get_logger('pubmed')
+
+PUBMED_EUTILS_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+
+# efetch batching: NCBI asks for POST above ~200 IDs, and very large batches time out
+EFETCH_GET_MAX_IDS = 200
+EFETCH_BATCH_SIZE = 500
+
+# bytes read per step when streaming an efetch response into the XML parser
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def extract_article_fields(article_elem) -> Dict:
+
+    # single-pass field extraction for one PubmedArticle element
+    # walks the subtree once instead of one './/' search per field,
+    # and keeps mixed-content text (e.g. <i>, <sup>) inside titles and abstracts
+    # returns a dictionary with: title, abstract, url, authors, publication_date, pmid (PubMed ID)
+
+    pmid = None
+    title = None
+    pub_date_elem = None
+    abstract_parts = []
+    authors = []
+
+    for elem in article_elem.iter():
+        tag = elem.tag
+
+        if tag == 'AbstractText': # abstract can have multiple parts
+            text = ''.join(elem.itertext())
+            if text:
+                # some abstracts have labels like "Background:", "Methods:"
+                label = elem.get('Label', '')
+                abstract_parts.append(f"{label}: {text}" if label else text)
+
+        elif tag == 'Author':
+            last_name = elem.find('LastName')
+            first_name = elem.find('ForeName')
+            if last_name is not None and first_name is not None: # ensure both names exist
+                authors.append(f"{first_name.text} {last_name.text}")
+
+        elif tag == 'PMID': # first PMID is the article's own, later ones are references
+            if pmid is None:
+                pmid = elem.text
+
+        elif tag == 'ArticleTitle':
+            if title is None:
+                title = ''.join(elem.itertext())
+
+        elif tag == 'PubDate':
+            if pub_date_elem is None:
+                pub_date_elem = elem
+
+    pmid = pmid or ""
+
+    # publication date as "Month Year" or just "Year"
+    pub_date = ""
+    if pub_date_elem is not None:
+        year = pub_date_elem.find('Year')
+        month = pub_date_elem.find('Month')
+        if year is not None:
+            pub_date = year.text
+            if month is not None:
+                pub_date = f"{month.text} {pub_date}"
+
+    return { # return the article data as a dict
+        'title': title or "",
+        'abstract': " ".join(abstract_parts),
+        'url': f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" if pmid else "",  # PubMed URL for the article
+        'authors': authors,
+        'publication_date': pub_date,
+        'pmid': pmid
+    }
 
 class PubMedScraper(BaseScraper):
     # connect to PubMed API
@@ -13,13 +89,19 @@ class PubMedScraper(BaseScraper):
     # fetch details (titles, abstracts, authors)
     # parse XML response
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 rate_limiter: Optional[TokenBucket] = None, cache: Optional[ArticleCache] = None,
+                 search_cache: Optional[SearchCache] = None, offline: bool = False):
 
-        # PubMed E-utilities base URL
+        # PubMed E-utilities base URL (override to point at a mirror or local stand-in)
 
-        super().__init__("https://eutils.ncbi.nlm.nih.gov/entrez/eutils/")
+        super().__init__(base_url or PUBMED_EUTILS_URL)
         self.api_key = api_key  # optional API key for higher rate limits
         self.session = requests.Session()  # reuse connections for efficiency
+        self.rate_limiter = rate_limiter or get_pubmed_rate_limiter(api_key)  # shared by all scrapers in the process
+        self.cache = cache      # optional persistent PMID -> article store
+        self.search_cache = search_cache  # optional keyword -> PMID list cache
+        self.offline = offline  # never touch the network, serve only what the cache has
         
     def search_articles(self, keyword: str, max_results: int = 10) -> List[Dict]:
 
@@ -28,59 +110,110 @@ class PubMedScraper(BaseScraper):
         # returns list of article dicts with title, abstract, url, authors, publication_date
 
         try:
-            print(f"Searching PubMed for: '{keyword}'")
+            logger.info(f"Searching PubMed for: '{keyword}'")
             
             # search for article IDs
             pmids = self._search_article_ids(keyword, max_results)
             
             if not pmids:
-                print("No articles found")
+                logger.info("No articles found")
                 return []
             
-            print(f"Found {len(pmids)} article IDs: {pmids[:3]}...")
+            logger.info(f"Found {len(pmids)} article IDs: {pmids[:3]}...")
             
             # fetch full details for those IDs
             articles = self._fetch_article_details(pmids)
             
-            print(f"Successfully parsed {len(articles)} articles")
+            logger.info(f"Successfully parsed {len(articles)} articles")
             return articles
             
         except Exception as e: # catch all errors
-            print(f"Error searching PubMed: {e}") # log error
+            logger.warning(f"Error searching PubMed: {e}") # log error
             return [] # return empty list on error
     
+    def search_multiple(self, keywords: List[str], max_results: int = 10) -> List[Dict]:
+
+        # search several keywords with one esearch each, but fetch every unique PMID only once
+        # PMIDs are merged in first-seen order (keyword order, then PubMed relevance)
+        # returns deduplicated list of article dicts in that order
+
+        ranked_pmids = []
+        seen = set()
+
+        for keyword in keywords:
+            try:
+                logger.info(f"Searching PubMed for: '{keyword}'")
+                pmids = self._search_article_ids(keyword, max_results)
+            except Exception as e: # one failed keyword shouldn't lose the others
+                logger.warning(f"Error searching PubMed: {e}")
+                continue
+
+            logger.info(f"Found {len(pmids)} article IDs: {pmids[:3]}...")
+            for pmid in pmids:
+                if pmid not in seen:
+                    seen.add(pmid)
+                    ranked_pmids.append(pmid)
+
+        if not ranked_pmids:
+            logger.info("No articles found")
+            return []
+
+        logger.info(f"Fetching {len(ranked_pmids)} unique articles for {len(keywords)} keywords")
+
+        try:
+            articles = self._fetch_article_details(ranked_pmids)
+        except Exception as e:
+            logger.warning(f"Error fetching PubMed articles: {e}")
+            return []
+
+        # efetch doesn't promise to keep our order, restore the merged ranking
+        rank = {pmid: i for i, pmid in enumerate(ranked_pmids)}
+        articles.sort(key=lambda article: rank.get(article.get('pmid'), len(rank)))
+
+        logger.info(f"Successfully parsed {len(articles)} articles")
+        return articles
+
     def _search_article_ids(self, keyword: str, max_results: int) -> List[str]:
 
         # search PubMed for article IDs matching the keyword
         # uses the 'esearch' E-utility
 
+        params = self._search_params(keyword, max_results)
+
+        # warm cache hits skip the round-trip and the rate limit token
+        pmids = self._cached_search(params)
+        if pmids is not None:
+            count('search_cache_hits')
+            return pmids
+
+        if self.offline:
+            raise RuntimeError("PubMed search unavailable in offline mode")
+
         search_url = f"{self.base_url}esearch.fcgi"
-        
-        # parameters for the search
-        params = {
-            'db': 'pubmed',           # search the PubMed database
-            'term': keyword,          # search keyword
-            'retmax': max_results,    # how many results to return
-            'retmode': 'json',        # return results as JSON (easier than XML)
-            'sort': 'relevance'       # sort by relevance
-        }
-        
-        # add API key if provided (allows 10 requests/sec vs 3 requests/sec)
-        if self.api_key:
-            params['api_key'] = self.api_key
-            
-        # make the API request
-        response = self.session.get(search_url, params=params)
-        response.raise_for_status()  # raise error if request failed
 
-        # add delay to respect rate limits (3 requests/sec without API key)
-        time.sleep(0.4)  # 400ms delay between requests
-        
-        # parse the JSON response to get article IDs
-        data = response.json()
+        with span('esearch'):
+            # wait for a rate limit token (3 requests/sec without API key), then make the API request
+            with span('rate_limit'):
+                self.rate_limiter.acquire()
+            response = self.session.get(search_url, params=params)
+            response.raise_for_status()  # raise error if request failed
+
+            # parse the JSON response to get article IDs
+            data = response.json()
         pmids = data.get('esearchresult', {}).get('idlist', [])
+        self._store_search(params, pmids)
         
         return pmids
+
+    def _cached_search(self, params: Dict) -> Optional[List[str]]:
+        # esearch cache lookup for these search parameters
+        if self.search_cache is None:
+            return None
+        return self.search_cache.get(params['term'], params['retmax'], params['sort'])
+
+    def _store_search(self, params: Dict, pmids: List[str]):
+        if self.search_cache is not None:
+            self.search_cache.put(params['term'], params['retmax'], params['sort'], pmids)
     
     def _fetch_article_details(self, pmids: List[str]) -> List[Dict]:
 
@@ -90,9 +223,93 @@ class PubMedScraper(BaseScraper):
         if not pmids:
             return []
             
+        # serve what we can from the cache, only download the rest
+        cached = self.cache.get_many(pmids) if self.cache is not None else {}
+        missing = [pmid for pmid in pmids if pmid not in cached]
+        count('article_cache_hits', len(cached))
+
+        fetched = []
+        if missing and not self.offline:
+            with span('efetch'):
+                fetched = self._download_article_details(missing)
+            count('articles_fetched', len(fetched))
+            if self.cache is not None:
+                self.cache.put_many(fetched)
+
+        return self._merge_cached(pmids, cached, fetched)
+
+    def _merge_cached(self, pmids: List[str], cached: Dict[str, Dict], fetched: List[Dict]) -> List[Dict]:
+
+        # combine cached and freshly downloaded articles in the requested PMID order
+
+        if not cached:
+            return fetched
+
+        by_pmid = dict(cached)
+        by_pmid.update((article['pmid'], article) for article in fetched)
+        return [by_pmid[pmid] for pmid in pmids if pmid in by_pmid]
+
+    def _download_article_details(self, pmids: List[str]) -> List[Dict]:
+
+        # efetch the given PMIDs from PubMed and parse them
+
+        return list(self.stream_article_details(pmids))
+
+    def stream_article_details(self, pmids: List[str]) -> Iterator[Dict]:
+
+        # efetch the given PMIDs and yield each article as soon as its XML element closes
+        # the response is parsed while it downloads, so memory stays flat for big batches
+        # and callers can start scoring before the download finishes
+
         fetch_url = f"{self.base_url}efetch.fcgi"
+
+        # fetch in batches to stay under the E-utilities URL and POST limits
+        for start in range(0, len(pmids), EFETCH_BATCH_SIZE):
+            batch = pmids[start:start + EFETCH_BATCH_SIZE]
+            params = self._fetch_params(batch)
+
+            # wait for a rate limit token, then make the API request
+            # long ID lists go in a POST body so the URL doesn't get too long
+            with span('rate_limit'):
+                self.rate_limiter.acquire()
+            if len(batch) > EFETCH_GET_MAX_IDS:
+                response = self.session.post(fetch_url, data=params, stream=True)
+            else:
+                response = self.session.get(fetch_url, params=params, stream=True)
+
+            with response:
+                response.raise_for_status()
+
+                # parse the XML response chunk by chunk
+                parser = PubMedStreamParser(self)
+                try:
+                    for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                        yield from parser.feed(chunk)
+                    yield from parser.close()
+                except ET.ParseError as e: # keep the articles parsed before the error
+                    logger.warning(f"Error parsing XML: {e}")
+    
+    def _search_params(self, keyword: str, max_results: int) -> Dict:
+
+        # query parameters for an esearch request
+
+        params = {
+            'db': 'pubmed',           # search the PubMed database
+            'term': keyword,          # search keyword
+            'retmax': max_results,    # how many results to return
+            'retmode': 'json',        # return results as JSON (easier than XML)
+            'sort': 'relevance'       # sort by relevance
+        }
         
-        # parameters for fetching details
+        # add API key if provided (allows 10 requests/sec vs 3 requests/sec)
+        if self.api_key:
+            params['api_key'] = self.api_key
+        return params
+
+    def _fetch_params(self, pmids: List[str]) -> Dict:
+
+        # query parameters for an efetch request
+
         params = {
             'db': 'pubmed',
             'id': ','.join(pmids),     # comma-separated list of PMIDs
@@ -102,38 +319,22 @@ class PubMedScraper(BaseScraper):
         
         if self.api_key: # add API key if available
             params['api_key'] = self.api_key # add API key to params
+        return params
 
-        # make the API request
-        response = self.session.get(fetch_url, params=params)
-        response.raise_for_status()
-
-        # add delay to respect rate limits
-        time.sleep(0.4)  # 400ms delay between requests
-        
-        # parse the XML response
-        return self._parse_pubmed_xml(response.text)
-    
     def _parse_pubmed_xml(self, xml_content: str) -> List[Dict]:
 
         # parse PubMed XML response into list of article dicts
         # since PubMed returns complex XML, extract useful fields
 
         articles = []
+        parser = PubMedStreamParser(self)
         
         try:
-            # parse the XML
-            root = ET.fromstring(xml_content)
-            
-            # find all article elements
-            for article_elem in root.findall('.//PubmedArticle'):
-                article = self._extract_article_data(article_elem)
-                
-                # only add if we got valid data
-                if article and self.validate_article_data(article):
-                    articles.append(article)
+            articles.extend(parser.feed(xml_content))
+            articles.extend(parser.close())
                     
         except ET.ParseError as e: # catch XML parsing errors
-            print(f"Error parsing XML: {e}")
+            logger.warning(f"Error parsing XML: {e}")
             
         return articles # return list of article dicts
     
@@ -143,63 +344,10 @@ class PubMedScraper(BaseScraper):
         # returns a dictionary with: title, abstract, url, authors, publication_date, pmid (PubMed ID)
     
         try: # try to extract fields, return None if any error occurs
-            # extract PMID (PubMed ID)
-            pmid_elem = article_elem.find('.//PMID')
-            pmid = pmid_elem.text if pmid_elem is not None else ""
-
-            # extract title
-            title_elem = article_elem.find('.//ArticleTitle')
-            title = title_elem.text if title_elem is not None else ""
-
-            # extract abstract (can have multiple parts)
-            abstract_parts = []
-            abstract_elems = article_elem.findall('.//AbstractText')
-            for elem in abstract_elems:
-                if elem.text:
-                    # some abstracts have labels like "Background:", "Methods:"
-                    label = elem.get('Label', '')
-                    text = elem.text
-                    if label:
-                        abstract_parts.append(f"{label}: {text}")
-                    else:
-                        abstract_parts.append(text)
-            
-            abstract = " ".join(abstract_parts) if abstract_parts else ""
-            
-            # extract authors
-            authors = []
-            author_elems = article_elem.findall('.//Author')
-            for author_elem in author_elems:
-                last_name = author_elem.find('LastName')
-                first_name = author_elem.find('ForeName')
-                if last_name is not None and first_name is not None: # ensure both names exist
-                    authors.append(f"{first_name.text} {last_name.text}")
-            
-            # extract publication date
-            pub_date = ""
-            date_elem = article_elem.find('.//PubDate')
-            if date_elem is not None:
-                year = date_elem.find('Year')
-                month = date_elem.find('Month')
-                if year is not None:
-                    pub_date = year.text
-                    if month is not None:
-                        pub_date = f"{month.text} {pub_date}"
-            
-            # create PubMed URL for the article
-            url = f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" if pmid else ""
-            
-            return { # return the article data as a dict
-                'title': title,
-                'abstract': abstract,
-                'url': url,
-                'authors': authors,
-                'publication_date': pub_date,
-                'pmid': pmid
-            }
+            return extract_article_fields(article_elem)
             
         except Exception as e: # catch all errors
-            print(f"Error extracting article data: {e}")
+            logger.warning(f"Error extracting article data: {e}")
             return None
     
     def get_article_text(self, article_id: str) -> Optional[str]: # article_id is the PubMed ID (PMID)
@@ -214,6 +362,58 @@ class PubMedScraper(BaseScraper):
             return None
             
         except Exception as e:
-            print(f"Error fetching article {article_id}: {e}")
+            logger.warning(f"Error fetching article {article_id}: {e}")
             return None
 
+
+
+class PubMedStreamParser:
+
+    # incremental parser for efetch XML
+    # feed it bytes (or text) as they arrive, it returns the article dicts completed so far
+    # each finished top-level element is cleared, so only one article is in memory at a time
+    # PMIDs listed in <DeleteCitation> (PubMed update files) are collected in self.deleted
+
+    def __init__(self, scraper: PubMedScraper):
+        self.scraper = scraper
+        self.deleted: List[str] = []
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._root = None
+        self._depth = 0
+
+    def feed(self, data: Union[bytes, str]) -> List[Dict]:
+        with span('xml_parse'):
+            self._parser.feed(data)
+            return self._drain()
+
+    def close(self) -> List[Dict]:
+        with span('xml_parse'):
+            self._parser.close()
+            return self._drain()
+
+    def _drain(self) -> List[Dict]:
+        articles = []
+        for event, elem in self._parser.read_events():
+            if event == 'start':
+                if self._root is None:
+                    self._root = elem
+                self._depth += 1
+                continue
+
+            self._depth -= 1
+            if self._depth != 1: # only act on direct children of PubmedArticleSet
+                continue
+
+            if elem.tag == 'PubmedArticle':
+                article = self.scraper._extract_article_data(elem)
+
+                # only add if we got valid data
+                if article and self.scraper.validate_article_data(article):
+                    articles.append(article)
+            elif elem.tag == 'DeleteCitation':
+                self.deleted.extend(pmid.text.strip() for pmid in elem.findall('PMID') if pmid.text)
+
+            # drop the finished element so the tree never grows
+            self._root.clear()
+
+        return articles
@@ -0,0 +1,90 @@
+# token bucket rate limiter shared by every PubMed scraper in the process
+# NCBI E-utilities allow 3 requests/sec without an API key, 10 requests/sec with one
+# callers only wait when the bucket is empty, works from threads and asyncio
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+# NCBI E-utilities request limits (requests per second)
+PUBMED_RATE_NO_KEY = 3.0
+PUBMED_RATE_WITH_KEY = 10.0
+
+class TokenBucket:
+
+    # classic token bucket: tokens refill at `rate` per second up to `capacity`
+    # each request takes one token, when none are left the caller waits for the next one
+    # waiting callers reserve their token up front, so concurrent callers queue fairly
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else 1.0
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+        # metrics
+        self.acquired = 0          # total tokens handed out
+        self.waits = 0             # how many acquisitions had to wait
+        self.total_wait_time = 0.0 # seconds spent waiting for tokens
+
+    def _reserve(self) -> float:
+        # take one token and return how long the caller must wait before using it
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+            self.acquired += 1
+            if wait > 0:
+                self.waits += 1
+                self.total_wait_time += wait
+            return wait
+
+    def acquire(self) -> float:
+        # blocking acquire for threads, returns the time spent waiting
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        # non-blocking acquire for asyncio code, returns the time spent waiting
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def get_metrics(self) -> Dict:
+        # snapshot of limiter metrics
+        with self._lock:
+            return {
+                'rate': self.rate,
+                'acquired': self.acquired,
+                'waits': self.waits,
+                'total_wait_time': round(self.total_wait_time, 4)
+            }
+
+# one bucket per rate tier, shared by every scraper in the process
+_pubmed_buckets: Dict[bool, TokenBucket] = {}
+_pubmed_buckets_lock = threading.Lock()
+
+def get_pubmed_rate_limiter(api_key: Optional[str] = None) -> TokenBucket:
+
+    # return the process-wide PubMed bucket for this key tier
+    # with an API key the limit is 10 requests/sec, otherwise 3 requests/sec
+
+    has_key = bool(api_key)
+    with _pubmed_buckets_lock:
+        bucket = _pubmed_buckets.get(has_key)
+        if bucket is None:
+            bucket = TokenBucket(PUBMED_RATE_WITH_KEY if has_key else PUBMED_RATE_NO_KEY)
+            _pubmed_buckets[has_key] = bucket
+        return bucket
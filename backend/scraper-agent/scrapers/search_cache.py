@@ -0,0 +1,148 @@
+# esearch result cache: normalized (term, retmax, sort) -> list of PMIDs
+# AI-generated keywords repeat across requests with only casing/spacing changes,
+# so a warm hit skips the esearch round-trip and its rate limit token
+# bounded in-memory LRU, optionally backed by SQLite so worker processes share results
+
+import os
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from telemetry import get_logger
+
+logger = get_logger('cache')
+
+DEFAULT_SEARCH_TTL = 3600        # one hour, new literature appears slowly
+DEFAULT_SEARCH_MAX_ENTRIES = 2048
+
+def normalize_term(term: str) -> str:
+    # PubMed search is case-insensitive, and extra whitespace doesn't change the query
+    return ' '.join(term.lower().split())
+
+class SearchCache:
+
+    # thread-safe LRU of esearch results with a TTL
+    # with a path, misses fall through to a SQLite table shared by every process using that file
+
+    def __init__(self, ttl: float = DEFAULT_SEARCH_TTL, max_entries: int = DEFAULT_SEARCH_MAX_ENTRIES,
+                 path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if path:
+            if path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            with self._conn:
+                if path != ':memory:':
+                    self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS searches ("
+                    " key TEXT PRIMARY KEY,"
+                    " pmids TEXT NOT NULL,"
+                    " fetched_at REAL NOT NULL)"
+                )
+
+    @staticmethod
+    def make_key(term: str, retmax: int, sort: str) -> str:
+        return json.dumps([normalize_term(term), int(retmax), sort])
+
+    def get(self, term: str, retmax: int, sort: str = 'relevance') -> Optional[List[str]]:
+
+        # cached PMIDs for this search, or None on a miss / expired entry
+
+        key = self.make_key(term, retmax, sort)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[1])
+
+            if entry is not None: # expired
+                del self._entries[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT pmids, fetched_at FROM searches WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] <= self.ttl:
+                    pmids = json.loads(row[0])
+                    self._remember(key, row[1], pmids)
+                    self.hits += 1
+                    return list(pmids)
+
+            self.misses += 1
+            return None
+
+    def put(self, term: str, retmax: int, sort: str, pmids: List[str]):
+
+        # store the PMIDs returned by an esearch call
+
+        key = self.make_key(term, retmax, sort)
+        now = time.time()
+
+        with self._lock:
+            self._remember(key, now, list(pmids))
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO searches (key, pmids, fetched_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(pmids), now)
+                    )
+                    self._conn.execute("DELETE FROM searches WHERE fetched_at < ?", (now - self.ttl,))
+
+    def _remember(self, key: str, fetched_at: float, pmids: List[str]):
+        # add to the in-memory LRU, dropping the oldest entries above the cap (lock held)
+        self._entries[key] = (fetched_at, pmids)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'entries': len(self._entries)
+        }
+
+def _env_number(name: str, parse, default):
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return parse(value)
+    except ValueError:
+        logger.warning(f"Ignoring {name}={value!r}, using {default}")
+        return default
+
+def get_default_search_cache() -> SearchCache:
+
+    # build the esearch cache from environment settings
+    # PUBMED_SEARCH_CACHE_TTL, PUBMED_SEARCH_CACHE_MAX_ENTRIES,
+    # PUBMED_SEARCH_CACHE_PATH (optional SQLite file shared across worker processes)
+
+    # a malformed setting falls back to its default, the cache is an optimization, never fatal
+    ttl = _env_number('PUBMED_SEARCH_CACHE_TTL', float, DEFAULT_SEARCH_TTL)
+    max_entries = _env_number('PUBMED_SEARCH_CACHE_MAX_ENTRIES', int, DEFAULT_SEARCH_MAX_ENTRIES)
+    path = os.getenv('PUBMED_SEARCH_CACHE_PATH') or None
+
+    try:
+        return SearchCache(ttl, max_entries, path)
+    except (sqlite3.Error, OSError) as e: # fall back to a process-local cache
+        logger.warning(f"Persistent search cache unavailable: {e}")
+        return SearchCache(ttl, max_entries)
@@ -0,0 +1,314 @@
+# cross-process PubMed article cache: one memory-mapped, append-only file keyed by PMID
+# drop-in for ArticleCache (get_many/put_many) when several diagnosis workers run on one host:
+# every process maps the same file, so cached articles live once in the OS page cache
+# instead of once per worker, and an article fetched by one worker is a hit for all of them
+#
+# file layout:
+#   header (64 bytes)  magic, version, end of committed data, retired flag
+#   records            [data length u32][pmid length u16][fetched_at f64][pmid][article JSON]
+# writers append under an exclusive file lock and publish by advancing the header's end offset,
+# so readers never take a lock and never see a half-written record; each process keeps an
+# in-memory PMID -> offset index, extended from where it last stopped whenever the end moves
+# a refreshed article is appended again and the newest record wins
+# compaction (above max_bytes) rewrites the newest fresh records, down to half of max_bytes, into
+# a new file, swaps it in with os.replace and marks the old one retired, which tells other
+# processes to reopen
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from scrapers.article_cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL
+from telemetry import get_logger
+
+try:
+    import fcntl
+except ImportError: # Windows: appends are only serialized within this process
+    fcntl = None
+
+logger = get_logger('cache')
+
+MAGIC = b'MSAC'
+VERSION = 1
+HEADER = struct.Struct('<4sIQI')   # magic, version, end, retired
+HEADER_SIZE = 64
+END_OFFSET = 8                     # byte offset of 'end' inside the header
+RETIRED_OFFSET = 16
+RECORD = struct.Struct('<IHd')     # data length, pmid length, fetched_at
+
+INITIAL_CAPACITY = 1024 * 1024
+CREATE_RETRIES = 50
+CREATE_RETRY_DELAY = 0.01
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+class SharedArticleCache:
+
+    # PMID -> article dict store shared by every process that opens the same path
+    # readonly: never append (workers that only consume what a fetcher process writes)
+    # ttl: seconds before an entry counts as a miss, None = never
+    # max_entries/max_bytes: once the file passes max_bytes, compaction keeps the newest fresh
+    # articles, at most max_entries of them and at most max_bytes / 2
+
+    def __init__(self, path: str, ttl: Optional[float] = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES,
+                 readonly: bool = False):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.readonly = readonly
+
+        self.hits = 0
+        self.misses = 0
+        self.compactions = 0
+
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        self._index: Dict[str, Tuple[int, int, float]] = {}  # pmid -> (data offset, data length, fetched_at)
+        self._scanned = HEADER_SIZE
+
+        if not readonly:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            self._open()
+
+    # file handling (self._lock held)
+
+    def _open(self):
+        self._close()
+        flags = os.O_RDONLY if self.readonly else os.O_RDWR | os.O_CREAT
+        self._fd = os.open(self.path, flags, 0o644)
+
+        if self.readonly:
+            header = self._read_header_retrying()
+        else:
+            # creating the file and checking its header both happen under the lock, so we never
+            # look at a file another process has extended but not yet given a header
+            with self._file_lock():
+                if os.fstat(self._fd).st_size < HEADER_SIZE:
+                    os.pwrite(self._fd, HEADER.pack(MAGIC, VERSION, HEADER_SIZE, 0), 0)
+                    os.ftruncate(self._fd, INITIAL_CAPACITY)
+                header = os.pread(self._fd, HEADER.size, 0)
+
+        magic, version, _, _ = HEADER.unpack(header.ljust(HEADER.size, b'\0'))
+        if magic != MAGIC or version != VERSION:
+            self._close()
+            raise ValueError(f"{self.path} is not a shared article cache (version {VERSION})")
+
+        self._map = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+        self._index = {}
+        self._scanned = HEADER_SIZE
+
+    def _read_header_retrying(self) -> bytes:
+        # readers don't lock: a file that is still being created has no header for a moment
+        header = os.pread(self._fd, HEADER.size, 0)
+        for _ in range(CREATE_RETRIES):
+            if len(header) == HEADER.size and header[:4] != b'\0\0\0\0':
+                break
+            time.sleep(CREATE_RETRY_DELAY)
+            header = os.pread(self._fd, HEADER.size, 0)
+        return header
+
+    def _close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    @contextmanager
+    def _file_lock(self):
+        # exclusive lock held by one appending process at a time
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _refresh(self):
+
+        # pick up records appended since the last look (by any process)
+
+        _, _, end, retired = HEADER.unpack_from(self._map, 0)
+        if retired: # compacted by another process, the path holds the new file
+            self._open()
+            _, _, end, _ = HEADER.unpack_from(self._map, 0)
+
+        if end > len(self._map): # the file grew past our mapping
+            self._map.close()
+            self._map = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+
+        offset = self._scanned
+        view = self._map
+        while offset + RECORD.size <= end:
+            data_len, pmid_len, fetched_at = RECORD.unpack_from(view, offset)
+            pmid_start = offset + RECORD.size
+            data_start = pmid_start + pmid_len
+            if data_start + data_len > end: # can't happen for published records
+                logger.warning(f"Shared article cache {self.path} has a truncated record at {offset}")
+                break
+            pmid = view[pmid_start:data_start].decode('utf-8')
+            self._index[pmid] = (data_start, data_len, fetched_at)
+            offset = data_start + data_len
+        self._scanned = offset
+
+    # ArticleCache interface
+
+    def get_many(self, pmids: List[str]) -> Dict[str, Dict]:
+
+        # return {pmid: article} for every fresh cached PMID
+        # reads straight from the shared mapping, only the matched records are copied out
+
+        if not pmids:
+            return {}
+
+        now = time.time()
+        found = {}
+        with self._lock:
+            self._refresh()
+            for pmid in pmids:
+                entry = self._index.get(pmid)
+                if entry is None or pmid in found:
+                    continue
+                offset, length, fetched_at = entry
+                if self.ttl is not None and now - fetched_at > self.ttl:
+                    continue
+                found[pmid] = json.loads(self._map[offset:offset + length])
+
+            self.hits += len(found)
+            self.misses += len(set(pmids)) - len(found)
+        return found
+
+    def get(self, pmid: str) -> Optional[Dict]:
+        return self.get_many([pmid]).get(pmid)
+
+    def put_many(self, articles: List[Dict]):
+
+        # append parsed articles and publish them to every process
+        # no-op for readonly caches
+
+        if self.readonly:
+            return
+
+        now = time.time()
+        blob = bytearray()
+        for article in articles:
+            pmid = article.get('pmid')
+            if not pmid:
+                continue
+            pmid_bytes = pmid.encode('utf-8')
+            data = json.dumps(article, separators=(',', ':')).encode('utf-8')
+            blob += RECORD.pack(len(data), len(pmid_bytes), now)
+            blob += pmid_bytes
+            blob += data
+        if not blob:
+            return
+
+        with self._lock:
+            self._append(bytes(blob))
+            self._refresh()
+            if self._scanned > self.max_bytes:
+                self._compact()
+
+    def put(self, article: Dict):
+        self.put_many([article])
+
+    def _append(self, blob: bytes):
+        # write blob after the committed data, then advance the header (self._lock held)
+        while True:
+            with self._file_lock():
+                _, _, end, retired = HEADER.unpack(os.pread(self._fd, HEADER.size, 0))
+                if not retired:
+                    size = os.fstat(self._fd).st_size
+                    if end + len(blob) > size:
+                        os.ftruncate(self._fd, max(size * 2, end + len(blob)))
+                    os.pwrite(self._fd, blob, end)
+                    os.pwrite(self._fd, struct.pack('<Q', end + len(blob)), END_OFFSET)  # publish
+                    return
+            self._open() # another process compacted while we waited for the lock
+
+    def _compact(self, keep: bool = True):
+
+        # rewrite the newest fresh records (none if not keep) into a new file,
+        # swap it in and retire the old one (self._lock held)
+
+        with self._file_lock():
+            _, _, _, retired = HEADER.unpack(os.pread(self._fd, HEADER.size, 0))
+            if not retired: # else someone else just did it
+                self._rewrite(keep)
+                self.compactions += 1
+        self._open()
+
+    def _rewrite(self, keep: bool):
+        # (self._lock and the file lock held)
+        self._refresh()
+
+        # keep the newest fresh records up to max_entries and half of max_bytes, so the file has
+        # room to grow again before the next compaction
+        now = time.time()
+        live = []
+        size = HEADER_SIZE
+        if keep:
+            newest = sorted(self._index.items(), key=lambda item: item[1][0], reverse=True)  # append order
+            for pmid, (offset, length, fetched_at) in newest:
+                if len(live) >= self.max_entries:
+                    break
+                if self.ttl is not None and now - fetched_at > self.ttl:
+                    continue
+                pmid_bytes = pmid.encode('utf-8')
+                size += RECORD.size + len(pmid_bytes) + length
+                if size > self.max_bytes // 2:
+                    break
+                live.append((pmid_bytes, self._map[offset:offset + length], fetched_at))
+            live.reverse()
+
+        body = bytearray()
+        for pmid_bytes, data, fetched_at in live:
+            body += RECORD.pack(len(data), len(pmid_bytes), fetched_at)
+            body += pmid_bytes
+            body += data
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, HEADER_SIZE + len(body), 0).ljust(HEADER_SIZE, b'\0'))
+            f.write(body)
+            f.truncate(max(INITIAL_CAPACITY, HEADER_SIZE + len(body)))
+        os.replace(tmp_path, self.path)
+        os.pwrite(self._fd, struct.pack('<I', 1), RETIRED_OFFSET)  # old file: tell readers to reopen
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._index)
+
+    def clear(self):
+        if self.readonly:
+            return
+        with self._lock:
+            self._compact(keep=False)
+
+    def get_stats(self) -> Dict:
+        # counters for monitoring cache effectiveness
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'compactions': self.compactions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'entries': len(self),
+            'bytes': self._scanned
+        }
+
+    def close(self):
+        with self._lock:
+            self._close()
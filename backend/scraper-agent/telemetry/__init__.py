@@ -0,0 +1,7 @@
+# logging and per-request instrumentation for the scraper/diagnosis pipeline
+# get_logger() for progress messages (stderr), request()/span()/count() for stage timings
+
+from .log import get_logger
+from .metrics import RequestMetrics, bind, configure, count, current, enabled, request, span
+
+__all__ = ["get_logger", "RequestMetrics", "bind", "configure", "count", "current", "enabled", "request", "span"]
@@ -0,0 +1,82 @@
+# logging for library code: progress and errors go to stderr, never stdout
+# (stdout carries ai_diagnosis_api.py's JSON results)
+# MEDISYN_LOG_LEVEL sets the level (default INFO, also used for an unknown level name),
+# MEDISYN_LOG_FORMAT=json writes one JSON object per line instead of the plain message
+
+import json
+import logging
+import os
+import sys
+import threading
+from typing import Optional, Tuple
+
+from telemetry.metrics import current
+
+LOGGER_NAME = 'medisyn'
+
+class _StderrHandler(logging.StreamHandler):
+    # resolves sys.stderr on every record, so redirected stderr is honoured
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+class JsonFormatter(logging.Formatter):
+
+    # {"ts", "level", "logger", "message"} plus the measured request's name/fields, if any
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        metrics = current()
+        if metrics is not None:
+            entry['request'] = metrics.name
+            entry.update((key, value) for key, value in metrics.fields.items() if key not in entry)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+_configured = False
+_configure_lock = threading.Lock()
+
+def _level_from_env() -> Tuple[int, Optional[str]]:
+    # (level, the unusable MEDISYN_LOG_LEVEL value or None); a level name or number
+    value = os.getenv('MEDISYN_LOG_LEVEL', '').strip().upper()
+    if not value:
+        return logging.INFO, None
+    level = int(value) if value.isdigit() else logging.getLevelName(value)
+    if not isinstance(level, int): # getLevelName gives back 'Level X' for unknown names
+        return logging.INFO, value
+    return level, None
+
+def _configure():
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        root = logging.getLogger(LOGGER_NAME)
+        if not root.handlers: # the host application may have set its own
+            handler = _StderrHandler()
+            if os.getenv('MEDISYN_LOG_FORMAT', '').strip().lower() == 'json':
+                handler.setFormatter(JsonFormatter())
+            else:
+                handler.setFormatter(logging.Formatter('%(message)s'))
+            root.addHandler(handler)
+            root.propagate = False
+        level, unknown = _level_from_env()
+        root.setLevel(level)
+        _configured = True
+    if unknown is not None:
+        root.warning(f"Ignoring MEDISYN_LOG_LEVEL={unknown!r}, using INFO")
+
+def get_logger(name: str) -> logging.Logger:
+    # logger under the 'medisyn' hierarchy, e.g. get_logger('pubmed') -> medisyn.pubmed
+    _configure()
+    return logging.getLogger(f'{LOGGER_NAME}.{name}')
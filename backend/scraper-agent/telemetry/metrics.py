@@ -0,0 +1,197 @@
+# per-request timing breakdowns and counters for the scraper/diagnosis pipeline
+# request('diagnosis') opens a scope, span('efetch') times a stage inside it and
+# count('articles_fetched', n) bumps a counter; when the scope ends one JSON record
+# with every stage's {count, seconds} and every counter goes to the metrics sink
+#
+# stages: llm, esearch, efetch, xml_parse, rate_limit, local_search, relevance, certainty, evidence, ranking
+# stages nest (efetch includes the xml_parse and rate_limit time of its batches)
+#
+# MEDISYN_METRICS selects the sink: unset/'off' disables it, 'stderr' writes to stderr,
+# anything else is a file that records are appended to as JSON lines
+# disabled, request() is a bare yield and span()/count() are one context variable lookup
+
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, TextIO, Union
+
+class RequestMetrics:
+
+    # stage timings and counters of one request, safe to update from worker threads
+
+    def __init__(self, name: str, fields: Optional[Dict] = None):
+        self.name = name
+        self.fields = dict(fields or {})
+        self.started = time.perf_counter()
+        self.seconds: Optional[float] = None  # set when the request ends
+        self.stages: Dict[str, list] = {}     # stage -> [count, seconds]
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add_time(self, stage: str, seconds: float):
+        with self._lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                self.stages[stage] = [1, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+
+    def add_count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+
+    def to_record(self) -> Dict:
+        with self._lock:
+            return {
+                'request': self.name,
+                **self.fields,
+                'seconds': round(self.seconds if self.seconds is not None else time.perf_counter() - self.started, 6),
+                'stages': {stage: {'count': count, 'seconds': round(seconds, 6)}
+                           for stage, (count, seconds) in self.stages.items()},
+                'counters': dict(self.counters)
+            }
+
+class _Span:
+
+    # times one stage into a RequestMetrics
+
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics: RequestMetrics, stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_time(self.stage, time.perf_counter() - self.start)
+        return False
+
+class _NullSpan:
+    # shared do-nothing span for when no request is being measured
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+# metrics of the request running in this thread/task; only ever set while a sink is configured
+_current: contextvars.ContextVar = contextvars.ContextVar('medisyn_request_metrics', default=None)
+
+class _Sink:
+
+    # writes one JSON record per line to a stream, opening files lazily
+
+    def __init__(self, target: Union[str, TextIO]):
+        self.target = target
+        self._stream: Optional[TextIO] = None if isinstance(target, str) else target
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict):
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock:
+            stream = self._stream
+            if stream is None:
+                if self.target == 'stderr':
+                    stream = sys.stderr  # looked up per write, so redirected stderr is honoured
+                else:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.target)), exist_ok=True)
+                    stream = self._stream = open(self.target, 'a', encoding='utf-8')
+            stream.write(line)
+            stream.flush()
+
+    def close(self):
+        with self._lock:
+            if self._stream is not None and isinstance(self.target, str):
+                self._stream.close()
+            self._stream = None
+
+def _sink_from(target) -> Optional[_Sink]:
+    if target is None or (isinstance(target, str) and target.strip().lower() in ('', 'off', '0', 'false', 'none')):
+        return None
+    return _Sink(target.strip() if isinstance(target, str) else target)
+
+_sink: Optional[_Sink] = _sink_from(os.getenv('MEDISYN_METRICS'))
+
+def configure(target: Union[None, str, TextIO]):
+
+    # switch the metrics sink: None/'off', 'stderr', a file path or a writable text stream
+    # (MEDISYN_METRICS sets the initial one)
+
+    global _sink
+    previous, _sink = _sink, _sink_from(target)
+    if previous is not None:
+        previous.close()
+
+def enabled() -> bool:
+    return _sink is not None
+
+def current() -> Optional[RequestMetrics]:
+    # metrics of the request being measured here, or None
+    return _current.get()
+
+@contextmanager
+def request(name: str, **fields) -> Iterator[Optional[RequestMetrics]]:
+
+    # measure everything run inside the block as one request and emit its record at the end
+    # fields (e.g. id=...) are copied into the record; nested scopes add to the outer request
+
+    outer = _current.get()
+    if _sink is None or outer is not None:
+        yield outer
+        return
+
+    metrics = RequestMetrics(name, fields)
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    except Exception as e:
+        metrics.fields['error'] = type(e).__name__
+        raise
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError: # closed from another context (e.g. an abandoned generator)
+            pass
+        metrics.finish()
+        sink = _sink
+        if sink is not None:
+            sink.write(metrics.to_record())
+
+def span(stage: str):
+    # context manager timing a stage of the current request (no-op outside one)
+    metrics = _current.get()
+    if metrics is None:
+        return _NULL_SPAN
+    return _Span(metrics, stage)
+
+def count(name: str, n: int = 1):
+    # add n to a counter of the current request (no-op outside one)
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_count(name, n)
+
+def bind(fn: Callable) -> Callable:
+
+    # fn wrapped to run in a copy of the caller's context, so spans and counts from
+    # executor threads land in the caller's request; call once per submit
+    # (one context can't be entered by two threads at the same time)
+
+    if _current.get() is None:
+        return fn
+    return functools.partial(contextvars.copy_context().run, fn)
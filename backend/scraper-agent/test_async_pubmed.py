@@ -0,0 +1,67 @@
+# test script for the async PubMed client
+# runs against a local stand-in E-utilities server with recorded responses, no network needed
+
+import asyncio
+import time
+from fixtures.eutils_server import EUtilsStubServer, make_scraper, unlimited_rate_limiter
+from scrapers.async_pubmed_scraper import AsyncPubMedScraper
+
+def test_async_matches_sync():
+
+    # the async client parses exactly what the sync client parses
+
+    with EUtilsStubServer() as server:
+        sync_scraper = make_scraper(server)
+        expected = sync_scraper.search_articles("PCOS diagnosis symptoms women", max_results=2)
+
+        async def run():
+            async with AsyncPubMedScraper(base_url=server.base_url, rate_limiter=unlimited_rate_limiter()) as scraper:
+                return await scraper.search_articles_async("PCOS diagnosis symptoms women", max_results=2)
+
+        articles = asyncio.run(run())
+
+    assert articles == expected
+    assert [a['pmid'] for a in articles] == ["38012345", "34456789"]
+    assert articles[0]['authors'][0] == "Sarah Nguyen"
+
+def test_many_keywords_in_flight():
+
+    # with 100ms server latency, 4 keywords (8 requests) finish in about 2 round-trips, not 8
+
+    keywords = [
+        "PCOS diagnosis symptoms women",
+        "endometriosis diagnosis symptoms women",
+        "peripartum cardiomyopathy diagnosis symptoms women",
+        "thyroid disorders diagnosis symptoms women",
+    ]
+
+    with EUtilsStubServer(latency=0.1) as server:
+        async def run():
+            async with AsyncPubMedScraper(base_url=server.base_url, rate_limiter=unlimited_rate_limiter()) as scraper:
+                start = time.monotonic()
+                results = await scraper.search_many_async(keywords, max_results=2)
+                return results, time.monotonic() - start
+
+        results, elapsed = asyncio.run(run())
+        assert server.esearch_calls == 4
+        assert server.efetch_calls == 4
+
+    assert list(results) == keywords
+    assert all(results[keyword] for keyword in keywords)
+    assert elapsed < 0.6, elapsed
+
+def test_errors_return_empty_list():
+
+    # a dead backend gives an empty result instead of raising
+
+    async def run():
+        async with AsyncPubMedScraper(base_url="http://127.0.0.1:9/", rate_limiter=unlimited_rate_limiter(), timeout=2) as scraper:
+            return await scraper.search_articles_async("PCOS")
+
+    assert asyncio.run(run()) == []
+
+if __name__ == "__main__":
+    for test in [test_async_matches_sync, test_many_keywords_in_flight, test_errors_return_empty_list]:
+        test()
+        print(f"{test.__name__} passed")
+    print("\nAll async PubMed tests passed")
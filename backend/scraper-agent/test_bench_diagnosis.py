@@ -0,0 +1,73 @@
+# test script for the offline end-to-end diagnosis benchmark
+# small runs with no injected latency, just checks the harness and its result document
+
+import json
+import os
+import tempfile
+
+from benchmarks.bench_diagnosis import compare_results, percentile, run_benchmark
+
+def test_percentile():
+    values = [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 95) == 4.8
+    assert percentile(values, 100) == 5.0
+    assert percentile([], 95) == 0.0
+
+def test_cold_run_result_document():
+
+    # the run never uses the configured article cache, and leaves the setting as it found it
+    cache_dir = tempfile.mkdtemp()
+    cache_path = os.path.join(cache_dir, 'articles.sqlite3')
+    previous = os.environ.get('PUBMED_CACHE_PATH')
+    os.environ['PUBMED_CACHE_PATH'] = cache_path
+    try:
+        result = run_benchmark(num_requests=6, concurrency=3, eutils_latency=0, llm_latency=0, llm_jitter=0)
+        assert os.environ['PUBMED_CACHE_PATH'] == cache_path
+        assert not os.path.exists(cache_path)
+    finally:
+        if previous is None:
+            os.environ.pop('PUBMED_CACHE_PATH', None)
+        else:
+            os.environ['PUBMED_CACHE_PATH'] = previous
+
+    assert result['config']['requests'] == 6 and result['config']['cache'] == 'cold'
+    assert result['throughput_rps'] > 0
+    latency = result['latency_seconds']
+    assert 0 < latency['p50'] <= latency['p95'] <= latency['p99'] <= latency['max']
+    for stage in ['llm', 'esearch', 'efetch', 'xml_parse', 'relevance', 'certainty', 'evidence', 'ranking']:
+        assert stage in result['stages'], stage
+    assert result['stages']['ranking']['calls'] == 6
+    assert result['upstream_calls']['llm'] == result['counters']['llm_calls'] == 12  # conditions + batch
+    assert result['counters']['articles_fetched'] > 0
+
+    # the document round-trips through JSON for later comparisons
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'result.json')
+        with open(path, 'w') as f:
+            json.dump(result, f)
+        with open(path) as f:
+            assert json.load(f)['latency_seconds'] == latency
+
+def test_warm_run_skips_upstream():
+    result = run_benchmark(num_requests=4, concurrency=2, warm=True, eutils_latency=0, llm_latency=0, llm_jitter=0)
+    assert result['upstream_calls'] == {'esearch': 0, 'efetch': 0, 'llm': 0}
+    assert 'llm' not in result['stages']
+
+def test_compare_flags_regressions():
+
+    baseline = {'latency_seconds': {'p50': 0.10, 'p95': 0.20, 'p99': 0.30}, 'throughput_rps': 10.0}
+    same = {'latency_seconds': {'p50': 0.105, 'p95': 0.21, 'p99': 0.30}, 'throughput_rps': 9.5}
+    slower = {'latency_seconds': {'p50': 0.10, 'p95': 0.30, 'p99': 0.30}, 'throughput_rps': 7.0}
+
+    assert compare_results(same, baseline) == []
+    regressions = compare_results(slower, baseline)
+    assert len(regressions) == 2
+    assert regressions[0].startswith('p95 latency') and regressions[1].startswith('throughput')
+
+if __name__ == "__main__":
+    for test in [test_percentile, test_cold_run_result_document, test_warm_run_skips_upstream,
+                 test_compare_flags_regressions]:
+        test()
+        print(f"{test.__name__} passed")
+    print("\nAll diagnosis benchmark tests passed")
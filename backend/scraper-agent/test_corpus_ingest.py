@@ -0,0 +1,101 @@
+# test script for offline corpus ingestion
+# builds small gzipped baseline files from the recorded fixtures, no network needed
+
+import gzip
+import os
+import tempfile
+from typing import List, Optional
+from corpus import ingest_baseline, iter_corpus
+from fixtures.eutils_server import build_efetch_xml, build_large_efetch_payload, load_recorded_articles
+
+def _write_baseline(directory: str, name: str, num_articles: int, elements: Optional[List[str]] = None) -> str:
+    # num_articles generated articles, or the given serialized elements in order
+    path = os.path.join(directory, name)
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write(build_efetch_xml(elements) if elements is not None else build_large_efetch_payload(num_articles))
+    return path
+
+def test_ingest_and_resume():
+
+    # two files ingested in parallel, a re-run skips them, a new file is picked up
+
+    work_dir = tempfile.mkdtemp()
+    input_dir = os.path.join(work_dir, 'baseline')
+    out_dir = os.path.join(work_dir, 'corpus')
+    os.makedirs(input_dir)
+
+    _write_baseline(input_dir, 'pubmed24n0001.xml.gz', 40)
+    _write_baseline(input_dir, 'pubmed24n0002.xml.gz', 25)
+
+    summary = ingest_baseline([input_dir], out_dir, workers=2)
+    assert summary['records'] == 65 and summary['kept'] == 65
+    assert summary['records_per_sec'] > 0
+
+    # resume: nothing left to do
+    assert ingest_baseline([input_dir], out_dir, workers=2)['files'] == 0
+
+    _write_baseline(input_dir, 'pubmed24n0003.xml.gz', 10)
+    summary = ingest_baseline([input_dir], out_dir, workers=2)
+    assert summary['files'] == 1 and summary['skipped_files'] == 2
+
+    # the files repeat PMIDs (each numbers its articles from the same base): one record per PMID
+    articles = list(iter_corpus(out_dir))
+    assert len(articles) == 40 and len({article['pmid'] for article in articles}) == 40
+    assert all(article['clean_abstract'] and 'relevance_score' in article for article in articles)
+
+def test_update_files_revise_and_delete():
+
+    # an update file revises one article, deletes two (one of them also revised in the file),
+    # and repeats a PMID; the corpus keeps the latest version and drops deleted ones
+
+    work_dir = tempfile.mkdtemp()
+    input_dir = os.path.join(work_dir, 'baseline')
+    out_dir = os.path.join(work_dir, 'corpus')
+    os.makedirs(input_dir)
+
+    recorded = load_recorded_articles()
+    pmids = sorted(recorded)
+    _write_baseline(input_dir, 'pubmed24n0001.xml.gz', 0, [recorded[pmid] for pmid in pmids])
+
+    revised = recorded[pmids[0]].replace('<ArticleTitle>', '<ArticleTitle>Revised: ', 1)
+    deletion = f"<DeleteCitation><PMID Version=\"1\">{pmids[1]}</PMID><PMID Version=\"1\">{pmids[2]}</PMID></DeleteCitation>"
+    _write_baseline(input_dir, 'pubmed24n0002.xml.gz', 0,
+                    [recorded[pmids[3]], revised, recorded[pmids[2]], recorded[pmids[3]], deletion])
+
+    summary = ingest_baseline([input_dir], out_dir, workers=2)
+    assert summary['deleted'] == 2
+
+    articles = {article['pmid']: article for article in iter_corpus(out_dir)}
+    assert sorted(articles) == sorted(set(pmids) - {pmids[1], pmids[2]})
+    assert articles[pmids[0]]['title'].startswith('Revised: ')
+    assert sum(1 for _ in iter_corpus(out_dir)) == len(articles)
+
+def test_filtered_revision_hides_older_version():
+
+    # a revision dropped by min_relevance still replaces the older version,
+    # and records without a PMID aren't kept
+
+    work_dir = tempfile.mkdtemp()
+    input_dir = os.path.join(work_dir, 'baseline')
+    out_dir = os.path.join(work_dir, 'corpus')
+    os.makedirs(input_dir)
+
+    recorded = load_recorded_articles()
+    pmids = sorted(recorded)
+    no_pmid = recorded[pmids[1]].replace(f'<PMID Version="1">{pmids[1]}</PMID>', '', 1)
+    _write_baseline(input_dir, 'pubmed24n0001.xml.gz', 0, [recorded[pmids[0]], no_pmid, recorded[pmids[2]]])
+    assert ingest_baseline([input_dir], out_dir, workers=1)['kept'] == 2
+
+    # every score is at most 1.0, so the revision of pmids[0] is filtered out
+    _write_baseline(input_dir, 'pubmed24n0002.xml.gz', 0, [recorded[pmids[0]]])
+    summary = ingest_baseline([input_dir], out_dir, workers=1, min_relevance=1.1)
+    assert summary['kept'] == 0 and summary['deleted'] == 0
+
+    assert [article['pmid'] for article in iter_corpus(out_dir)] == [pmids[2]]
+
+if __name__ == "__main__":
+    for test in [test_ingest_and_resume, test_update_files_revise_and_delete,
+                 test_filtered_revision_hides_older_version]:
+        test()
+        print(f"{test.__name__} passed")
+    print("\nAll corpus ingestion tests passed")
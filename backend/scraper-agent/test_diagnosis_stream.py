@@ -0,0 +1,118 @@
+# test script for streaming diagnosis output
+# runs offline: local LLM backend + recorded E-utilities stub with some latency
+
+import os
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import ai_diagnosis_api
+from ai_diagnosis_api import DiagnosisWorker
+from config.llm_backends import LocalLLMBackend
+from config.response_cache import ResponseCache
+from diagnosis.diagnostic_assistant import DiagnosticAssistant
+from fixtures.eutils_server import EUtilsStubServer, make_scraper
+
+os.environ['PUBMED_CACHE_PATH'] = ''  # never touch the real article cache
+
+SYMPTOMS = "irregular periods, weight gain, acne, fatigue"
+
+def make_assistant(server, concurrency=2):
+    assistant = DiagnosticAssistant(max_concurrent_conditions=concurrency, llm_backend=LocalLLMBackend())
+    assistant.ai_keywords.cache = ResponseCache()
+    assistant.scraper.pubmed_scraper = make_scraper(server)
+    return assistant
+
+def test_stream_events_and_summary():
+
+    with EUtilsStubServer(latency=0.05) as server:
+        assistant = make_assistant(server)
+
+        start = time.perf_counter()
+        events = []
+        for event in assistant.analyze_symptoms_stream(SYMPTOMS, max_diagnoses=3):
+            events.append((time.perf_counter() - start, event))
+
+        expected = make_assistant(server).analyze_symptoms(SYMPTOMS, max_diagnoses=3)
+
+    kinds = [event['event'] for _, event in events]
+    conditions = events[0][1]['conditions']
+    assert kinds == ['conditions'] + ['condition'] * len(conditions) + ['summary'], kinds
+
+    condition_events = [event for _, event in events[1:-1]]
+    assert [event['completed'] for event in condition_events] == list(range(1, len(conditions) + 1))
+    assert sorted(event['condition'] for event in condition_events) == sorted(conditions)
+    assert all(event['total'] == len(conditions) for event in condition_events)
+
+    # the first diagnosis is out well before the ranked summary
+    first_diagnosis = next(t for t, event in events if event['event'] == 'condition' and event['diagnosis'])
+    assert first_diagnosis < events[-1][0] * 0.75, (first_diagnosis, events[-1][0])
+
+    # the summary is exactly what analyze_symptoms returns
+    assert events[-1][1]['diagnoses'] == expected
+    json.dumps([event for _, event in events])  # every event serializes
+
+def test_worker_streams_tagged_events():
+
+    with EUtilsStubServer() as server:
+        output = io.StringIO()
+        worker = DiagnosisWorker(concurrency=2, output=output)
+        worker._assistants['test-key'] = make_assistant(server)  # warm assistant on the local backend
+
+        request = {'symptom_description': SYMPTOMS, 'gemini_api_key': 'test-key'}
+        worker.submit_line(json.dumps(dict(request, id='a', stream=True))).result()
+        worker.submit_line(json.dumps(dict(request, id='b'))).result()
+        worker.shutdown()
+
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    streamed = [line for line in lines if line['id'] == 'a']
+    assert streamed[0]['event'] == 'conditions'
+    assert all(line['ok'] for line in streamed)
+    assert streamed[-1]['event'] == 'summary' and isinstance(streamed[-1]['result'], list)
+
+    # non-streaming requests still get exactly one response
+    plain = [line for line in lines if line['id'] == 'b']
+    assert len(plain) == 1 and 'event' not in plain[0]
+    assert plain[0]['result'] == streamed[-1]['result']
+
+def test_worker_assistants_are_bounded_and_built_in_parallel():
+
+    # one build per key even under concurrent requests, different keys build side by side,
+    # and only the most recently used keys stay warm
+
+    built = []
+
+    class SlowAssistant:
+        def __init__(self, gemini_api_key):
+            time.sleep(0.3)
+            built.append(gemini_api_key)
+
+    original = ai_diagnosis_api.DiagnosticAssistant
+    ai_diagnosis_api.DiagnosticAssistant = SlowAssistant
+    try:
+        # room for every key, so a late request for 'a' can't find it evicted and rebuild it
+        worker = DiagnosisWorker(concurrency=1, output=io.StringIO(), max_assistants=3)
+        keys = ['a', 'a', 'a', 'b', 'c']
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(keys)) as executor:
+            assistants = list(executor.map(worker._get_assistant, keys))
+        elapsed = time.perf_counter() - start
+
+        assert sorted(built) == ['a', 'b', 'c']
+        assert assistants[0] is assistants[1] is assistants[2]
+        assert elapsed < 0.6, elapsed  # one after another would take 0.9s
+
+        worker._get_assistant('a')  # 'b' is now the least recently used
+        worker._get_assistant('d')
+        assert list(worker._assistants) == ['c', 'a', 'd'] and len(built) == 4
+        worker.shutdown()
+    finally:
+        ai_diagnosis_api.DiagnosticAssistant = original
+
+if __name__ == "__main__":
+    for test in [test_stream_events_and_summary, test_worker_streams_tagged_events,
+                 test_worker_assistants_are_bounded_and_built_in_parallel]:
+        test()
+        print(f"{test.__name__} passed")
+    print("\nAll diagnosis stream tests passed")
@@ -0,0 +1,129 @@
+# test script for the pluggable LLM backends
+# exercises the deterministic local backend and a full offline diagnosis
+# (local LLM + recorded E-utilities stub), nothing goes over the network
+
+import os
+import time
+
+from config.ai_keywords import AIKeywordGenerator
+from config.llm_backends import LocalLLMBackend, LLMBackendError, get_llm_backend
+from config.response_cache import ResponseCache
+from diagnosis.diagnostic_assistant import DiagnosticAssistant
+from fixtures.eutils_server import EUtilsStubServer, make_scraper
+
+os.environ['PUBMED_CACHE_PATH'] = ''  # never touch the real article cache
+
+def make_generator(backend):
+    return AIKeywordGenerator(backend=backend, cache=ResponseCache())
+
+def test_local_backend_answers_every_prompt():
+
+    generator = make_generator(LocalLLMBackend())
+    assert generator.model_name == 'local-rules'
+
+    assert generator.generate_keywords("endometriosis", num_keywords=3) == [
+        "endometriosis", "endometriosis women", "endometriosis diagnosis"]
+    assert len(generator.generate_condition_keywords("PCOS", num_keywords=4)) == 4
+    assert generator.expand_search_query("heavy periods after pregnancy", max_keywords=2) == [
+        "heavy periods after pregnancy", "heavy periods after pregnancy women"]
+
+    topics = ["PCOS diagnosis symptoms women", "anemia diagnosis symptoms women"]
+    batch = generator.generate_keywords_batch(topics, num_keywords=3)
+    assert batch["PCOS diagnosis symptoms women"] == [
+        "PCOS diagnosis symptoms women", "PCOS diagnosis symptoms women treatment",
+        "PCOS diagnosis symptoms women risk factors"]
+    assert generator.model.calls == 4  # the batch was one call
+
+    assistant = DiagnosticAssistant.__new__(DiagnosticAssistant)
+    assistant.ai_keywords = generator
+    assert assistant._generate_potential_conditions("severe pelvic pain, heavy bleeding") == [
+        'endometriosis', 'ovarian cysts', 'pelvic inflammatory disease', 'uterine fibroids', 'adenomyosis']
+
+def test_canned_responses():
+    backend = LocalLLMBackend(responses={'about: "lupus"': '["systemic lupus erythematosus"]'})
+    assert make_generator(backend).generate_keywords("lupus") == ["systemic lupus erythematosus"]
+
+def test_latency_and_error_injection():
+
+    backend = LocalLLMBackend(latency=0.05)
+    start = time.perf_counter()
+    backend.generate_content('about: "x"')
+    assert time.perf_counter() - start >= 0.05
+
+    # same seed, same failures
+    def failures(seed):
+        backend = LocalLLMBackend(error_rate=0.3, seed=seed)
+        pattern = []
+        for _ in range(50):
+            try:
+                backend.generate_content('about: "x"')
+                pattern.append(False)
+            except LLMBackendError:
+                pattern.append(True)
+        return pattern
+    assert failures(7) == failures(7)
+    assert 5 < sum(failures(7)) < 25
+
+    # failed calls fall back like a Gemini outage would
+    generator = make_generator(LocalLLMBackend(error_rate=1.0))
+    assert generator.generate_keywords("fibroids") == ["fibroids women's health", "fibroids treatment", "fibroids women"]
+
+def test_backend_selected_by_environment():
+
+    os.environ['LLM_BACKEND'] = 'local'
+    os.environ['LOCAL_LLM_LATENCY'] = '0.01'
+    try:
+        backend = get_llm_backend()
+        assert isinstance(backend, LocalLLMBackend) and backend.latency == 0.01
+        assert isinstance(AIKeywordGenerator(cache=ResponseCache()).model, LocalLLMBackend)
+
+        os.environ['LLM_BACKEND'] = 'nope'
+        try:
+            get_llm_backend()
+            assert False, "unknown backend accepted"
+        except ValueError:
+            pass
+    finally:
+        del os.environ['LLM_BACKEND']
+        del os.environ['LOCAL_LLM_LATENCY']
+
+def test_malformed_local_settings_use_defaults():
+
+    # a typo in one setting falls back to its default, the error rate is clamped to 0-1
+
+    settings = {'LLM_BACKEND': 'local', 'LOCAL_LLM_LATENCY': 'fast', 'LOCAL_LLM_JITTER': '0.5',
+                'LOCAL_LLM_ERROR_RATE': '7', 'LOCAL_LLM_SEED': 'x'}
+    os.environ.update(settings)
+    try:
+        backend = get_llm_backend()
+        assert isinstance(AIKeywordGenerator(cache=ResponseCache()).model, LocalLLMBackend)
+    finally:
+        for name in settings:
+            del os.environ[name]
+
+    assert backend.latency == 0.0 and backend.jitter == 0.5 and backend.error_rate == 1.0
+
+def test_offline_diagnosis_end_to_end():
+
+    # local LLM + recorded PubMed: the whole pipeline runs without network or quota
+    with EUtilsStubServer() as server:
+        assistant = DiagnosticAssistant(llm_backend=LocalLLMBackend(seed=1))
+        assistant.ai_keywords.cache = ResponseCache()
+        assistant.scraper.pubmed_scraper = make_scraper(server)
+
+        diagnoses = assistant.analyze_symptoms("irregular periods, weight gain, acne", max_diagnoses=3)
+
+    assert 1 <= len(diagnoses) <= 3
+    assert diagnoses[0]['diagnosis'] in ('PCOS', 'thyroid disorders', 'hormonal imbalance', 'insulin resistance',
+                                         'androgen excess')
+    assert all(0.05 <= d['certainty_score'] <= 0.95 for d in diagnoses)
+    assert assistant.ai_keywords.model.calls == 2  # conditions + one batched keyword call
+    assert server.esearch_calls > 0
+
+if __name__ == "__main__":
+    for test in [test_local_backend_answers_every_prompt, test_canned_responses, test_latency_and_error_injection,
+                 test_backend_selected_by_environment, test_malformed_local_settings_use_defaults,
+                 test_offline_diagnosis_end_to_end]:
+        test()
+        print(f"{test.__name__} passed")
+    print("\nAll LLM backend tests passed")
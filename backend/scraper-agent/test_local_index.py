@@ -0,0 +1,193 @@
+# test script for the local BM25 index scraper
+# indexes the recorded PubMed fixtures, no network or API keys needed
+
+import os
+import io
+import json
+import tempfile
+import time
+from fixtures.eutils_server import FIXTURES_DIR
+from main import ResearchScraper
+from scrapers import local_index_scraper
+from scrapers.local_index_scraper import LocalIndexScraper, build_local_index
+from scrapers.pubmed_scraper import PubMedScraper
+from scrapers.hybrid_scraper import HybridScraper
+from fixtures.eutils_server import EUtilsStubServer, make_scraper
+import telemetry
+
+os.environ['PUBMED_CACHE_PATH'] = ''  # never touch the real article cache
+
+def _recorded_articles():
+    with open(f"{FIXTURES_DIR}/efetch.xml") as f:
+        return PubMedScraper()._parse_pubmed_xml(f.read())
+
+def _index() -> LocalIndexScraper:
+    index_dir = tempfile.mkdtemp()
+    articles = _recorded_articles()
+    assert build_local_index(articles + articles[:2], index_dir) == 8  # duplicates indexed once
+    return LocalIndexScraper(index_dir)
+
+def test_bm25_ranking():
+
+    # the most specific articles rank first, and results keep the scraper article shape
+
+    scraper = _index()
+    results = scraper.search_articles("PCOS acne insulin resistance", max_results=3)
+
+    assert [a['pmid'] for a in results[:2]] == ["34456789", "38012345"]
+    assert all(scraper.validate_article_data(a) for a in results)
+    assert scraper.search_articles("zzzunknownterm") == []
+    assert scraper.get_article_text("36987654").startswith("Peripartum cardiomyopathy")
+    assert scraper.get_article_text("1") is None
+
+    start = time.perf_counter()
+    for _ in range(100):
+        scraper.search_articles("pelvic pain heavy menstrual bleeding women", max_results=5)
+    assert (time.perf_counter() - start) / 100 < 0.005
+    scraper.close()
+
+def test_spilled_build_matches_in_memory_build():
+
+    # tiny blocks force many sorted runs (duplicates land in different runs), the merged
+    # index answers exactly like a single-block build
+
+    articles = _recorded_articles()
+    single, spilled = _index(), tempfile.mkdtemp()
+    assert build_local_index(articles + articles[:2], spilled, block_postings=50) == 8
+    spilled = LocalIndexScraper(spilled)
+
+    for query in ["PCOS acne insulin resistance", "pelvic pain heavy menstrual bleeding women", "peripartum"]:
+        assert spilled.search_articles(query, 5) == single.search_articles(query, 5)
+    assert spilled.get_article_text("36987654") == single.get_article_text("36987654")
+    assert spilled.get_article_text("1") is None
+
+def test_merge_memory_is_bounded_per_term():
+
+    # a term's postings stream through the merge a chunk at a time and spill to a scratch file
+    # past the in-memory buffer; shrinking both to a few postings writes the same index
+
+    articles = _recorded_articles() + _recorded_articles()[:2]
+    saved = (local_index_scraper.IMPACT_PREFIX, local_index_scraper._MERGE_CHUNK, local_index_scraper._MERGE_BUFFER)
+    try:
+        local_index_scraper.IMPACT_PREFIX = 3  # so common terms have a prefix and a doc id ordered rest
+        default = tempfile.mkdtemp()
+        build_local_index(articles, default, block_postings=50)
+        local_index_scraper._MERGE_CHUNK, local_index_scraper._MERGE_BUFFER = 2, 3
+        small = tempfile.mkdtemp()
+        build_local_index(articles, small, block_postings=50)
+    finally:
+        local_index_scraper.IMPACT_PREFIX, local_index_scraper._MERGE_CHUNK, local_index_scraper._MERGE_BUFFER = saved
+
+    for name in ['postings.bin', 'terms.bin', 'term_postings.bin', 'term_dfs.bin']:
+        with open(f"{default}/{name}", 'rb') as a, open(f"{small}/{name}", 'rb') as b:
+            assert a.read() == b.read(), name
+    assert os.listdir(small) == os.listdir(default)  # no scratch file left behind
+
+    # the prefix only changes the storage order, exact BM25 over every posting is unaffected
+    reference = tempfile.mkdtemp()
+    build_local_index(articles, reference)
+    for query in ["women", "PCOS acne insulin resistance"]:
+        assert (LocalIndexScraper(small, max_postings_per_term=None).search_articles(query, 8) ==
+                LocalIndexScraper(reference, max_postings_per_term=None).search_articles(query, 8))
+
+def test_capped_postings_traversal():
+
+    # postings are stored strongest first, so reading one per term still finds the best match
+
+    index_dir = tempfile.mkdtemp()
+    build_local_index(_recorded_articles(), index_dir)
+    exact = LocalIndexScraper(index_dir, max_postings_per_term=None)
+    capped = LocalIndexScraper(index_dir, max_postings_per_term=1)
+    for term in ["women", "pregnancy", "insulin"]:
+        assert capped.search_articles(term, 1) == exact.search_articles(term, 1)
+    assert len(capped.search_articles("women", 5)) == 1
+
+    # indexes from the old JSON-vocabulary format are refused, main.py falls back to PubMed
+    with open(f"{index_dir}/meta.json", 'w') as f:
+        json.dump({'num_docs': 8, 'avg_doc_length': 100, 'pmids': {}}, f)
+    try:
+        LocalIndexScraper(index_dir)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+def test_drop_in_for_research_scraper():
+
+    # ResearchScraper works unchanged on top of the local index
+
+    research = ResearchScraper(scraper=_index())
+    texts = research.get_research_articles("endometriosis pelvic pain", max_results=2, min_relevance=0.1)
+    assert texts and texts[0].startswith("BACKGROUND: Endometriosis")
+
+    texts = research.search_by_condition('mental_health', max_results=2)
+    assert len(texts) == len(set(texts))
+
+def test_hybrid_local_first_with_fallback():
+
+    # local index answers when it can, PubMed fills the gap, every article is attributed
+
+    with EUtilsStubServer() as server:
+        remote = make_scraper(server)
+        local = _index()
+        hybrid = HybridScraper([local], remote)
+
+        # enough local hits: no remote call
+        articles, trace = hybrid.search_articles_traced("PCOS acne insulin resistance", max_results=2)
+        assert len(articles) == 2 and not trace['fallback']
+        assert server.esearch_calls == 0
+        assert set(trace['sources'].values()) == {'LocalIndexScraper'}
+
+        # local has only one match: fall back, merge and dedupe by PMID
+        articles, trace = hybrid.search_articles_traced("peripartum cardiomyopathy", max_results=3)
+        assert trace['fallback'] and server.esearch_calls == 1
+        assert len({a['pmid'] for a in articles}) == len(articles)
+        assert trace['sources']["36987654"] == 'LocalIndexScraper'
+        assert [b['backend'] for b in trace['backends']] == ['LocalIndexScraper', 'PubMedScraper']
+
+        # stale local index: remote is consulted even with enough local results
+        local.last_updated -= 3600
+        stale = HybridScraper([local], remote, freshness_threshold=60)
+        _, trace = stale.search_articles_traced("PCOS acne insulin resistance", max_results=2)
+        assert trace['fallback']
+
+    assert hybrid.get_stats()['LocalIndexScraper']['requests'] == 2
+
+def test_hybrid_search_multiple_batches_fallbacks():
+
+    # keywords the local index can't answer share one remote search_multiple: one efetch,
+    # PMIDs deduplicated across keywords, counted in the request's telemetry
+
+    keywords = ["PCOS acne insulin resistance", "peripartum cardiomyopathy", "lupus"]
+    sink = io.StringIO()
+    telemetry.configure(sink)
+    try:
+        with EUtilsStubServer() as server:
+            remote = make_scraper(server)
+            hybrid = HybridScraper([_index()], remote)
+            with telemetry.request('search'):
+                articles, trace = hybrid.search_multiple_traced(keywords, max_results=2)
+
+            assert trace['fallback_keywords'] == keywords[1:]
+            assert server.esearch_calls == 2 and server.efetch_calls == 1
+            assert len(server.efetched_ids) == len(set(server.efetched_ids))
+            assert hybrid.last_trace is trace
+    finally:
+        telemetry.configure(None)
+
+    pmids = [a['pmid'] for a in articles]
+    assert len(pmids) == len(set(pmids))
+    assert set(trace['sources']) == set(pmids)
+    assert 'LocalIndexScraper' in trace['sources'].values() and 'PubMedScraper' in trace['sources'].values()
+
+    record = json.loads(sink.getvalue())
+    assert record['stages']['local_search']['count'] == 3
+    assert record['counters']['remote_fallbacks'] == 2 and record['counters']['local_hits'] > 0
+
+if __name__ == "__main__":
+    for test in [test_bm25_ranking, test_spilled_build_matches_in_memory_build, test_merge_memory_is_bounded_per_term,
+                 test_capped_postings_traversal,
+                 test_drop_in_for_research_scraper, test_hybrid_local_first_with_fallback,
+                 test_hybrid_search_multiple_batches_fallbacks]:
+        test()
+        print(f"{test.__name__} passed")
+    print("\nAll local index tests passed")
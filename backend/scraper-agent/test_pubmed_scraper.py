@@ -0,0 +1,216 @@
+# test script for the synchronous PubMed scraper
+# runs against a local stand-in E-utilities server with recorded responses, no network needed
+
+import os
+import tempfile
+import time
+from fixtures.eutils_server import EUtilsStubServer, make_scraper, FIXTURES_DIR
+from scrapers import pubmed_scraper
+from scrapers.pubmed_scraper import PubMedScraper, PubMedStreamParser
+from scrapers.article_cache import ArticleCache, get_default_article_cache
+from scrapers.search_cache import SearchCache, get_default_search_cache
+
+def test_search_multiple_fetches_each_pmid_once():
+
+    # overlapping keywords: one esearch per keyword, one efetch for the unique PMIDs
+
+    keywords = ["PCOS diagnosis symptoms women", "insulin resistance women", "polycystic ovary syndrome"]
+
+    with EUtilsStubServer() as server:
+        articles = make_scraper(server).search_multiple(keywords, max_results=2)
+
+        assert server.esearch_calls == 3
+        assert server.efetch_calls == 1
+        assert sorted(server.efetched_ids) == ["34456789", "38012345"]
+
+    # first-seen order: first keyword's ranking wins
+    assert [a['pmid'] for a in articles] == ["38012345", "34456789"]
+
+def test_large_fetches_are_batched():
+
+    # ID lists above the batch size are split, and big batches go through POST
+
+    original = pubmed_scraper.EFETCH_BATCH_SIZE, pubmed_scraper.EFETCH_GET_MAX_IDS
+    pubmed_scraper.EFETCH_BATCH_SIZE, pubmed_scraper.EFETCH_GET_MAX_IDS = 3, 2
+    try:
+        with EUtilsStubServer() as server:
+            pmids = sorted(server.articles)
+            articles = make_scraper(server)._fetch_article_details(pmids)
+            assert server.efetch_calls == 3
+    finally:
+        pubmed_scraper.EFETCH_BATCH_SIZE, pubmed_scraper.EFETCH_GET_MAX_IDS = original
+
+    assert sorted(a['pmid'] for a in articles) == pmids
+
+def test_article_cache_skips_network():
+
+    # second fetch of the same PMIDs is served from the cache, offline mode works off it
+
+    cache = ArticleCache(':memory:')
+    pmids = ["38012345", "37654321"]
+
+    with EUtilsStubServer() as server:
+        first = make_scraper(server, cache=cache)._fetch_article_details(pmids)
+        second = make_scraper(server, cache=cache)._fetch_article_details(pmids + ["36987654"])
+
+        assert server.efetch_calls == 2
+        assert server.efetched_ids == pmids + ["36987654"]  # only the new PMID was downloaded
+
+    offline = PubMedScraper(base_url="http://127.0.0.1:9/", cache=cache, offline=True)
+    assert [a['pmid'] for a in offline._fetch_article_details(pmids)] == pmids
+    assert offline.search_articles("PCOS") == []  # no esearch without the network
+
+    assert second[:2] == first
+    stats = cache.get_stats()
+    assert stats['hits'] == 4 and stats['misses'] == 3 and stats['entries'] == 3
+
+def test_article_cache_ttl_and_lru():
+
+    # stale entries are misses, and the least recently used entry is evicted first
+
+    cache = ArticleCache(':memory:', ttl=0.05, max_entries=2)
+    cache.put_many([{'pmid': '1'}, {'pmid': '2'}])
+    time.sleep(0.1)
+    assert cache.get('1') is None
+
+    cache = ArticleCache(':memory:', max_entries=2)
+    cache.put({'pmid': '1'})
+    time.sleep(0.01)
+    cache.put({'pmid': '2'})
+    time.sleep(0.01)
+    cache.get('1')              # touch 1, so 2 is now least recently used
+    time.sleep(0.01)
+    cache.put({'pmid': '3'})
+
+    assert cache.get('2') is None
+    assert cache.get('1') == {'pmid': '1'} and cache.get('3') == {'pmid': '3'}
+    assert cache.get_stats()['evictions'] == 1
+
+def test_article_cache_opens_on_first_use():
+
+    # building a cache (and so a scraper) creates nothing; an unopenable path just acts empty
+
+    path = os.path.join(tempfile.mkdtemp(), 'cache', 'articles.sqlite3')
+    cache = ArticleCache(path)
+    assert not os.path.exists(path)
+    cache.put({'pmid': '1'})
+    assert os.path.exists(path) and cache.get('1') == {'pmid': '1'}
+
+    blocker = os.path.join(tempfile.mkdtemp(), 'file')
+    open(blocker, 'w').close()
+    broken = ArticleCache(os.path.join(blocker, 'articles.sqlite3'))
+    broken.put({'pmid': '1'})
+    assert broken.get('1') is None and len(broken) == 0
+
+def test_search_cache_normalizes_terms():
+
+    # casing/whitespace variants of a keyword share one esearch, and the SQLite backend is shared
+
+    path = os.path.join(tempfile.mkdtemp(), 'searches.sqlite3')
+    shared = SearchCache(path=path)
+
+    with EUtilsStubServer() as server:
+        scraper = make_scraper(server, search_cache=shared)
+        first = scraper._search_article_ids("PCOS diagnosis symptoms women", 2)
+        second = scraper._search_article_ids("  pcos   Diagnosis symptoms WOMEN ", 2)
+        scraper._search_article_ids("PCOS diagnosis symptoms women", 1)  # different retmax
+        assert server.esearch_calls == 2
+
+    assert first == second == ["38012345", "34456789"]
+
+    # another worker process sharing the file starts cold in memory but hits the SQLite table
+    other = SearchCache(path=path)
+    assert other.get("pcos diagnosis symptoms women", 2) == first
+
+    expired = SearchCache(ttl=0)
+    expired.put("PCOS", 2, 'relevance', ["1"])
+    time.sleep(0.01)
+    assert expired.get("PCOS", 2) is None
+
+def test_default_search_cache_ignores_malformed_settings():
+
+    # a bad number in the environment falls back to the default instead of failing the scraper build
+
+    settings = {'PUBMED_SEARCH_CACHE_TTL': '1h', 'PUBMED_SEARCH_CACHE_MAX_ENTRIES': '12'}
+    previous = {name: os.environ.get(name) for name in settings}
+    os.environ.update(settings)
+    try:
+        cache = get_default_search_cache()
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    assert cache.ttl == 3600 and cache.max_entries == 12
+
+def test_default_article_cache_ignores_malformed_settings():
+
+    # a typo in one setting falls back to its default instead of turning the cache off
+
+    settings = {'PUBMED_CACHE_PATH': os.path.join(tempfile.mkdtemp(), 'articles.sqlite3'),
+                'PUBMED_CACHE_TTL': '1w', 'PUBMED_CACHE_MAX_ENTRIES': '12'}
+    previous = {name: os.environ.get(name) for name in settings}
+    os.environ.update(settings)
+    try:
+        cache = get_default_article_cache()
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    assert isinstance(cache, ArticleCache)
+    assert cache.ttl == 7 * 24 * 3600 and cache.max_entries == 12
+
+def test_stream_parser_matches_full_parse():
+
+    # feeding the recorded payload in tiny chunks gives the same articles, one element at a time
+
+    with open(os.path.join(FIXTURES_DIR, 'efetch.xml'), 'rb') as f:
+        payload = f.read()
+
+    scraper = PubMedScraper()
+    parser = PubMedStreamParser(scraper)
+    streamed = []
+    for start in range(0, len(payload), 97):
+        streamed.extend(parser.feed(payload[start:start + 97]))
+        assert len(parser._root or []) <= 1  # finished articles don't pile up in the tree
+    streamed.extend(parser.close())
+
+    assert len(streamed) == 8
+    assert streamed == scraper._parse_pubmed_xml(payload.decode('utf-8'))
+
+def test_extractor_keeps_mixed_content():
+
+    # inline markup inside titles/abstracts no longer truncates the text
+
+    xml = (
+        '<PubmedArticleSet><PubmedArticle><MedlineCitation><PMID>1</PMID><Article>'
+        '<ArticleTitle><i>BRCA1</i> testing in women.</ArticleTitle>'
+        '<Abstract><AbstractText Label="RESULTS">Carriers of <i>BRCA1</i> had 10<sup>2</sup> more cases.</AbstractText></Abstract>'
+        '<AuthorList><Author><LastName>Doe</LastName><ForeName>Jane</ForeName></Author></AuthorList>'
+        '<Journal><JournalIssue><PubDate><Year>2024</Year></PubDate></JournalIssue></Journal>'
+        '</Article><CommentsCorrectionsList><CommentsCorrections><PMID>999</PMID></CommentsCorrections>'
+        '</CommentsCorrectionsList></MedlineCitation></PubmedArticle></PubmedArticleSet>'
+    )
+    [article] = PubMedScraper()._parse_pubmed_xml(xml)
+
+    assert article['pmid'] == "1"
+    assert article['title'] == "BRCA1 testing in women."
+    assert article['abstract'] == "RESULTS: Carriers of BRCA1 had 102 more cases."
+    assert article['authors'] == ["Jane Doe"] and article['publication_date'] == "2024"
+
+if __name__ == "__main__":
+    for test in [test_search_multiple_fetches_each_pmid_once, test_large_fetches_are_batched,
+                 test_article_cache_skips_network, test_article_cache_ttl_and_lru,
+                 test_article_cache_opens_on_first_use,
+                 test_search_cache_normalizes_terms, test_default_search_cache_ignores_malformed_settings,
+                 test_default_article_cache_ignores_malformed_settings,
+                 test_stream_parser_matches_full_parse,
+                 test_extractor_keeps_mixed_content]:
+        test()
+        print(f"{test.__name__} passed")
+    print("\nAll PubMed scraper tests passed")
@@ -0,0 +1,65 @@
+# test script for the shared PubMed token bucket
+# runs offline, no API keys needed
+
+import asyncio
+import threading
+import time
+from scrapers.rate_limiter import TokenBucket, get_pubmed_rate_limiter, PUBMED_RATE_NO_KEY, PUBMED_RATE_WITH_KEY
+
+def test_no_wait_when_tokens_available():
+
+    # a full bucket hands out its tokens immediately
+
+    bucket = TokenBucket(rate=10, capacity=3)
+    waits = [bucket.acquire() for _ in range(3)]
+    assert waits == [0.0, 0.0, 0.0]
+    assert bucket.get_metrics()['waits'] == 0
+
+def test_threads_respect_rate():
+
+    # 6 concurrent callers on a 20/sec bucket with 1 token must take ~0.25s
+
+    bucket = TokenBucket(rate=20)
+    start = time.monotonic()
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    metrics = bucket.get_metrics()
+    assert elapsed >= 0.24, elapsed
+    assert metrics['acquired'] == 6
+    assert metrics['waits'] == 5
+    assert metrics['total_wait_time'] > 0
+
+def test_async_acquire():
+
+    # asyncio callers share the same bucket without blocking the event loop
+
+    bucket = TokenBucket(rate=20)
+
+    async def run():
+        start = time.monotonic()
+        await asyncio.gather(*(bucket.acquire_async() for _ in range(4)))
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+    assert elapsed >= 0.14, elapsed
+
+def test_shared_pubmed_buckets():
+
+    # every scraper in the process gets the same bucket for its key tier
+
+    assert get_pubmed_rate_limiter() is get_pubmed_rate_limiter(None)
+    assert get_pubmed_rate_limiter("key-a") is get_pubmed_rate_limiter("key-b")
+    assert get_pubmed_rate_limiter().rate == PUBMED_RATE_NO_KEY
+    assert get_pubmed_rate_limiter("key-a").rate == PUBMED_RATE_WITH_KEY
+
+if __name__ == "__main__":
+    for test in [test_no_wait_when_tokens_available, test_threads_respect_rate,
+                 test_async_acquire, test_shared_pubmed_buckets]:
+        test()
+        print(f"{test.__name__} passed")
+    print("\nAll rate limiter tests passed")
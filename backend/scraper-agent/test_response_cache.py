@@ -0,0 +1,271 @@
+# test script for the LLM response cache and batched keyword generation
+# uses a fake model in place of Gemini, nothing goes over the network
+
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config.ai_keywords import AIKeywordGenerator
+from config import response_cache
+from config.response_cache import ResponseCache
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeModel:
+
+    # counts calls; each call sleeps a little so concurrent callers overlap
+
+    model_name = 'fake'
+
+    def __init__(self, text='["pcos diagnosis", "pcos women", "hyperandrogenism"]', delay=0.05):
+        self.text = text
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if isinstance(self.text, Exception):
+            raise self.text
+        return FakeResponse(self.text)
+
+def make_generator(cache=None, model=None):
+    return AIKeywordGenerator(cache=cache or ResponseCache(), backend=model or FakeModel())
+
+def test_repeated_prompts_hit_cache():
+
+    generator = make_generator()
+    first = generator.generate_keywords("PCOS diagnosis symptoms women", num_keywords=3)
+    second = generator.generate_keywords("  pcos   DIAGNOSIS symptoms women ", num_keywords=3)
+    assert first == second == ["pcos diagnosis", "pcos women", "hyperandrogenism"]
+    assert generator.model.calls == 1
+
+    # callers get their own copy
+    first.append("mutated")
+    assert generator.generate_keywords("PCOS diagnosis symptoms women", num_keywords=3)[-1] == "hyperandrogenism"
+
+    # every part of the key matters
+    generator.generate_keywords("PCOS diagnosis symptoms women", num_keywords=2)
+    generator.generate_keywords("PCOS diagnosis symptoms women", num_keywords=3, focus="endocrinology")
+    generator.generate_condition_keywords("PCOS diagnosis symptoms women", num_keywords=3)
+    generator.expand_search_query("PCOS diagnosis symptoms women", max_keywords=3)
+    assert generator.model.calls == 5
+
+def test_concurrent_identical_requests_single_flight():
+
+    generator = make_generator(model=FakeModel(delay=0.3))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: generator.generate_keywords("endometriosis"), range(8)))
+
+    assert generator.model.calls == 1
+    assert all(result == results[0] for result in results)
+    stats = generator.cache.get_stats()
+    assert stats['shared_in_flight'] == 7, stats
+
+def test_failures_are_not_cached():
+
+    model = FakeModel(text=RuntimeError("quota exceeded"), delay=0.2)
+    generator = make_generator(model=model)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: generator.generate_keywords("fibroids"), range(4)))
+
+    # concurrent callers share the one failed call and each fall back
+    assert model.calls == 1
+    assert all(result == ["fibroids women's health", "fibroids treatment", "fibroids women"] for result in results)
+
+    model.text = '["uterine fibroids"]'
+    assert generator.generate_keywords("fibroids") == ["uterine fibroids"]
+    assert model.calls == 2
+
+def test_unusable_answers_are_not_cached():
+
+    # empty or non-string arrays raise (basic fallback keywords, nothing cached); answers that
+    # only parse line by line are used but not cached either
+
+    for text in ['[]', '[1, 2]', '[""]']:
+        generator = make_generator(model=FakeModel(text=text, delay=0))
+        assert generator.generate_keywords("pcos") == ["pcos women's health", "pcos treatment", "pcos women"]
+        generator.generate_keywords("pcos")
+        assert generator.model.calls == 2 and generator.cache.get_stats()['entries'] == 0, text
+
+    generator = make_generator(model=FakeModel(text="pcos diagnosis\n- insulin resistance", delay=0))
+    assert generator.generate_keywords("pcos") == ["pcos diagnosis", "insulin resistance"]
+    generator.generate_keywords("pcos")
+    assert generator.model.calls == 2 and generator.cache.get_stats()['entries'] == 0
+
+def test_ttl_and_lru_bounds():
+
+    cache = ResponseCache(ttl=0.2, max_entries=2)
+    cache.put('a', [1])
+    cache.put('b', [2])
+    cache.put('c', [3])  # evicts 'a'
+    assert cache.get('a') is None and cache.get('b') == [2] and cache.get('c') == [3]
+    time.sleep(0.25)
+    assert cache.get('b') is None
+
+def test_persistent_cache_shared_between_instances():
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'llm.sqlite3')
+        writer = make_generator(cache=ResponseCache(path=path))
+        writer.generate_keywords("preeclampsia")
+
+        reader = make_generator(cache=ResponseCache(path=path))
+        assert reader.generate_keywords("preeclampsia") == writer.generate_keywords("preeclampsia")
+        assert reader.model.calls == 0
+
+def test_default_cache_ignores_malformed_settings():
+
+    # a typo in one setting falls back to its default instead of breaking every AIKeywordGenerator
+
+    settings = {'LLM_CACHE_TTL': '1h', 'LLM_CACHE_MAX_ENTRIES': '12', 'LLM_CACHE_PATH': ''}
+    previous = {name: os.environ.get(name) for name in settings}
+    previous_cache = response_cache._default_cache
+    os.environ.update(settings)
+    response_cache._default_cache = None
+    try:
+        cache = response_cache.get_default_response_cache()
+    finally:
+        response_cache._default_cache = previous_cache
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    assert cache.ttl == response_cache.DEFAULT_RESPONSE_TTL and cache.max_entries == 12
+
+def test_potential_conditions_cached():
+
+    from diagnosis.diagnostic_assistant import DiagnosticAssistant
+    assistant = DiagnosticAssistant.__new__(DiagnosticAssistant)  # no scraper needed
+    assistant.ai_keywords = make_generator(model=FakeModel(text='```json\n["PCOS", "thyroid disorders"]\n```'))
+
+    symptoms = "irregular periods, weight gain, acne"
+    assert assistant._generate_potential_conditions(symptoms) == ["PCOS", "thyroid disorders"]
+    assert assistant._generate_potential_conditions(symptoms.upper()) == ["PCOS", "thyroid disorders"]
+    assert assistant.ai_keywords.model.calls == 1
+
+    # unparseable answers use the rule-based fallback and aren't cached
+    assistant.ai_keywords.model.text = "I think it could be PCOS"
+    assert assistant._generate_potential_conditions("pelvic pain") == assistant._fallback_condition_extraction("pelvic pain")
+    assistant._generate_potential_conditions("pelvic pain")
+    assert assistant.ai_keywords.model.calls == 3
+
+class ScriptedModel(FakeModel):
+
+    # answers each prompt with the next scripted text; single-topic prompts get a fixed list
+
+    def __init__(self, batch_answers):
+        super().__init__(delay=0)
+        self.batch_answers = list(batch_answers)
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        with self._lock:
+            self.calls += 1
+        if 'For EACH of these topics' in prompt:
+            return FakeResponse(self.batch_answers.pop(0))
+        return FakeResponse('["single call"]')
+
+def test_batch_keywords_one_call():
+
+    topics = ["PCOS diagnosis symptoms women", "endometriosis diagnosis symptoms women", "PCOS  diagnosis symptoms WOMEN"]
+    answer = "```json\n" + json.dumps({
+        "PCOS diagnosis symptoms women": ["pcos", "hyperandrogenism", "anovulation", "extra"],
+        "Endometriosis diagnosis symptoms women": ["endometriosis", "dysmenorrhea"]
+    }) + "\n```"
+    generator = make_generator(model=ScriptedModel([answer]))
+
+    result = generator.generate_keywords_batch(topics, num_keywords=3)
+    assert generator.model.calls == 1
+    assert result == {
+        topics[0]: ["pcos", "hyperandrogenism", "anovulation"],
+        topics[1]: ["endometriosis", "dysmenorrhea"],
+        topics[2]: ["pcos", "hyperandrogenism", "anovulation"]
+    }
+
+    # batch answers land in the same cache entries generate_keywords uses
+    assert generator.generate_keywords(topics[1], num_keywords=3) == ["endometriosis", "dysmenorrhea"]
+    assert generator.generate_keywords_batch(topics, num_keywords=3) == result
+    assert generator.model.calls == 1
+
+def test_batch_keywords_fall_back_per_topic():
+
+    topics = ["fibroids", "adenomyosis", "PID"]
+    answer = json.dumps({"fibroids": ["uterine fibroids"], "adenomyosis": "not a list"})
+    generator = make_generator(model=ScriptedModel([answer, "no json at all"]))
+
+    # adenomyosis is malformed and PID is missing: one single-topic call each
+    result = generator.generate_keywords_batch(topics)
+    assert result == {"fibroids": ["uterine fibroids"], "adenomyosis": ["single call"], "PID": ["single call"]}
+    assert generator.model.calls == 3
+
+    # unparseable batch response: every topic falls back
+    result = generator.generate_keywords_batch(["a", "b"])
+    assert result == {"a": ["single call"], "b": ["single call"]}
+    assert generator.model.calls == 6
+
+def test_batch_blank_keywords_fall_back():
+
+    # blank strings make a topic's entry malformed, like in single-topic answers: it gets its own
+    # call and the blank list is never cached
+
+    answer = json.dumps({"Asthma": ["", " "], "fibroids": ["uterine fibroids"]})
+    generator = make_generator(model=ScriptedModel([answer]))
+
+    result = generator.generate_keywords_batch(["Asthma", "fibroids"])
+    assert result == {"Asthma": ["single call"], "fibroids": ["uterine fibroids"]}
+    assert generator.generate_keywords("Asthma") == ["single call"]
+    assert generator.model.calls == 2
+
+def test_diagnosis_generates_keywords_in_one_call():
+
+    from diagnosis.diagnostic_assistant import DiagnosticAssistant
+
+    conditions = ["PCOS", "thyroid disorders", "insulin resistance"]
+    batch_answer = json.dumps({DiagnosticAssistant._research_query(c): [f"{c} kw"] for c in conditions})
+
+    class Model(ScriptedModel):
+        def generate_content(self, prompt):
+            if 'suggest 5 most likely medical conditions' in prompt:
+                self.calls += 1
+                return FakeResponse(json.dumps(conditions))
+            return super().generate_content(prompt)
+
+    class Scraper:
+        def __init__(self):
+            self.calls = []
+        def search_records_with_ai(self, topic, max_results=10, min_relevance=0.3, keywords=None):
+            self.calls.append((topic, keywords))
+            return []
+
+    assistant = DiagnosticAssistant.__new__(DiagnosticAssistant)
+    assistant.ai_keywords = make_generator(model=Model([batch_answer]))
+    assistant.scraper = Scraper()
+    assistant.max_concurrent_conditions = 3
+
+    assistant.analyze_symptoms("irregular periods, weight gain")
+    assert assistant.ai_keywords.model.calls == 2  # conditions + one batch keyword call
+    assert sorted(assistant.scraper.calls) == sorted(
+        (DiagnosticAssistant._research_query(c), [f"{c} kw"]) for c in conditions)
+
+if __name__ == "__main__":
+    for test in [test_repeated_prompts_hit_cache, test_concurrent_identical_requests_single_flight,
+                 test_failures_are_not_cached, test_unusable_answers_are_not_cached, test_ttl_and_lru_bounds,
+                 test_persistent_cache_shared_between_instances, test_default_cache_ignores_malformed_settings,
+                 test_potential_conditions_cached,
+                 test_batch_keywords_one_call, test_batch_keywords_fall_back_per_topic,
+                 test_batch_blank_keywords_fall_back,
+                 test_diagnosis_generates_keywords_in_one_call]:
+        test()
+        print(f"{test.__name__} passed")
+    print("\nAll response cache tests passed")
@@ -0,0 +1,197 @@
+# test script for the memory-mapped article cache shared between worker processes
+# writers and readers run as separate processes on one cache file, PubMed is the recorded stub
+
+import multiprocessing
+import os
+import tempfile
+import time
+
+from fixtures.eutils_server import EUtilsStubServer, make_scraper
+from scrapers import article_cache
+from scrapers.shared_article_cache import SharedArticleCache
+
+def _article(pmid, text='abstract'):
+    return {'pmid': pmid, 'title': f'Title {pmid}', 'abstract': f'{text} {pmid}', 'authors': ['A B'],
+            'url': f'https://pubmed.ncbi.nlm.nih.gov/{pmid}/', 'publication_date': '2024'}
+
+def _write_articles(path, worker, count):
+    # runs in a child process: append in small batches like PubMedScraper does
+    cache = SharedArticleCache(path)
+    for start in range(0, count, 10):
+        cache.put_many([_article(f'{worker}-{i}', 'x' * 1000) for i in range(start, min(start + 10, count))])
+    cache.close()
+
+def _open_and_put(path, worker):
+    # runs in a child process: open a cache file that may not exist yet
+    cache = SharedArticleCache(path)
+    cache.put(_article(f'open-{worker}'))
+    cache.close()
+
+def _fetch_in_worker(path, pmids, results):
+    # runs in a child process: a separate PubMedScraper on the shared file
+    with EUtilsStubServer() as server:
+        scraper = make_scraper(server, cache=SharedArticleCache(path, readonly=True))
+        articles = scraper._fetch_article_details(pmids)
+        results.put((server.efetch_calls, [a['pmid'] for a in articles]))
+
+def test_round_trip_and_ttl():
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'articles.mmap')
+        cache = SharedArticleCache(path, ttl=0.05)
+        cache.put_many([_article('1'), _article('2'), {'title': 'no pmid'}])
+        assert cache.get_many(['1', '2', '3']) == {'1': _article('1'), '2': _article('2')}
+        assert len(cache) == 2
+
+        cache.put(_article('1', 'revised'))       # newest record wins
+        assert cache.get('1')['abstract'] == 'revised 1'
+        assert len(cache) == 2
+
+        time.sleep(0.1)
+        assert cache.get('2') is None              # stale
+        stats = cache.get_stats()
+        assert stats['hits'] == 3 and stats['misses'] == 2
+        cache.close()
+
+        # a later process (or restart) picks up everything already on disk
+        reopened = SharedArticleCache(path)
+        assert reopened.get('1')['abstract'] == 'revised 1'
+        reopened.close()
+
+        with open(os.path.join(tmp, 'other'), 'wb') as f:
+            f.write(b'x' * 128)
+        try:
+            SharedArticleCache(os.path.join(tmp, 'other'))
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+
+def test_concurrent_writer_processes():
+
+    # several processes append at once; every record lands intact and readers see them all
+
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'articles.mmap')
+        reader = SharedArticleCache(path)
+        assert len(reader) == 0
+
+        writers = [context.Process(target=_write_articles, args=(path, worker, 300)) for worker in range(4)]
+        for process in writers:
+            process.start()
+        for process in writers:
+            process.join(60)
+            assert process.exitcode == 0
+
+        assert len(reader) == 1200
+        pmids = [f'{worker}-{i}' for worker in range(4) for i in range(300)]
+        found = reader.get_many(pmids)
+        assert len(found) == 1200 and found['3-299'] == _article('3-299', 'x' * 1000)
+        assert os.path.getsize(path) > 1024 * 1024   # grew past the initial mapping
+        reader.close()
+
+def test_concurrent_creation():
+
+    # processes racing to create the same file all end up with a working cache
+
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        for trial in range(3):
+            path = os.path.join(tmp, f'articles-{trial}.mmap')
+            workers = [context.Process(target=_open_and_put, args=(path, worker)) for worker in range(8)]
+            for process in workers:
+                process.start()
+            for process in workers:
+                process.join(60)
+                assert process.exitcode == 0
+
+            cache = SharedArticleCache(path, readonly=True)
+            assert len(cache.get_many([f'open-{worker}' for worker in range(8)])) == 8
+            cache.close()
+
+def test_readonly_workers_share_fetched_articles():
+
+    # one worker downloads, the others are served from the shared file without any efetch
+
+    pmids = ["38012345", "37654321"]
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'articles.mmap')
+        with EUtilsStubServer() as server:
+            writer = make_scraper(server, cache=SharedArticleCache(path))
+            writer._fetch_article_details(pmids)
+            assert server.efetch_calls == 1
+
+        readonly = SharedArticleCache(path, readonly=True)
+        readonly.put(_article('ignored'))
+        assert readonly.get('ignored') is None
+
+        results = context.Queue()
+        workers = [context.Process(target=_fetch_in_worker, args=(path, pmids, results))
+                   for _ in range(3)]
+        for process in workers:
+            process.start()
+        outcomes = [results.get(timeout=60) for _ in workers]
+        for process in workers:
+            process.join(60)
+
+        assert outcomes == [(0, pmids)] * 3
+
+def test_compaction_reopens_other_handles():
+
+    # past max_bytes the file is rewritten with the newest entries; other handles follow the swap
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'articles.mmap')
+        writer = SharedArticleCache(path, max_entries=50, max_bytes=64 * 1024)
+        reader = SharedArticleCache(path, readonly=True)
+
+        for start in range(0, 600, 20):
+            writer.put_many([_article(str(i), 'x' * 100) for i in range(start, start + 20)])
+
+        assert writer.compactions > 0
+        assert 50 <= len(reader) < 600                 # 50 kept plus what came after the last compaction
+        assert reader.get_stats()['bytes'] <= 64 * 1024
+        assert reader.get('599') == _article('599', 'x' * 100)
+        assert reader.get('0') is None                 # evicted
+        assert not [name for name in os.listdir(tmp) if name.endswith('.tmp')]
+
+        # newest entries bigger than max_bytes: compaction trims by bytes too, so it doesn't
+        # rewrite the file on every later put
+        big = SharedArticleCache(os.path.join(tmp, 'big.mmap'), max_bytes=64 * 1024)
+        for start in range(0, 600, 20):
+            big.put_many([_article(str(i), 'x' * 100) for i in range(start, start + 20)])
+        assert 0 < big.compactions <= 6
+        assert big.get('599') is not None
+        big.close()
+
+        writer.clear()
+        assert len(reader) == 0
+        writer.close()
+        reader.close()
+
+def test_default_cache_from_environment():
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'shared', 'articles.mmap')
+        os.environ['PUBMED_SHARED_CACHE_PATH'] = path
+        try:
+            cache = article_cache.get_default_article_cache()
+            assert isinstance(cache, SharedArticleCache) and not cache.readonly
+            cache.close()
+
+            os.environ['PUBMED_SHARED_CACHE_READONLY'] = '1'
+            cache = article_cache.get_default_article_cache()
+            assert cache.readonly
+            cache.close()
+        finally:
+            os.environ.pop('PUBMED_SHARED_CACHE_PATH', None)
+            os.environ.pop('PUBMED_SHARED_CACHE_READONLY', None)
+
+if __name__ == "__main__":
+    for test in [test_round_trip_and_ttl, test_concurrent_writer_processes, test_concurrent_creation,
+                 test_readonly_workers_share_fetched_articles, test_compaction_reopens_other_handles,
+                 test_default_cache_from_environment]:
+        test()
+        print(f"{test.__name__} passed")
+    print("\nAll shared article cache tests passed")
@@ -0,0 +1,147 @@
+# test script for per-request timing instrumentation and stderr logging
+# runs offline: local LLM backend + recorded E-utilities stub
+
+import os
+import io
+import json
+import logging
+from contextlib import redirect_stderr, redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+
+import telemetry
+from telemetry import log
+from config.llm_backends import LocalLLMBackend
+from config.response_cache import ResponseCache
+from diagnosis.diagnostic_assistant import DiagnosticAssistant
+from fixtures.eutils_server import EUtilsStubServer, make_scraper
+from scrapers.article_cache import ArticleCache
+from scrapers.search_cache import SearchCache
+
+os.environ['PUBMED_CACHE_PATH'] = ''  # never touch the real article cache
+
+SYMPTOMS = "irregular periods, weight gain, acne"
+
+def records(sink):
+    return [json.loads(line) for line in sink.getvalue().splitlines()]
+
+def test_disabled_is_a_no_op():
+
+    telemetry.configure(None)
+    assert not telemetry.enabled()
+    with telemetry.request('diagnosis') as metrics:
+        assert metrics is None
+        assert telemetry.span('efetch') is telemetry.span('llm')  # one shared no-op span
+        with telemetry.span('efetch'):
+            telemetry.count('articles_fetched', 5)
+        assert telemetry.current() is None
+
+def test_request_record():
+
+    sink = io.StringIO()
+    telemetry.configure(sink)
+    try:
+        with telemetry.request('diagnosis', id='r1'):
+            with telemetry.span('efetch'):
+                with telemetry.span('xml_parse'):
+                    pass
+            telemetry.count('articles_fetched', 3)
+
+            # a nested scope adds to the outer request instead of emitting its own record
+            with telemetry.request('inner'):
+                telemetry.count('articles_fetched', 2)
+
+            # executor threads report into the submitting request when bound
+            def work():
+                with telemetry.span('certainty'):
+                    telemetry.count('conditions')
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                for future in [executor.submit(telemetry.bind(work)) for _ in range(8)]:
+                    future.result()
+
+        try:
+            with telemetry.request('diagnosis', id='r2'):
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+    finally:
+        telemetry.configure(None)
+
+    first, second = records(sink)
+    assert first['request'] == 'diagnosis' and first['id'] == 'r1'
+    assert first['counters'] == {'articles_fetched': 5, 'conditions': 8}
+    assert first['stages']['certainty']['count'] == 8
+    assert first['stages']['efetch']['seconds'] >= first['stages']['xml_parse']['seconds']
+    assert first['seconds'] >= first['stages']['efetch']['seconds']
+    assert second['id'] == 'r2' and second['error'] == 'RuntimeError'
+    assert telemetry.current() is None
+
+def make_assistant(server):
+    assistant = DiagnosticAssistant(llm_backend=LocalLLMBackend())
+    assistant.ai_keywords.cache = ResponseCache()
+    assistant.scraper.pubmed_scraper = make_scraper(
+        server, cache=ArticleCache(':memory:'), search_cache=SearchCache())
+    return assistant
+
+def test_diagnosis_stage_breakdown():
+
+    sink = io.StringIO()
+    telemetry.configure(sink)
+    try:
+        with EUtilsStubServer() as server:
+            assistant = make_assistant(server)
+            assistant.analyze_symptoms(SYMPTOMS, max_diagnoses=3)
+            assistant.analyze_symptoms(SYMPTOMS, max_diagnoses=3)  # warm caches
+    finally:
+        telemetry.configure(None)
+
+    cold, warm = records(sink)
+    for stage in ['llm', 'esearch', 'efetch', 'xml_parse', 'rate_limit', 'relevance', 'certainty',
+                  'evidence', 'ranking']:
+        assert stage in cold['stages'], (stage, cold['stages'])
+    assert cold['stages']['llm']['count'] == cold['counters']['llm_calls'] == 2
+    assert cold['counters']['articles_fetched'] > 0
+    assert cold['counters']['articles_kept'] + cold['counters'].get('articles_filtered', 0) > 0
+
+    # the second run is served from the LLM, search and article caches
+    assert 'llm' not in warm['stages'] and 'efetch' not in warm['stages']
+    assert warm['counters']['llm_cache_hits'] >= 2
+    assert warm['counters']['search_cache_hits'] > 0
+    assert warm['counters']['article_cache_hits'] > 0
+
+def test_logs_go_to_stderr():
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with EUtilsStubServer() as server, redirect_stdout(stdout), redirect_stderr(stderr):
+        make_assistant(server).analyze_symptoms(SYMPTOMS, max_diagnoses=3)
+
+    assert stdout.getvalue() == ''
+    assert "Analyzing symptoms: 'irregular periods, weight gain, acne'" in stderr.getvalue()
+    assert "probable diagnoses" in stderr.getvalue()
+
+def test_unknown_log_level_falls_back_to_info():
+
+    # a bad MEDISYN_LOG_LEVEL must not break importing every module that logs
+
+    previous = os.environ.get('MEDISYN_LOG_LEVEL')
+    try:
+        results = {}
+        for value in ['verbose', 'debug', '30', '']:
+            os.environ['MEDISYN_LOG_LEVEL'] = value
+            results[value] = log._level_from_env()
+    finally:
+        if previous is None:
+            os.environ.pop('MEDISYN_LOG_LEVEL', None)
+        else:
+            os.environ['MEDISYN_LOG_LEVEL'] = previous
+
+    assert results['verbose'] == (logging.INFO, 'VERBOSE')
+    assert results['debug'] == (logging.DEBUG, None)
+    assert results['30'] == (logging.WARNING, None)
+    assert results[''] == (logging.INFO, None)
+
+if __name__ == "__main__":
+    for test in [test_disabled_is_a_no_op, test_request_record, test_diagnosis_stage_breakdown,
+                 test_logs_go_to_stderr, test_unknown_log_level_falls_back_to_info]:
+        test()
+        print(f"{test.__name__} passed")
+    print("\nAll telemetry tests passed")
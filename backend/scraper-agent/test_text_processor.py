@@ -0,0 +1,247 @@
+# test script for TextProcessor
+# property-style equivalence check of clean_abstract against the original five-pass cleaner
+# and of the keyword matcher against per-keyword `in` checks
+
+import random
+import re
+from processing.analyzed_document import AnalysisCache, AnalyzedDocument
+from processing.article import Article, ArticleStore
+from processing.keyword_matcher import KeywordMatcher
+from processing.text_processor import TextProcessor
+
+def reference_clean_abstract(text: str) -> str:
+
+    # the original clean_abstract, kept as the reference implementation
+
+    if not text:
+        return ""
+    text = re.sub(r'<[^>]+>', '', text)
+    text = re.sub(r'[^\w\s\.\,\-\:\;\(\)]', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s+([,\.;:])', r'\1', text)
+    text = re.sub(r'([,\.;:])\s+', r'\1 ', text)
+    return text.strip()
+
+# characters that exercise every branch: tags, kept punctuation, junk, unicode word chars and spaces
+ALPHABET = (
+    list("abcXYZ019_") + list(".,-:;()") + list("<>/") + list("!?%&*\"'[]{}=+#@$^|~`") +
+    [" ", "  ", "\t", "\n", "\r", "\x0b", "\x0c", " ", " ", "　", "\x1c"] +
+    ["é", "ß", "µ", "α", "β", "中", "٣", "²", "½", "–", "—", "•", "±", "≥", "​", "﻿"] +
+    ["<i>", "</i>", "<sup>", "</sup>", "< ", " >", "<b\n>"]
+)
+
+def random_text(rng: random.Random) -> str:
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 60)))
+
+def test_clean_abstract_matches_reference():
+
+    # 50k random strings over a hostile alphabet must clean to exactly the same output
+
+    processor = TextProcessor()
+    rng = random.Random(1234)
+    for _ in range(50000):
+        text = random_text(rng)
+        assert processor.clean_abstract(text) == reference_clean_abstract(text), repr(text)
+
+def test_clean_abstract_examples():
+
+    processor = TextProcessor()
+    cases = [
+        "",
+        "   ",
+        "BACKGROUND:  Women with <i>BRCA1</i> mutations ; risk ≥ 60% .",
+        "Results , were: (significant) - p<0.05 , n=120.",
+        "Tab\tseparated\nlines\r\nand nbsp",
+    ]
+    for text in cases:
+        assert processor.clean_abstract(text) == reference_clean_abstract(text), repr(text)
+
+def reference_relevance_score(processor: TextProcessor, article) -> float:
+    # the original per-keyword relevance loop
+    text = f"{article.get('title', '')} {article.get('abstract', '')}".lower()
+    if not text.strip():
+        return 0.0
+    count = sum(1 for keyword in processor.womens_health_keywords if keyword.lower() in text)
+    return min(count / len(processor.womens_health_keywords), 1.0)
+
+def test_keyword_matcher_matches_substring_checks():
+
+    # small alphabet so keywords overlap, nest and share prefixes/suffixes; both scan strategies
+
+    rng = random.Random(99)
+    for trial in range(300):
+        keywords = [''.join(rng.choice('abcA ') for _ in range(rng.randint(0, 5)))
+                    for _ in range(rng.randint(1, 12))]
+        for matcher in (KeywordMatcher(keywords), KeywordMatcher(keywords, min_automaton_keywords=0)):
+            for _ in range(20):
+                text = ''.join(rng.choice('abcAB ') for _ in range(rng.randint(0, 40)))
+                lowered = text.lower()
+                expected = {k for k in keywords if k.lower() in lowered}
+                assert matcher.found(text) == expected, (keywords, text)
+                assert matcher.num_found(text) == sum(1 for k in keywords if k.lower() in lowered)
+                for keyword, count in matcher.counts(text).items():
+                    needle = keyword.lower()
+                    assert count == sum(1 for i in range(len(lowered) + 1) if lowered.startswith(needle, i))
+                assert set(matcher.counts(text)) == expected
+
+def test_relevance_score_unchanged():
+
+    # large vocabulary goes through the automaton, scores must match the per-keyword loop
+
+    rng = random.Random(7)
+    small = TextProcessor()
+    large = TextProcessor()
+    large.womens_health_keywords = small.womens_health_keywords + [
+        ''.join(rng.choice('aeioustrnl') for _ in range(rng.randint(3, 8))) for _ in range(300)]
+    large.keyword_matcher = KeywordMatcher(large.womens_health_keywords)
+    assert large.keyword_matcher.use_automaton and not small.keyword_matcher.use_automaton
+
+    words = ['women', 'Female', 'PREGNANCY', 'maternal', 'breast', 'ovary', 'estrogens',
+             'hormone-therapy', 'cervical', 'tears', 'onset', 'ratio', 'a', '']
+    for _ in range(2000):
+        article = {'title': ' '.join(rng.choice(words) for _ in range(rng.randint(0, 6))),
+                   'abstract': ' '.join(rng.choice(words) for _ in range(rng.randint(0, 30)))}
+        for processor in (small, large):
+            assert processor.calculate_relevance_score(article) == reference_relevance_score(processor, article)
+
+def test_score_batch_matches_single_scores():
+
+    processor = TextProcessor()
+    rng = random.Random(3)
+    words = ['Women', 'female', 'pregnancy', 'estrogen', 'breastfeeding', 'men', 'cohort', '', '  ']
+    articles = [{'title': ' '.join(rng.choice(words) for _ in range(rng.randint(0, 4))),
+                 'abstract': ' '.join(rng.choice(words) for _ in range(rng.randint(0, 20)))}
+                for _ in range(1000)]
+    articles += [{}, {'title': 'Maternal outcomes'}, {'abstract': 'Ovarian reserve'}]
+
+    assert processor.score_batch(articles) == [processor.calculate_relevance_score(a) for a in articles]
+    assert processor.score_batch([]) == []
+
+def test_certainty_score_unchanged():
+
+    # values recorded from the per-keyword implementation
+
+    from diagnosis.diagnostic_assistant import DiagnosticAssistant
+    assistant = DiagnosticAssistant.__new__(DiagnosticAssistant)  # scoring needs no scraper or model
+    assistant.analysis_cache = AnalysisCache()
+
+    articles = ["Women with sudden onset chest pain and shortness of breath after delivery.",
+                "Acute anxiety presents with palpitations."]
+    symptoms = "sudden onset chest pain, shortness of breath, severe and acute"
+    conditions = ['Peripartum Cardiomyopathy', 'Takotsubo cardiomyopathy', 'Pulmonary Embolism', 'Panic disorder',
+                  'anxiety', 'SCAD (spontaneous coronary artery dissection)', 'PCOS']
+    scores = [assistant._calculate_certainty_score(symptoms, condition, articles) for condition in conditions]
+    assert scores == [0.53, 0.48, 0.56, 0.43, 0.43, 0.38, 0.53], scores
+    scores = [assistant._calculate_certainty_score(symptoms, condition, articles[:1]) for condition in conditions]
+    assert scores == [0.57, 0.52, 0.6, 0.47, 0.47, 0.42, 0.57], scores
+    assert assistant._calculate_certainty_score("mild fatigue", "anxiety and panic attacks", articles) == 0.05
+
+def test_supporting_evidence_ranking():
+
+    from diagnosis.diagnostic_assistant import DiagnosticAssistant
+    assistant = DiagnosticAssistant.__new__(DiagnosticAssistant)
+    assistant.analysis_cache = AnalysisCache()
+
+    symptoms = "severe pelvic pain and heavy bleeding in the morning"
+    articles = [
+        "It is painless and the bleeding is in the arm. Pelvic pain with heavy bleeding is typical",
+        "Endometriosis causes pelvic pain, infertility, fatigue and many other symptoms in women of all ages. "
+        "Heavy bleeding pain",
+        "Pelvic pain with heavy bleeding is typical! Nothing relevant here"
+    ]
+    evidence = assistant._extract_supporting_evidence(symptoms, articles)
+
+    # whole-token matches only: 'painless' doesn't match 'pain', stop words never count;
+    # denser sentences first, duplicates kept once
+    assert evidence == ["Heavy bleeding pain",
+                        "Pelvic pain with heavy bleeding is typical",
+                        "Endometriosis causes pelvic pain, infertility, fatigue and many other symptoms in women of all ages"]
+    assert assistant._extract_supporting_evidence(symptoms, articles, top_k=1) == ["Heavy bleeding pain"]
+    assert assistant._extract_supporting_evidence("and in the", articles) == []
+    assert assistant._extract_supporting_evidence(symptoms, []) == []
+
+    # hundreds of articles with many sentences each stay cheap (no keyword x sentence substring scans)
+    many = [". ".join(f"Pelvic pain and heavy bleeding case {i} {j}" for j in range(20)) for i in range(500)]
+    assert len(assistant._extract_supporting_evidence(symptoms, many)) == 3
+
+def test_analyzed_document_matches_regex_passes():
+
+    # tokens and sentences must be exactly what the scorers' re.findall / re.split produced
+
+    rng = random.Random(11)
+    for _ in range(5000):
+        text = random_text(rng) + ''.join(rng.choice(['. ', '!', '?!', '...', 'Pain ', 'É ']) for _ in range(3))
+        document = AnalyzedDocument(text)
+        assert document.tokens == re.findall(r'\b\w+\b', text.lower())
+        assert document.token_set == set(document.tokens)
+        assert document.sentences == re.split(r'[.!?]+', text)
+        assert document.sentences_lower == [sentence.lower() for sentence in document.sentences]
+        for sentence, offset in zip(document.sentences, document.sentence_offsets):
+            assert text[offset:offset + len(sentence)] == sentence
+
+def test_analysis_cache_reuses_documents():
+
+    cache = AnalysisCache(max_entries=2)
+    first = cache.analyze("Pelvic pain. Heavy bleeding")
+    assert cache.analyze("Pelvic pain. Heavy bleeding") is first
+    assert cache.analyze(first) is first  # analyzed documents pass through
+    cache.analyze("b")
+    cache.analyze("c")  # evicts the least recently used entry
+    assert cache.analyze("Pelvic pain. Heavy bleeding") is not first
+    assert cache.get_stats()['hits'] == 1 and cache.get_stats()['entries'] == 2
+
+def test_article_record_derived_fields():
+
+    from scrapers.base_scraper import BaseScraper
+
+    processor = TextProcessor()
+    data = {
+        'title': "Maternal outcomes in <i>women</i> with PCOS",
+        'abstract': "RESULTS: Pregnancy loss was higher ( n = 12 ). Ovarian volume rose. Estrogen fell.",
+        'url': "https://pubmed.ncbi.nlm.nih.gov/123/",
+        'authors': ["Ada Lovelace"],
+        'publication_date': "2024",
+        'pmid': "123",
+        'source': "pubmed"
+    }
+    article = Article.from_dict(data, processor)
+
+    assert not hasattr(article, '__dict__')  # slots only
+    assert article.clean_abstract == processor.clean_abstract(data['abstract'])
+    assert article.clean_abstract is article.clean_abstract  # computed once
+    assert article.relevance_score == processor.calculate_relevance_score(data)
+    assert article.key_findings == processor.extract_key_findings(data['abstract'])
+    assert article.document.token_set == AnalyzedDocument(article.clean_abstract).token_set
+    assert article.document is not article.document  # analyzed documents aren't pinned on records
+
+    # reads like the scraper dict and converts back to it
+    assert article['title'] == data['title'] and article.get('missing', 'x') == 'x' and 'source' in article
+    assert BaseScraper.validate_article_data(None, article)
+    assert article.to_dict() == data
+    detailed = article.to_dict(derived=True)
+    assert detailed['clean_abstract'] == article.clean_abstract and detailed['relevance_score'] == article.relevance_score
+
+def test_article_store_shares_records():
+
+    store = ArticleStore(max_entries=2)
+    first = store.record({'pmid': '1', 'title': 't', 'abstract': 'a'})
+    assert store.record({'pmid': '1', 'title': 't', 'abstract': 'a'}) is first
+    assert store.record(first) is first
+
+    # changed content replaces the record, and the LRU stays bounded
+    refreshed = store.record({'pmid': '1', 'title': 't', 'abstract': 'updated'})
+    assert refreshed is not first and refreshed.abstract == 'updated'
+    store.record({'pmid': '2'})
+    store.record({'pmid': '3'})
+    assert store.get_stats()['entries'] == 2 and store.get_stats()['hits'] == 1
+
+if __name__ == "__main__":
+    for test in [test_clean_abstract_matches_reference, test_clean_abstract_examples,
+                 test_keyword_matcher_matches_substring_checks, test_relevance_score_unchanged,
+                 test_score_batch_matches_single_scores, test_analyzed_document_matches_regex_passes,
+                 test_analysis_cache_reuses_documents, test_supporting_evidence_ranking,
+                 test_certainty_score_unchanged, test_article_record_derived_fields,
+                 test_article_store_shares_records]:
+        test()
+        print(f"{test.__name__} passed")
+    print("\nAll text processor tests passed")